@@ -0,0 +1,155 @@
+import os
+import re
+import datetime
+import threading
+from collections import Counter, deque
+from pymongo import UpdateOne
+from backend.db import db
+from backend.background import PeriodicTask
+from backend import metrics
+from backend.data_versions import notify_write
+
+ACTIVITY_FLUSH_INTERVAL_SECONDS = float(os.getenv("ACTIVITY_FLUSH_INTERVAL_SECONDS", "2.0"))
+ACTIVITY_BUFFER_SIZE = int(os.getenv("ACTIVITY_BUFFER_SIZE", "5000"))
+ACTIVITY_RETENTION_DAYS = int(os.getenv("ACTIVITY_RETENTION_DAYS", "30"))
+
+# Raw events go to a time-series collection (bucketed by Mongo, expired by
+# TTL); "active in the last N days" is answered from the per-day rollup.
+activity_collection = db["student_activity"]
+activity_daily_collection = db["student_activity_daily"]
+
+_recorded = metrics.counter("activity_events_recorded_total", "Activity events buffered")
+_written = metrics.counter("activity_events_written_total", "Activity events written to Mongo")
+_dropped = metrics.counter("activity_events_dropped_total", "Activity events dropped because the buffer was full")
+_flush_seconds = metrics.histogram("activity_flush_seconds", "Time to write one activity batch")
+_buffered = metrics.gauge("activity_events_buffered", "Activity events waiting to be flushed")
+
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+
+
+def _day(ts: datetime.datetime) -> datetime.datetime:
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+class ActivityTracker:
+    """Buffers activity records in memory and writes them in batches.
+
+    ``record`` never touches Mongo; a background flusher writes the raw
+    events with one ``insert_many`` and the daily rollup with one unordered
+    ``bulk_write`` of aggregated upserts per flush.
+    """
+
+    def __init__(self, buffer_size: int = ACTIVITY_BUFFER_SIZE, flush_interval: float = ACTIVITY_FLUSH_INTERVAL_SECONDS):
+        self.buffer_size = buffer_size
+        # Keep at most 4x the flush size if Mongo is unavailable; oldest records go first.
+        self._buffer = deque(maxlen=buffer_size * 4)
+        self._lock = threading.Lock()
+        self._flusher = PeriodicTask("activity-flusher", flush_interval, self.flush)
+
+    def start(self):
+        self._flusher.start()
+
+    def stop(self):
+        self._flusher.stop()
+
+    def record(self, student_id, kind: str):
+        self._append(("id", str(student_id), kind))
+
+    def record_mentions(self, text: str):
+        """Record chat mentions of student emails; resolved to ids at flush time."""
+        for email in set(_EMAIL.findall(text)):
+            self._append(("email", email.lower(), "chat_mention"))
+
+    def _append(self, item):
+        ts = datetime.datetime.utcnow()
+        with self._lock:
+            if len(self._buffer) == self._buffer.maxlen:
+                _dropped.inc()
+            self._buffer.append((*item, ts))
+            size = len(self._buffer)
+        _recorded.inc()
+        _buffered.set(size)
+        if size >= self.buffer_size:
+            self._flusher.trigger()
+
+    def flush(self):
+        with self._lock:
+            items = list(self._buffer)
+            self._buffer.clear()
+        _buffered.set(0)
+        if not items:
+            return
+        try:
+            with _flush_seconds.time():
+                written = self._write(items)
+        except Exception:
+            self._requeue(items)
+            raise
+        _written.inc(written)
+        if written:
+            notify_write("student_activity", "flush", count=written)
+
+    def _requeue(self, items):
+        """Put a batch that failed to write back ahead of newer records, for
+        the next flush. A batch that failed part-way may then be counted
+        twice; records past the buffer's bound (oldest first) are dropped."""
+        with self._lock:
+            kept = (items + list(self._buffer))[-self._buffer.maxlen:]
+            lost = len(items) + len(self._buffer) - len(kept)
+            self._buffer.clear()
+            self._buffer.extend(kept)
+            size = len(self._buffer)
+        if lost:
+            _dropped.inc(lost)
+        _buffered.set(size)
+
+    def _write(self, items) -> int:
+        emails = {value for key_type, value, _, _ in items if key_type == "email"}
+        email_ids = {}
+        if emails:
+            for s in db["students"].find({"email": {"$in": list(emails)}}, {"email": 1, "student_id": 1}):
+                email_ids[s["email"]] = s["student_id"]
+
+        events = []
+        rollup = {}
+        for key_type, value, kind, ts in items:
+            student_id = value if key_type == "id" else email_ids.get(value)
+            if student_id is None:
+                continue
+            events.append({"student_id": student_id, "kind": kind, "ts": ts})
+            day = rollup.setdefault((_day(ts), student_id), {"count": 0, "kinds": Counter(), "last_seen": ts})
+            day["count"] += 1
+            day["kinds"][kind] += 1
+            day["last_seen"] = max(day["last_seen"], ts)
+        if not events:
+            return 0
+
+        activity_collection.insert_many(events, ordered=False)
+        activity_daily_collection.bulk_write([
+            UpdateOne(
+                {"day": day, "student_id": student_id},
+                {
+                    "$inc": {"count": agg["count"], **{f"kinds.{k}": n for k, n in agg["kinds"].items()}},
+                    "$max": {"last_seen": agg["last_seen"]},
+                    "$setOnInsert": {"expire_at": day + datetime.timedelta(days=ACTIVITY_RETENTION_DAYS)},
+                },
+                upsert=True,
+            )
+            for (day, student_id), agg in rollup.items()
+        ], ordered=False)
+        return len(events)
+
+    def active_students(self, days: int = 7, limit: int = 50) -> list:
+        """``[{"student_id", "last_seen", "events"}]`` for students active in
+        the last ``days`` days, most recent first (index scan on the rollup)."""
+        cutoff = _day(datetime.datetime.utcnow()) - datetime.timedelta(days=days - 1)
+        return list(activity_daily_collection.aggregate([
+            {"$match": {"day": {"$gte": cutoff}}},
+            {"$group": {"_id": "$student_id", "last_seen": {"$max": "$last_seen"}, "events": {"$sum": "$count"}}},
+            {"$sort": {"last_seen": -1}},
+            {"$limit": int(limit)},
+            {"$project": {"_id": 0, "student_id": "$_id", "last_seen": 1, "events": 1}},
+        ]))
+
+
+activity_tracker = ActivityTracker()
@@ -1,72 +1,282 @@
 # backend/agent.py
 import os
+import time
+import asyncio
+import datetime
 from openai import AsyncOpenAI
-from agents import Agent, OpenAIChatCompletionsModel, Runner
-from .tools import *
+from openai.types.responses import ResponseTextDeltaEvent
+from agents import Agent, ModelSettings, Runner, set_trace_processors, set_tracing_disabled
+from agents.tracing import TracingProcessor, GenerationSpanData
+from .db import run_in_db_pool
+from .resources import resources
+from .tools import (
+    add_student_tool, get_student_tool, update_student_tool, delete_student_tool, list_students_tool,
+    search_students_tool, import_students_csv_tool, get_total_students_tool, get_students_by_department_tool,
+    get_recent_onboarded_students_tool, get_active_students_last_7_days_tool, get_active_students_tool,
+    add_event_tool, update_event_tool, delete_event_tool, list_events_tool, upcoming_events_tool,
+    send_email_tool, email_students_tool, search_documents_tool,
+)
+from .memory import conversation_memory
+from .activity import activity_tracker
+from .context_window import ContextWindow, CONTEXT_SUMMARIZER, extractive_summary, render_message
+from . import metrics
+from .intent_router import try_answer
+from .response_cache import response_cache, RESPONSE_CACHE_ENABLED
+from . import data_versions
+from .tracing import record_span, TRACING_ENABLED
+from .llm_admission import (AdmittedChatCompletionsModel, llm_request, track_upstream, close_upstream,
+                            LLM_ADMISSION_ENABLED, LLM_DEADLINE_SECONDS)
+
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com/v1beta/openai/")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+# Let the model request several tools in one turn; the SDK runs them concurrently.
+AGENT_PARALLEL_TOOL_CALLS = os.getenv("AGENT_PARALLEL_TOOL_CALLS", "true").lower() == "true"
+
+_time_to_first_token = metrics.histogram("chat_time_to_first_token_seconds", "Time from request to first streamed text delta")
+_stream_duration = metrics.histogram("chat_stream_duration_seconds", "Total duration of completed chat streams")
+_streams_cancelled = metrics.counter("chat_streams_cancelled_total", "Chat streams abandoned by the client")
+
+# ----------------- Tracing -----------------
+# SDK spans are consumed in process (model latency and token counts per
+# request) instead of being exported to the OpenAI tracing backend.
+class AgentTraceProcessor(TracingProcessor):
+    """Receives the agents SDK spans in process (instead of exporting them to
+    OpenAI) and records model calls: latency and tokens in/out."""
+
+    def on_trace_start(self, trace):
+        pass
+
+    def on_trace_end(self, trace):
+        pass
+
+    def on_span_start(self, span):
+        pass
+
+    def on_span_end(self, span):
+        data = span.span_data
+        if not isinstance(data, GenerationSpanData) or not span.started_at or not span.ended_at:
+            return
+        duration = (datetime.datetime.fromisoformat(span.ended_at)
+                    - datetime.datetime.fromisoformat(span.started_at)).total_seconds()
+        model = data.model or "unknown"
+        usage = data.usage or {}
+        tokens_in, tokens_out = usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+        metrics.histogram("llm_request_seconds", "Model call latency", model=model).observe(duration)
+        metrics.counter("llm_tokens_total", "Model tokens", model=model, direction="in").inc(tokens_in)
+        metrics.counter("llm_tokens_total", "Model tokens", model=model, direction="out").inc(tokens_out)
+        if span.error:
+            metrics.counter("llm_request_errors_total", "Model calls that failed", model=model).inc()
+        record_span("llm", model, time.perf_counter() - duration, duration,
+                    tokens_in=tokens_in, tokens_out=tokens_out, error=bool(span.error))
+
+    def shutdown(self):
+        pass
+
+    def force_flush(self):
+        pass
+
+
+agent_trace_processor = AgentTraceProcessor()
+
+if TRACING_ENABLED:
+    set_trace_processors([agent_trace_processor])
+else:
+    set_tracing_disabled(True)
 
 # ----------------- OpenAI Client -----------------
-client = AsyncOpenAI(
-    api_key=os.getenv("GEMINI_API_KEY"),
-    base_url="https://generativelanguage.googleapis.com/v1beta/openai/",
-)
+# The client (and its HTTP connection pool) and the agents built on it are
+# created on first use in each worker process, not at import.
+def _create_llm_client():
+    return AsyncOpenAI(
+        api_key=os.getenv("GEMINI_API_KEY"),
+        base_url=GEMINI_BASE_URL,
+        # Retries and deadlines are handled by backend.llm_admission; the
+        # timeout also bounds the gap between streamed chunks.
+        max_retries=0 if LLM_ADMISSION_ENABLED else 2,
+        timeout=LLM_DEADLINE_SECONDS,
+    )
+
+resources.register("llm_client", _create_llm_client, close=lambda client: client.close())
 
 # ----------------- Agent Setup -----------------
-agent = Agent(
-    name="Campus Admin Agent",
+def _build_agent():
+    return Agent(
+        name="Campus Admin Agent",
+        instructions="""
+        You are the Campus Admin assistant. When asked about students, events, or any data, 
+        ALWAYS use the appropriate tools to get the actual data from the database.
+        For example:
+        - When asked to "list students" or "show students", use list_students_tool
+        - When asked about student count, use get_total_students_tool
+        - When asked about a specific student, use get_student_tool
+        - When you only have part of a name or email, or it may be misspelled, use
+          search_students_tool rather than list_students_tool
+        - When asked what is coming up or happening in a period ("next week", "in March"),
+          use upcoming_events_tool or list_events_tool with date_from/date_to (and location)
+          rather than listing every event
+        - When asked to email a whole department or intake, use email_students_tool
+          (one call) instead of send_email_tool per student
+        - When asked about campus policies, rules or handbooks, use search_documents_tool
+          and cite the source file and page of the passages you rely on
+        Always provide the actual data, not just acknowledgments.
+        When a question needs several independent lookups (for example the total count,
+        the per-department breakdown and the recent students), request all of those
+        tools in the same turn rather than one after another.
+
+          In streaming conversations, you should remember facts mentioned by the user
+        within the current conversation, such as names, preferences, or other details,
+        and use them in later responses. Do NOT store anything in the database
+        for these remembered facts.
+        """,
+        model=AdmittedChatCompletionsModel(model=GEMINI_MODEL, openai_client=resources.get("llm_client")),
+        model_settings=ModelSettings(parallel_tool_calls=AGENT_PARALLEL_TOOL_CALLS),
+        tools=[
+            add_student_tool, get_student_tool, update_student_tool, delete_student_tool, list_students_tool,
+            search_students_tool, import_students_csv_tool,
+            get_total_students_tool, get_students_by_department_tool, get_recent_onboarded_students_tool,
+            get_active_students_last_7_days_tool, get_active_students_tool, add_event_tool, update_event_tool, delete_event_tool, list_events_tool,
+            upcoming_events_tool, send_email_tool, email_students_tool, search_documents_tool
+        ],
+    )
+
+resources.register("agent", _build_agent)
+
+def get_agent() -> Agent:
+    return resources.get("agent")
+
+# ----------------- Context Window -----------------
+resources.register("summarizer_agent", lambda: Agent(
+    name="Conversation Summarizer",
     instructions="""
-    You are the Campus Admin assistant. When asked about students, events, or any data, 
-    ALWAYS use the appropriate tools to get the actual data from the database.
-    For example:
-    - When asked to "list students" or "show students", use list_students_tool
-    - When asked about student count, use get_total_students_tool
-    - When asked about a specific student, use get_student_tool
-    Always provide the actual data, not just acknowledgments.
-
-      In streaming conversations, you should remember facts mentioned by the user
-    within the current conversation, such as names, preferences, or other details,
-    and use them in later responses. Do NOT store anything in the database
-    for these remembered facts.
+    You maintain a running summary of a chat between a campus admin and an assistant.
+    Merge the new turns into the current summary. Keep names, preferences, identifiers
+    and decisions; drop small talk. Reply with the updated summary only.
     """,
-    model=OpenAIChatCompletionsModel(model="gemini-2.0-flash", openai_client=client),
-    tools=[
-        add_student_tool, get_student_tool, update_student_tool, delete_student_tool, list_students_tool,
-        get_total_students_tool, get_students_by_department_tool, get_recent_onboarded_students_tool,
-        get_active_students_last_7_days_tool, add_event_tool, update_event_tool, delete_event_tool, list_events_tool,
-        send_email_tool
-    ],
-)
+    model=get_agent().model,
+))
+
+async def summarize_with_agent(summary: str, messages: list, max_tokens: int) -> str:
+    transcript = "\n".join(render_message(m) for m in messages)
+    prompt = (
+        f"Current summary:\n{summary or '(none)'}\n\n"
+        f"New turns:\n{transcript}\n\n"
+        f"Keep the summary under {int(max_tokens * 0.75)} words."
+    )
+    result = await Runner().run(resources.get("summarizer_agent"), prompt)
+    return result.final_output.strip()
 
-# ----------------- Conversation Memory -----------------
-conversation_memory = {}
+context_window = ContextWindow(
+    summarizer=summarize_with_agent if CONTEXT_SUMMARIZER == "llm" else extractive_summary
+)
 
 # ----------------- Normal chat - no memory -----------------
-async def run_agent(message: str):
+async def run_agent(message: str, user: str = None, deadline: float = None, priority: str = "interactive"):
+    """``deadline`` is an event-loop time after which model calls give up
+    (see backend.llm_admission); ``priority="batch"`` queues behind chats."""
+    activity_tracker.record_mentions(message)
+
+    # Simple data questions are answered straight from the tools
+    routed = await try_answer(message)
+    if routed is not None:
+        return routed
+
+    # Repeated questions are served until the data they read changes
+    if RESPONSE_CACHE_ENABLED:
+        cached = response_cache.get(message)
+        if cached is not None:
+            return cached
+
+    versions = data_versions.snapshot()
+    started = time.perf_counter()
     runner = Runner()
-    result = await runner.run(agent, message)
-    return result.final_output.strip()
+    with llm_request(user, priority, deadline):
+        result = await runner.run(get_agent(), message)
+    output = result.final_output.strip()
+
+    if RESPONSE_CACHE_ENABLED:
+        tools_used = [item.raw_item.name for item in result.new_items if item.type == "tool_call_item"]
+        response_cache.put(message, output, tools_used, versions, time.perf_counter() - started)
+    return output
 
 # ----------------- Streaming chat - with memory per user -----------------
-async def stream_agent(message: str, user_id: str, thread_id: str):
-    # Initialize memory for user if not exists
-    if user_id not in conversation_memory:
-        conversation_memory[user_id] = {}
+async def stream_agent(message: str, user_id: str, thread_id: str, deadline: float = None):
+    """Yield ``delta``, ``tool_call`` and ``tool_output`` events as the agent runs.
+
+    If the consumer stops iterating (client disconnected), the run is
+    cancelled so no further model or tool calls are made.
+    """
+    started = time.perf_counter()
 
-    # Initialize memory for thread if not exists
-    if thread_id not in conversation_memory[user_id]:
-        conversation_memory[user_id][thread_id] = []
+    # Load the thread history (only touches Mongo if this worker has no copy)
+    await run_in_db_pool(conversation_memory.get, user_id, thread_id)
 
     # Append user message to memory
-    conversation_memory[user_id][thread_id].append({"role": "user", "content": message})
+    await run_in_db_pool(conversation_memory.append, user_id, thread_id, "user", message)
+    activity_tracker.record_mentions(message)
 
-    # Build conversation text
-    context_messages = conversation_memory[user_id][thread_id]
-    conversation_text = "\n".join([f"{m['role']}: {m['content']}" for m in context_messages])
+    # Simple data questions are answered straight from the tools
+    routed = await try_answer(message)
+    if routed is not None:
+        _time_to_first_token.observe(time.perf_counter() - started)
+        yield {"type": "delta", "text": routed}
+        await run_in_db_pool(conversation_memory.append, user_id, thread_id, "assistant", routed)
+        return
 
-    # Run agent
-    runner = Runner()
-    result = await runner.run(agent, conversation_text)
+    # Build conversation text: running summary + recent turns within the token budget
+    # (The admission scope is never held across a yield: the run's task
+    # copies it when it is created.)
+    with llm_request(user_id, "interactive", deadline):
+        conversation_text = await context_window.build(conversation_memory, user_id, thread_id)
 
-    # Save assistant reply
-    conversation_memory[user_id][thread_id].append({"role": "assistant", "content": result.final_output})
+    # Run agent, forwarding events as they arrive
+    upstream = []
+    with llm_request(user_id, "interactive", deadline), track_upstream(upstream):
+        result = Runner.run_streamed(get_agent(), conversation_text)
+    events = result.stream_events()
+    tool_names = {}
+    first_token = True
+    step = None
+    try:
+        while True:
+            # Each read is its own task, so a cancellation (client gone) lands
+            # here rather than inside stream_events(), which would swallow it
+            # and wait for the whole run to finish.
+            step = asyncio.ensure_future(events.__anext__())
+            try:
+                event = await asyncio.shield(step)
+            except StopAsyncIteration:
+                break
+            if event.type == "raw_response_event" and isinstance(event.data, ResponseTextDeltaEvent):
+                if first_token:
+                    _time_to_first_token.observe(time.perf_counter() - started)
+                    first_token = False
+                yield {"type": "delta", "text": event.data.delta}
+            elif event.type == "run_item_stream_event" and event.name == "tool_called":
+                raw = event.item.raw_item
+                name = getattr(raw, "name", "tool")
+                tool_names[getattr(raw, "call_id", None)] = name
+                yield {"type": "tool_call", "name": name, "arguments": getattr(raw, "arguments", "")}
+            elif event.type == "run_item_stream_event" and event.name == "tool_output":
+                raw = event.item.raw_item
+                call_id = raw.get("call_id") if isinstance(raw, dict) else getattr(raw, "call_id", None)
+                yield {"type": "tool_output", "name": tool_names.get(call_id, "tool")}
+    except (GeneratorExit, asyncio.CancelledError):
+        # Close the model's HTTP stream first, then cancel before closing
+        # the event stream: closing it waits for the run.
+        await close_upstream(upstream)
+        result.cancel()
+        _streams_cancelled.inc()
+        raise
+    except Exception:
+        result.cancel()
+        raise
+    finally:
+        if step is not None and not step.done():
+            step.cancel()
+            await asyncio.gather(step, return_exceptions=True)
+        await events.aclose()
 
-    yield result.final_output
+    _stream_duration.observe(time.perf_counter() - started)
+
+    # Save assistant reply
+    await run_in_db_pool(conversation_memory.append, user_id, thread_id, "assistant", str(result.final_output))
@@ -1,40 +1,69 @@
-from fastapi import APIRouter, HTTPException
-from backend.tools import (
-    get_total_students, get_students_by_department, 
-    get_recent_onboarded_students, get_active_students_last_7_days
-)
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from backend.auth_utils import get_current_admin
+from backend.analytics_store import analytics_snapshot
+from backend import metrics
 
-routers = APIRouter(tags=["Analytics"])
+routers = APIRouter(tags=["Analytics"], dependencies=[Depends(get_current_admin)])
+
+_not_modified = metrics.counter("analytics_not_modified_total", "Analytics requests answered with 304")
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match uses weak comparison: ``W/"x"`` matches ``"x"``. The
+    header may list several tags, or be ``*``."""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or _opaque(etag) in {_opaque(tag) for tag in tags}
+
+
+def _conditional(request: Request, response: Response, etag: str):
+    # Pollers send back the ETag they already have; answer 304 if nothing changed.
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        _not_modified.inc()
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    return None
 
 
 @routers.get("/analytics")
-def get_analytics():
+def get_analytics(request: Request, response: Response):
     try:
-        total_students = get_total_students()
-        students_by_dept = get_students_by_department()
-        recent_students = get_recent_onboarded_students(limit=5)
-        active_students = get_active_students_last_7_days()
+        snapshot, etag = analytics_snapshot.get()
+        not_modified = _conditional(request, response, etag)
+        if not_modified:
+            return not_modified
 
         return {
-            "total_students": total_students,
-            "students_by_department": students_by_dept,
-            "recent_students": recent_students,
-            "active_students_7_days": active_students
+            "total_students": {"total_students": snapshot["total_students"]},
+            "students_by_department": {"students_by_department": snapshot["students_by_department"]},
+            "recent_students": {"recent_students": snapshot["recent_students"]},
+            "active_students_7_days": {"active_last_7_days": snapshot["active_students_7_days"]}
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @routers.get("/analytics/summary")
-def get_analytics_summary():
+def get_analytics_summary(request: Request, response: Response):
     try:
-        total_students = get_total_students()
-        students_by_dept = get_students_by_department()
-        
+        snapshot, etag = analytics_snapshot.get()
+        not_modified = _conditional(request, response, etag)
+        if not_modified:
+            return not_modified
+
+        groups = snapshot["students_by_department"]
+        top = max(groups, key=lambda g: g["count"]) if groups else None
         return {
-            "total_students": total_students,
-            "departments": len(students_by_dept),
-            "top_department": max(students_by_dept.items(), key=lambda x: x[1])[0] if students_by_dept else "None"
+            "total_students": {"total_students": snapshot["total_students"]},
+            "departments": len(groups),
+            "top_department": top["_id"] if top else "None"
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,117 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from backend import data_versions, metrics
+from backend.background import PeriodicTask
+from backend.tools import (
+    get_total_students, get_students_by_department,
+    get_recent_onboarded_students, get_active_students_last_7_days
+)
+
+ANALYTICS_MAX_STALENESS_SECONDS = float(os.getenv("ANALYTICS_MAX_STALENESS_SECONDS", "30"))
+ANALYTICS_RECENT_LIMIT = int(os.getenv("ANALYTICS_RECENT_LIMIT", "5"))
+
+_refreshes = metrics.counter("analytics_refreshes_total", "Full analytics recomputations")
+_incremental = metrics.counter("analytics_incremental_updates_total", "Writes applied to the snapshot in place")
+
+
+class AnalyticsSnapshot:
+    """Dashboard numbers kept in memory.
+
+    Student writes in this worker are applied in place (counters and the
+    recent list); a background refresh recomputes everything at least every
+    ``max_staleness`` seconds to pick up writes made by other workers.
+    """
+
+    def __init__(self, max_staleness: float = ANALYTICS_MAX_STALENESS_SECONDS, recent_limit: int = ANALYTICS_RECENT_LIMIT):
+        self.max_staleness = max_staleness
+        self.recent_limit = recent_limit
+        self._lock = threading.Lock()
+        self._total = 0
+        self._by_department = {}
+        self._recent = []
+        self._active = []
+        self._loaded = False
+        self._dirty = True
+        self._refreshed_at = 0.0
+        self._etag = None
+        self._refresher = PeriodicTask("analytics-refresh", max_staleness, self.refresh)
+
+    def start(self):
+        self._refresher.start()
+
+    def stop(self):
+        self._refresher.stop(final_run=False)
+
+    def refresh(self):
+        version = data_versions.version("students")
+        total = get_total_students()["total_students"]
+        groups = get_students_by_department()["students_by_department"]
+        recent = get_recent_onboarded_students(limit=self.recent_limit)["recent_students"]
+        active = get_active_students_last_7_days()["active_last_7_days"]
+        with self._lock:
+            self._total = total
+            self._by_department = {g["_id"]: g["count"] for g in groups}
+            self._recent = recent
+            self._active = active
+            self._loaded = True
+            # A local write that raced with the queries may be missing; redo next read.
+            self._dirty = data_versions.version("students") != version
+            self._refreshed_at = time.monotonic()
+            self._etag = None
+        _refreshes.inc()
+
+    def apply_write(self, collection: str, op: str, payload: dict):
+        with self._lock:
+            if not self._loaded:
+                return
+            doc, before = payload.get("doc"), payload.get("before")
+            if op == "insert":
+                self._total += 1
+                self._bump(doc.get("department"), 1)
+                self._recent = ([doc] + self._recent)[:self.recent_limit]
+            elif op == "delete":
+                self._total -= 1
+                self._bump(doc.get("department"), -1)
+                if any(s["_id"] == doc["_id"] for s in self._recent):
+                    # The list needs a replacement row from the database.
+                    self._dirty = True
+            elif op == "update":
+                self._bump(before.get("department"), -1)
+                self._bump(doc.get("department"), 1)
+                self._recent = [doc if s["_id"] == doc["_id"] else s for s in self._recent]
+            else:
+                self._dirty = True
+            self._etag = None
+        _incremental.inc()
+
+    def get(self) -> tuple:
+        """Return ``(snapshot, etag)``, recomputing first if a write could not
+        be applied in place or the background refresh has fallen behind."""
+        if self._dirty or time.monotonic() - self._refreshed_at > self.max_staleness * 2:
+            self.refresh()
+        with self._lock:
+            groups = [{"_id": d, "count": c} for d, c in self._by_department.items()]
+            snapshot = {
+                "total_students": self._total,
+                "students_by_department": groups,
+                "recent_students": list(self._recent),
+                "active_students_7_days": list(self._active),
+            }
+            if self._etag is None:
+                body = json.dumps(snapshot, sort_keys=True, default=str).encode()
+                self._etag = f'W/"{hashlib.sha1(body).hexdigest()[:16]}"'
+            return snapshot, self._etag
+
+    def _bump(self, department, delta: int):
+        count = self._by_department.get(department, 0) + delta
+        if count > 0:
+            self._by_department[department] = count
+        else:
+            self._by_department.pop(department, None)
+
+
+analytics_snapshot = AnalyticsSnapshot()
+data_versions.subscribe("students", analytics_snapshot.apply_write)
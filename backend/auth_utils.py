@@ -1,10 +1,18 @@
 import os
 import jwt
+import time
+import asyncio
+import hashlib
 import datetime
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from passlib.context import CryptContext
-from backend.db import admins_collection
+from backend.db import admins_collection, run_in_db_pool
+from backend.resources import resources
+from backend import data_versions, metrics
 
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-this")
 ALGORITHM = "HS256"
@@ -12,24 +20,176 @@ ACCESS_TOKEN_EXPIRE_HOURS = int(os.getenv("ACCESS_TOKEN_EXPIRE_HOURS", "12"))
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="admin/login")
 
+# Verified tokens are remembered for at most AUTH_CACHE_TTL_SECONDS (and never
+# past their own exp), which also bounds how long an admin removed by another
+# worker keeps access.
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+
+_auth_hits = metrics.counter("auth_cache_hits_total", "Requests authenticated from the principal cache")
+_auth_misses = metrics.counter("auth_cache_misses_total", "Requests that decoded the token and looked up the admin")
+_auth_invalidations = metrics.counter("auth_cache_invalidations_total", "Cached principals dropped by revocation")
+
+# ----------------- Password Hashing -----------------
+# bcrypt holds a thread for 100-300ms, so it gets its own small pool instead
+# of the shared request threadpool. At most PASSWORD_HASH_QUEUE_LIMIT calls
+# may wait behind the running ones; beyond that callers are turned away.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_QUEUE_LIMIT = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", "32"))
+
+resources.register(
+    "password_executor",
+    lambda: ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt"),
+    close=lambda executor: executor.shutdown(wait=True),
+)
+_password_slots = threading.BoundedSemaphore(PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE_LIMIT)
+_password_inflight = 0
+_password_lock = threading.Lock()
+
+_password_seconds = metrics.histogram("password_hash_seconds", "Queue wait plus bcrypt time per hash or verify")
+_password_rejected = metrics.counter("password_hash_rejected_total", "Hash/verify calls rejected because the pool was saturated")
+_password_depth = metrics.gauge("password_hash_inflight", "Hash/verify calls running or queued")
+
+
+class PasswordPoolSaturated(Exception):
+    """The password pool already has its queue limit of calls waiting."""
+
+
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+def _track_inflight(delta: int):
+    global _password_inflight
+    with _password_lock:
+        _password_inflight += delta
+        _password_depth.set(_password_inflight)
+
+def _release_password_slot(_):
+    _track_inflight(-1)
+    _password_slots.release()
+
+async def _run_password_op(fn, *args):
+    if not _password_slots.acquire(blocking=False):
+        _password_rejected.inc()
+        raise PasswordPoolSaturated()
+    _track_inflight(1)
+    # The slot is released when the bcrypt call actually finishes, even if
+    # the request awaiting it was cancelled first.
+    future = resources.get("password_executor").submit(fn, *args)
+    future.add_done_callback(_release_password_slot)
+    with _password_seconds.time():
+        return await asyncio.wrap_future(future)
+
+async def hash_password_async(password: str) -> str:
+    return await _run_password_op(hash_password, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_password_op(verify_password, plain_password, hashed_password)
+
+def password_pool_status() -> dict:
+    limit = PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE_LIMIT
+    return {"workers": PASSWORD_HASH_WORKERS, "inflight": _password_inflight, "limit": limit,
+            "ok": _password_inflight < limit}
+
+# ----------------- Tokens -----------------
+
 def create_access_token(data: dict) -> str:
     to_encode = data.copy()
     expire = datetime.datetime.utcnow() + datetime.timedelta(hours=ACCESS_TOKEN_EXPIRE_HOURS)
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-def get_current_admin(token: str = Depends(oauth2_scheme)):
+class PrincipalCache:
+    """LRU of verified tokens: ``sha256(token) -> (email, valid_until)``.
+
+    Only the hash of a token is kept. ``valid_until`` is the earlier of the
+    token's ``exp`` and ``ttl`` seconds after verification.
+    """
+
+    def __init__(self, max_entries: int = AUTH_CACHE_MAX_ENTRIES, ttl: float = AUTH_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: str, email: str, exp: float):
+        with self._lock:
+            self._entries[key] = (email, min(exp, time.time() + self.ttl))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def revoke_token(self, token: str):
+        with self._lock:
+            if self._entries.pop(self.key(token), None) is not None:
+                _auth_invalidations.inc()
+
+    def invalidate_admin(self, email: str):
+        with self._lock:
+            stale = [k for k, (cached, _) in self._entries.items() if cached == email]
+            for k in stale:
+                del self._entries[k]
+        _auth_invalidations.inc(len(stale))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+principal_cache = PrincipalCache()
+
+
+def invalidate_admin(email: str):
+    """Forget every cached token of ``email``; call after deleting an admin or
+    changing their password. Writes reported through ``notify_write("admins",
+    ..., email=...)`` (signup does) do this automatically; changes made on
+    another worker or directly in Mongo apply once cached entries expire."""
+    principal_cache.invalidate_admin(email.lower().strip())
+
+
+def _on_admin_write(collection: str, op: str, payload: dict):
+    if payload.get("email"):
+        invalidate_admin(payload["email"])
+    else:
+        principal_cache.clear()
+
+
+data_versions.subscribe("admins", _on_admin_write)
+
+
+async def get_current_admin(token: str = Depends(oauth2_scheme)):
+    # Async so the cached path runs on the event loop; a sync dependency would
+    # pay a threadpool hop on every request.
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    key = principal_cache.key(token)
+    email = principal_cache.get(key)
+    if email is not None:
+        _auth_hits.inc()
+        return email
+    _auth_misses.inc()
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
@@ -38,7 +198,11 @@ def get_current_admin(token: str = Depends(oauth2_scheme)):
     except jwt.PyJWTError:
         raise credentials_exception
 
-    if admins_collection.find_one({"email": email}) is None:
+    version = data_versions.version("admins")
+    if await run_in_db_pool(admins_collection.find_one, {"email": email}, {"_id": 1}) is None:
         raise credentials_exception
 
+    # Skip caching if the admin was changed while we were looking them up.
+    if data_versions.version("admins") == version:
+        principal_cache.put(key, email, payload.get("exp", float("inf")))
     return email
@@ -0,0 +1,49 @@
+import threading
+
+class PeriodicTask:
+    """Runs ``fn`` every ``interval`` seconds on a daemon thread.
+
+    ``trigger()`` wakes the thread early (e.g. when a write buffer fills up)
+    and ``stop()`` runs ``fn`` one last time so buffered work is not lost.
+    """
+
+    def __init__(self, name: str, interval: float, fn):
+        self.name = name
+        self.interval = interval
+        self.fn = fn
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def trigger(self):
+        self._wake.set()
+
+    def stop(self, final_run: bool = True):
+        self._stopped.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval + 5)
+            self._thread = None
+        if final_run:
+            self._safe_run()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stopped.is_set():
+                break
+            self._safe_run()
+
+    def _safe_run(self):
+        try:
+            self.fn()
+        except Exception as e:
+            print(f"[{self.name}] background run failed, {e}")
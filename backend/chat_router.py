@@ -1,37 +1,96 @@
-from fastapi import APIRouter, HTTPException, Path
+import json
+import math
+from contextlib import aclosing
+import openai
+from fastapi import APIRouter, Depends, Header, HTTPException, Path, Query, Request
 from fastapi.responses import StreamingResponse
 from backend.models import ThreadCreate, ChatRequest
-from backend.agent import run_agent, stream_agent, conversation_memory
-from backend.db import db
+from backend.agent import run_agent, stream_agent, conversation_memory, response_cache
+from backend.db import db, run_in_db_pool
+from backend.auth_utils import get_current_admin
+from backend import metrics
+from backend.tool_cache import tool_cache
+from backend.llm_admission import admission, deadline_in, LLMUnavailable
+from backend.transcripts import transcript_store, TRANSCRIPT_PAGE_MAX, TRANSCRIPT_SEGMENT_TURNS
+from backend.pagination import encode_cursor, decode_cursor
 from datetime import datetime
 
-router = APIRouter(tags=["Chat"])
+router = APIRouter(tags=["Chat"], dependencies=[Depends(get_current_admin)])
+
+
+def sse_frame(data: str, event: str = None) -> str:
+    lines = [f"event: {event}"] if event else []
+    lines += [f"data: {line}" for line in data.split("\n")]
+    return "\n".join(lines) + "\n\n"
+
+def _model_unavailable(error: Exception):
+    """(status, message, retry_after) for errors that mean "the model could
+    not answer right now", else None."""
+    if isinstance(error, LLMUnavailable):
+        return error.status_code, str(error), error.retry_after
+    if isinstance(error, (openai.RateLimitError, openai.APIConnectionError)) or (
+            isinstance(error, openai.APIStatusError) and error.status_code >= 500):
+        return 503, "The model provider is unavailable, please retry shortly", 5.0
+    return None
+
 
 # Normal chat - no memory
 @router.post("/chat")
-async def chat(msg: ChatRequest):
+async def chat(
+    msg: ChatRequest,
+    admin: str = Depends(get_current_admin),
+    request_timeout: float = Header(None, alias="X-Request-Timeout", gt=0),
+    priority: str = Header("interactive", alias="X-Priority", pattern="^(interactive|batch)$"),
+):
+    # X-Request-Timeout (seconds) bounds queueing and model calls for this request;
+    # scripted clients can send X-Priority: batch to yield to people chatting.
     if not msg.message:
         raise HTTPException(status_code=400, detail="message is required")
     try:
-        response = await run_agent(msg.message)
+        response = await run_agent(msg.message, user=msg.user_id or admin,
+                                   deadline=deadline_in(request_timeout), priority=priority)
         return {"response": response}
     except Exception as e:
-        return {"response": f"Error: {str(e)}"}
+        unavailable = _model_unavailable(e)
+        if unavailable is None:
+            return {"response": f"Error: {str(e)}"}
+        status_code, detail, retry_after = unavailable
+        raise HTTPException(status_code=status_code, detail=detail,
+                            headers={"Retry-After": str(max(1, math.ceil(retry_after)))})
 
 
 @router.post("/chat/stream/{thread_id}")
-async def chat_stream(msg: ChatRequest, thread_id: str):
-    # Check if thread exists in DB
-    existing = db.threads.find_one({"user_id": msg.user_id, "thread_id": thread_id})
+async def chat_stream(msg: ChatRequest, thread_id: str, request: Request,
+                      request_timeout: float = Header(None, alias="X-Request-Timeout", gt=0)):
+    # Check the thread exists and pick up turns other workers appended to it
+    existing = await run_in_db_pool(conversation_memory.sync, msg.user_id, thread_id)
     if not existing:
         raise HTTPException(status_code=404, detail="Thread not found")
+    deadline = deadline_in(request_timeout)
 
     async def event_generator():
+        # Text deltas go out as plain data frames; tool progress as named events.
+        # Leaving the loop closes stream_agent, which cancels the agent run.
         try:
-            async for chunk in stream_agent(msg.message, user_id=msg.user_id, thread_id=thread_id):
-                yield f"data: {chunk}\n\n"
+            async with aclosing(stream_agent(msg.message, user_id=msg.user_id, thread_id=thread_id,
+                                             deadline=deadline)) as events:
+                async for event in events:
+                    if await request.is_disconnected():
+                        return
+                    if event["type"] == "delta":
+                        yield sse_frame(event["text"])
+                    else:
+                        yield sse_frame(json.dumps(event), event=event["type"])
+            yield sse_frame("[DONE]", event="done")
         except Exception as e:
-            yield f"data: [STREAM ERROR] {str(e)}\n\n"
+            unavailable = _model_unavailable(e)
+            if unavailable is None:
+                yield f"data: [STREAM ERROR] {str(e)}\n\n"
+            else:
+                # Headers are already sent, so the status goes in the event.
+                status_code, detail, retry_after = unavailable
+                yield sse_frame(json.dumps({"type": "error", "status": status_code, "message": detail,
+                                            "retry_after": retry_after}), event="error")
 
     return StreamingResponse(
         event_generator(),
@@ -54,13 +113,15 @@ def create_thread(thread: ThreadCreate):
     db.threads.insert_one({
         "user_id": thread.user_id,
         "thread_id": thread.thread_id,
-        "created_at": datetime.utcnow()
+        "created_at": datetime.utcnow(),
+        "messages": [],
+        "message_count": 0,
+        "transcript_turns": 0,
+        "transcript_segment_turns": TRANSCRIPT_SEGMENT_TURNS,
     })
 
-    # Initialize in-memory conversation
-    if thread.user_id not in conversation_memory:
-        conversation_memory[thread.user_id] = {}
-    conversation_memory[thread.user_id][thread.thread_id] = []
+    # Initialize conversation memory
+    conversation_memory.create(thread.user_id, thread.thread_id)
 
     return {"message": f"Thread {thread.thread_id} created for user {thread.user_id}"}
 
@@ -71,8 +132,84 @@ def delete_thread(user_id: str, thread_id: str):
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Thread not found")
 
-    # Also remove in-memory conversation
-    if user_id in conversation_memory and thread_id in conversation_memory[user_id]:
-        del conversation_memory[user_id][thread_id]
+    # Also remove the cached conversation and the transcript
+    conversation_memory.delete(user_id, thread_id)
+    transcript_store.delete(user_id, thread_id)
 
     return {"message": f"Thread {thread_id} deleted for user {user_id}"}
+
+
+@router.get("/threads")
+def list_threads(user_id: str, limit: int = Query(20, ge=1, le=100), cursor: str = None):
+    # Newest first; pass next_cursor back as cursor for the next page.
+    query = {"user_id": user_id}
+    if cursor:
+        try:
+            created_at, last_id = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        query["$or"] = [{"created_at": {"$lt": created_at}},
+                        {"created_at": created_at, "_id": {"$lt": last_id}}]
+    threads = list(db.threads.find(query, {"thread_id": 1, "created_at": 1, "transcript_turns": 1, "message_count": 1})
+                   .sort([("created_at", -1), ("_id", -1)]).limit(limit + 1))
+    next_cursor = encode_cursor(threads[limit - 1]) if len(threads) > limit else None
+    return {
+        "threads": [{"thread_id": t["thread_id"], "created_at": t.get("created_at"),
+                     "turns": t.get("transcript_turns", t.get("message_count", 0))} for t in threads[:limit]],
+        "next_cursor": next_cursor,
+    }
+
+
+@router.get("/threads/{thread_id}/history")
+def thread_history(thread_id: str, user_id: str, limit: int = Query(50, ge=1, le=TRANSCRIPT_PAGE_MAX),
+                   before: int = Query(None, ge=0)):
+    # Pages backwards from the latest turn; pass next_before back as before.
+    history = transcript_store.history(user_id, thread_id, limit, before)
+    if history is None:
+        raise HTTPException(status_code=404, detail="Thread not found")
+    return history
+
+
+@router.get("/threads/{thread_id}/export")
+def export_thread(thread_id: str, user_id: str, format: str = Query("ndjson", pattern="^(ndjson|text)$")):
+    if db.threads.find_one({"user_id": user_id, "thread_id": thread_id}, {"_id": 1}) is None:
+        raise HTTPException(status_code=404, detail="Thread not found")
+    # One segment is decompressed at a time, so long threads stream in flat memory.
+    turns = transcript_store.iter_turns(user_id, thread_id)
+    if format == "text":
+        lines = (f"[{t['at']}] {t['role']}: {t['content']}\n\n" for t in turns)
+        return StreamingResponse(lines, media_type="text/plain",
+                                 headers={"Content-Disposition": f"attachment; filename={thread_id}.txt"})
+    lines = (json.dumps(t) + "\n" for t in turns)
+    return StreamingResponse(lines, media_type="application/x-ndjson",
+                             headers={"Content-Disposition": f"attachment; filename={thread_id}.ndjson"})
+
+
+@router.get("/chat/memory/stats")
+def memory_stats():
+    return {**conversation_memory.stats(), **transcript_store.stats()}
+
+
+@router.get("/chat/stream/stats")
+def stream_stats():
+    return metrics.snapshot("chat_")
+
+
+@router.get("/chat/intents/stats")
+def intent_stats():
+    return metrics.snapshot("intent_router_")
+
+
+@router.get("/chat/cache/stats")
+def cache_stats():
+    return response_cache.stats()
+
+
+@router.get("/chat/llm/stats")
+def llm_stats():
+    return admission.stats()
+
+
+@router.get("/chat/tools/stats")
+def tool_stats():
+    return {"latency": metrics.snapshot("agent_tool_"), "cache": tool_cache.stats()}
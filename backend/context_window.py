@@ -0,0 +1,70 @@
+import os
+from backend.db import run_in_db_pool
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2000"))
+CONTEXT_SUMMARY_TOKENS = int(os.getenv("CONTEXT_SUMMARY_TOKENS", "400"))
+# When the window overflows, fold enough old turns to get back under this
+# share of the budget, so the summary is only recomputed every few turns.
+CONTEXT_FOLD_TARGET = float(os.getenv("CONTEXT_FOLD_TARGET", "0.5"))
+# "extractive" (local, no model call) or "llm" (summarize with the chat model).
+CONTEXT_SUMMARIZER = os.getenv("CONTEXT_SUMMARIZER", "extractive")
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token is close enough for budgeting without a tokenizer.
+    return len(text) // 4 + 1
+
+def render_message(message: dict) -> str:
+    return f"{message['role']}: {message['content']}"
+
+# ----------------- Summarizers -----------------
+async def extractive_summary(summary: str, messages: list, max_tokens: int) -> str:
+    """Cheap local summarizer: keeps the first sentence of each folded turn
+    and drops the oldest lines once the summary is over budget."""
+    lines = summary.splitlines() if summary else []
+    for m in messages:
+        first = m["content"].strip().split("\n", 1)[0]
+        first = first.split(". ", 1)[0][:160]
+        if first:
+            lines.append(f"{m['role']}: {first}")
+    while len(lines) > 1 and estimate_tokens("\n".join(lines)) > max_tokens:
+        lines.pop(0)
+    return "\n".join(lines)
+
+# ----------------- Context Window -----------------
+class ContextWindow:
+    """Builds a bounded prompt from a thread: a cached running summary of
+    older turns plus as many recent turns as fit in the token budget."""
+
+    def __init__(self, summarizer=extractive_summary, token_budget: int = CONTEXT_TOKEN_BUDGET,
+                 summary_tokens: int = CONTEXT_SUMMARY_TOKENS, fold_target: float = CONTEXT_FOLD_TARGET):
+        self.summarizer = summarizer
+        self.token_budget = token_budget
+        self.summary_tokens = summary_tokens
+        self.fold_target = fold_target
+
+    async def build(self, memory, user_id: str, thread_id: str) -> str:
+        # May reload the thread from Mongo, so off the event loop.
+        messages, start, summary, summary_upto = await run_in_db_pool(memory.window, user_id, thread_id)
+        live = messages[max(0, summary_upto - start):]
+        sizes = [estimate_tokens(render_message(m)) for m in live]
+        live_tokens = sum(sizes)
+
+        if live_tokens > self.token_budget:
+            # The window slides: fold the oldest turns into the summary once,
+            # then reuse that summary until the window overflows again.
+            target = int(self.token_budget * self.fold_target)
+            folded = 0
+            # Always keep the latest message (the question being answered).
+            while folded < len(live) - 1 and live_tokens > target:
+                live_tokens -= sizes[folded]
+                folded += 1
+            summary = await self.summarizer(summary, live[:folded], self.summary_tokens)
+            summary_upto = max(summary_upto, start) + folded
+            live = live[folded:]
+            await run_in_db_pool(memory.set_summary, user_id, thread_id, summary, summary_upto)
+
+        parts = []
+        if summary:
+            parts.append(f"Summary of earlier conversation:\n{summary}\n")
+        parts.extend(render_message(m) for m in live)
+        return "\n".join(parts)
@@ -0,0 +1,31 @@
+import threading
+from collections import defaultdict
+
+# Per-collection write counters plus write subscribers. Every write path in
+# tools.py calls notify_write(), so caches and derived views can tell what
+# changed without polling Mongo. Versions are per worker.
+_versions = defaultdict(int)
+_subscribers = defaultdict(list)
+_lock = threading.Lock()
+
+def version(collection: str) -> int:
+    return _versions[collection]
+
+def snapshot(collections=None) -> dict:
+    with _lock:
+        if collections is None:
+            return dict(_versions)
+        return {c: _versions[c] for c in collections}
+
+def subscribe(collection: str, fn):
+    """Call ``fn(collection, op, payload)`` after each write; ``"*"`` matches all."""
+    _subscribers[collection].append(fn)
+
+def notify_write(collection: str, op: str, **payload):
+    with _lock:
+        _versions[collection] += 1
+    for fn in _subscribers[collection] + _subscribers["*"]:
+        try:
+            fn(collection, op, payload)
+        except Exception as e:
+            print(f"Write subscriber {getattr(fn, '__name__', fn)} failed, {e}")
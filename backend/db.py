@@ -1,22 +1,109 @@
 from pymongo import MongoClient
+from pymongo.database import Database
 import os
+import time
+import asyncio
+import functools
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from backend.tracing import mongo_listener
+from backend.resources import resources, LazyProxy
 
 load_dotenv()
 
+DB_NAME = os.getenv("DB_NAME", "campus_admin_agent")
+
+# ----------------- Pool / Timeout Settings -----------------
+DB_MAX_POOL_SIZE = int(os.getenv("DB_MAX_POOL_SIZE", "50"))
+DB_MIN_POOL_SIZE = int(os.getenv("DB_MIN_POOL_SIZE", "0"))
+DB_TIMEOUT_MS = int(os.getenv("DB_TIMEOUT_MS", "5000"))
+DB_SOCKET_TIMEOUT_MS = int(os.getenv("DB_SOCKET_TIMEOUT_MS", "20000"))
+# Never run more executor threads than pooled connections, otherwise the
+# extra threads just queue inside pymongo's wait queue.
+DB_EXECUTOR_WORKERS = min(int(os.getenv("DB_EXECUTOR_WORKERS", str(DB_MAX_POOL_SIZE))), DB_MAX_POOL_SIZE)
+# /ready reports not ready once this many Mongo calls are waiting for a thread.
+DB_READY_MAX_QUEUED = int(os.getenv("DB_READY_MAX_QUEUED", str(DB_EXECUTOR_WORKERS * 4)))
+
 def db_uri():
     try:
-        client = MongoClient(os.getenv("DB_URI"))
-        print("DataBase connected successfully ")
+        client = MongoClient(
+            os.getenv("DB_URI"),
+            maxPoolSize=DB_MAX_POOL_SIZE,
+            minPoolSize=DB_MIN_POOL_SIZE,
+            serverSelectionTimeoutMS=DB_TIMEOUT_MS,
+            connectTimeoutMS=DB_TIMEOUT_MS,
+            waitQueueTimeoutMS=DB_TIMEOUT_MS,
+            socketTimeoutMS=DB_SOCKET_TIMEOUT_MS,
+            event_listeners=[mongo_listener],
+        )
+        # Nothing is sent to Mongo yet; the lifespan reports the first round trip.
         return client
     except Exception as e:
         print(f"Error connecting to DataBase, {e}")
-        return None
+        raise
+
+# ----------------- Lazy Handles -----------------
+# The client is created on first use in each worker process (see
+# backend.resources), not at import. These module-level names keep working
+# as before: they resolve to the real database and collections when used.
+resources.register("mongo", db_uri, close=lambda client: client.close())
+
+
+class LazyDatabase(LazyProxy):
+    """``db.<name>`` and ``db[name]`` give lazy collections; Database methods
+    (``command``, ``create_collection``, ...) go to the real database."""
+
+    __slots__ = ()
+
+    def __getattr__(self, name):
+        if name.startswith("_") or hasattr(Database, name):
+            return getattr(self._get(), name)
+        return self[name]
+
+    def __getitem__(self, name):
+        return LazyProxy(lambda: self._get()[name], name=f"{DB_NAME}.{name}")
 
-client = db_uri()
-db = client["campus_admin_agent"]
+
+client = LazyProxy(lambda: resources.get("mongo"), name="MongoClient")
+db = LazyDatabase(lambda: resources.get("mongo")[DB_NAME], name=DB_NAME)
 
 students_collection = db["students"]
 get_db = db["events"]
 admins_collection = db["admins"]
 threads_collection = db["threads"]
+transcripts_collection = db["thread_transcripts"]
+
+# ----------------- Async Adapter -----------------
+# pymongo calls block, so async code paths hand them to a dedicated pool
+# sized to the connection pool instead of running them on the event loop.
+resources.register(
+    "db_executor",
+    lambda: ThreadPoolExecutor(max_workers=DB_EXECUTOR_WORKERS, thread_name_prefix="mongo"),
+    close=lambda executor: executor.shutdown(wait=True),
+)
+
+async def run_in_db_pool(fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    # Carry the caller's context (request trace) onto the pool thread.
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        resources.get("db_executor"), functools.partial(context.run, fn, *args, **kwargs)
+    )
+
+
+def ping(timeout_ms: int = DB_TIMEOUT_MS) -> float:
+    """Round trip of a ``ping`` command in seconds; raises if Mongo is unreachable."""
+    start = time.perf_counter()
+    client.admin.command("ping", maxTimeMS=timeout_ms)
+    return time.perf_counter() - start
+
+
+def pool_status() -> dict:
+    """Queue state of the Mongo executor (created lazily, so it may not exist yet)."""
+    threads, queued = 0, 0
+    if resources.created("db_executor"):
+        executor = resources.get("db_executor")
+        threads, queued = len(executor._threads), executor._work_queue.qsize()
+    return {"workers": DB_EXECUTOR_WORKERS, "threads": threads, "queued": queued,
+            "max_queued": DB_READY_MAX_QUEUED, "ok": queued <= DB_READY_MAX_QUEUED}
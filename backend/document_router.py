@@ -0,0 +1,56 @@
+import os
+import shutil
+from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File
+from backend.auth_utils import get_current_admin
+from backend.rag_agent import document_index, RAG_DOCS_DIR, RAG_TOP_K, SUPPORTED_EXTENSIONS
+
+router = APIRouter(tags=["Documents"], dependencies=[Depends(get_current_admin)])
+
+
+@router.get("/documents")
+def list_documents():
+    return {"documents": document_index.documents(), "stats": document_index.stats()}
+
+
+@router.post("/documents")
+def ingest_document(file: UploadFile = File(...)):
+    # The upload is kept under RAG_DOCS_DIR so /documents/sync sees it too;
+    # uploading an unchanged file again is a hash check and nothing else.
+    name = os.path.basename(file.filename or "")
+    if not name.lower().endswith(SUPPORTED_EXTENSIONS):
+        raise HTTPException(status_code=400, detail=f"Supported file types: {', '.join(SUPPORTED_EXTENSIONS)}")
+    os.makedirs(RAG_DOCS_DIR, exist_ok=True)
+    path = os.path.join(RAG_DOCS_DIR, name)
+    tmp = path + ".upload"
+    try:
+        with open(tmp, "wb") as out:
+            shutil.copyfileobj(file.file, out, 1 << 20)
+        os.replace(tmp, path)
+        return document_index.ingest_file(path, name)
+    except Exception as e:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/documents/sync")
+def sync_documents():
+    try:
+        return document_index.sync_directory(RAG_DOCS_DIR)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/documents/search")
+def search_documents(q: str = Query(..., min_length=1), top_k: int = Query(RAG_TOP_K, ge=1, le=50)):
+    return {"query": q, "results": document_index.search(q, top_k)}
+
+
+@router.delete("/documents/{source:path}")
+def delete_document(source: str):
+    if not document_index.remove(source):
+        raise HTTPException(status_code=404, detail="Document not found")
+    path = os.path.join(RAG_DOCS_DIR, source)
+    if os.path.isfile(path):
+        os.remove(path)
+    return {"message": "Document removed", "source": source}
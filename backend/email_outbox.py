@@ -0,0 +1,274 @@
+import os
+import uuid
+import random
+import hashlib
+import smtplib
+import datetime
+from email.message import EmailMessage
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from backend.db import db
+from backend.background import PeriodicTask
+from backend import metrics
+
+# With no SMTP_HOST, messages are logged instead of sent (the old mock behaviour).
+SMTP_HOST = os.getenv("SMTP_HOST", "")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "25"))
+SMTP_USERNAME = os.getenv("SMTP_USERNAME", "")
+SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "")
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "false").lower() == "true"
+SMTP_TIMEOUT_SECONDS = float(os.getenv("SMTP_TIMEOUT_SECONDS", "10"))
+EMAIL_FROM = os.getenv("EMAIL_FROM", "campus-admin@localhost")
+EMAIL_DEFAULT_SUBJECT = os.getenv("EMAIL_DEFAULT_SUBJECT", "Message from Campus Administration")
+
+EMAIL_BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", "100"))
+EMAIL_DISPATCH_INTERVAL_SECONDS = float(os.getenv("EMAIL_DISPATCH_INTERVAL_SECONDS", "2.0"))
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "5"))
+EMAIL_RETRY_BASE_SECONDS = float(os.getenv("EMAIL_RETRY_BASE_SECONDS", "30"))
+EMAIL_RETRY_MAX_SECONDS = float(os.getenv("EMAIL_RETRY_MAX_SECONDS", "3600"))
+# A claimed batch not finished within this time (worker died mid-send) is picked up again.
+EMAIL_LEASE_SECONDS = float(os.getenv("EMAIL_LEASE_SECONDS", "300"))
+EMAIL_RETENTION_DAYS = int(os.getenv("EMAIL_RETENTION_DAYS", "30"))
+
+outbox_collection = db["email_outbox"]
+
+_queued = metrics.counter("email_queued_total", "Emails added to the outbox")
+_duplicates = metrics.counter("email_duplicates_total", "Emails skipped because their idempotency key was already queued")
+_sent = metrics.counter("email_sent_total", "Emails accepted by the SMTP server")
+_retried = metrics.counter("email_retries_total", "Send attempts that failed and were rescheduled")
+_failed = metrics.counter("email_failed_total", "Emails given up on")
+_batch_seconds = metrics.histogram("email_batch_seconds", "Time to claim, send and record one batch")
+
+# Outcome of a message left unsent because the server became unreachable:
+# it goes back to the queue without using up an attempt.
+_NOT_SENT = object()
+
+
+def idempotency_key(to: str, subject: str, body: str, key: str = None) -> str:
+    """Without an explicit ``key``, the same message to the same address on
+    the same (UTC) day is sent once, so a repeated tool call does not mail
+    a student twice."""
+    scope = key or datetime.datetime.utcnow().strftime("%Y-%m-%d")
+    return hashlib.sha256("\x1f".join((to.lower(), subject, body, scope)).encode()).hexdigest()
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff with jitter: about base * 2^(attempts-1), capped."""
+    delay = min(EMAIL_RETRY_MAX_SECONDS, EMAIL_RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def _permanent(error: Exception) -> bool:
+    # A 5xx for the recipient or the content will not succeed on retry.
+    # Anything else (4xx, connection, auth or config trouble) is retried.
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(500 <= code < 600 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPDataError):
+        return 500 <= error.smtp_code < 600
+    return False
+
+
+class EmailOutbox:
+    """Durable email queue in Mongo with a background dispatcher.
+
+    ``enqueue`` only inserts documents (one ``insert_many``); a unique
+    idempotency key makes re-enqueueing the same message a no-op. The
+    dispatcher claims due messages in batches under a lease (safe with
+    several workers), sends each batch over one SMTP connection, and
+    records the outcomes with one ``bulk_write``. Transient failures are
+    retried with exponential backoff; 5xx rejections and messages out of
+    attempts are marked ``failed``.
+    """
+
+    def __init__(self, batch_size: int = EMAIL_BATCH_SIZE, interval: float = EMAIL_DISPATCH_INTERVAL_SECONDS):
+        self.batch_size = batch_size
+        self._dispatcher = PeriodicTask("email-dispatcher", interval, self.dispatch)
+
+    def start(self):
+        self._dispatcher.start()
+
+    def stop(self):
+        # Queued mail is durable; the next worker to start sends it.
+        self._dispatcher.stop(final_run=False)
+
+    # ---- queue ----
+    def enqueue(self, messages: list) -> dict:
+        """Queue ``[{"to", "subject", "body", "student_id"?, "idempotency_key"?}]``.
+
+        Returns ``{"queued", "duplicates"}``."""
+        now = datetime.datetime.utcnow()
+        docs = [
+            {
+                "idempotency_key": idempotency_key(m["to"], m["subject"], m["body"], m.get("idempotency_key")),
+                "to": m["to"],
+                "student_id": m.get("student_id"),
+                "subject": m["subject"],
+                "body": m["body"],
+                "status": "pending",
+                "attempts": 0,
+                "created_at": now,
+                "next_attempt_at": now,
+            }
+            for m in messages
+        ]
+        if not docs:
+            return {"queued": 0, "duplicates": 0}
+        try:
+            queued = len(outbox_collection.insert_many(docs, ordered=False).inserted_ids)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            if any(err.get("code") != 11000 for err in errors):
+                raise
+            queued = e.details.get("nInserted", len(docs) - len(errors))
+        duplicates = len(docs) - queued
+        _queued.inc(queued)
+        _duplicates.inc(duplicates)
+        if queued:
+            self._dispatcher.trigger()
+        return {"queued": queued, "duplicates": duplicates}
+
+    def stats(self) -> dict:
+        counts = {doc["_id"]: doc["count"] for doc in outbox_collection.aggregate([
+            {"$group": {"_id": "$status", "count": {"$sum": 1}}},
+        ])}
+        return {
+            "smtp": f"{SMTP_HOST}:{SMTP_PORT}" if SMTP_HOST else "log only",
+            **{status: counts.get(status, 0) for status in ("pending", "sending", "sent", "failed")},
+            **metrics.snapshot("email_"),
+        }
+
+    def recent(self, status: str = None, limit: int = 50) -> list:
+        query = {"status": status} if status else {}
+        return [
+            {**doc, "_id": str(doc["_id"])}
+            for doc in outbox_collection.find(query, {"body": 0}).sort("created_at", -1).limit(int(limit))
+        ]
+
+    # ---- dispatch ----
+    def _claim(self) -> list:
+        now = datetime.datetime.utcnow()
+        due = {"$or": [
+            {"status": "pending", "next_attempt_at": {"$lte": now}},
+            {"status": "sending", "lease_until": {"$lt": now}},
+        ]}
+        ids = [doc["_id"] for doc in outbox_collection.find(due, {"_id": 1}).sort("next_attempt_at", 1).limit(self.batch_size)]
+        if not ids:
+            return []
+        owner = uuid.uuid4().hex
+        # Re-checking `due` in the update means a message another worker
+        # claimed in the meantime is not taken twice.
+        outbox_collection.update_many(
+            {"_id": {"$in": ids}, **due},
+            {"$set": {"status": "sending", "lease_owner": owner,
+                      "lease_until": now + datetime.timedelta(seconds=EMAIL_LEASE_SECONDS)}},
+        )
+        return list(outbox_collection.find({"lease_owner": owner, "status": "sending"}))
+
+    def dispatch(self):
+        """Send due messages until none are left, reusing one SMTP connection."""
+        smtp = None
+        try:
+            while True:
+                with _batch_seconds.time():
+                    batch = self._claim()
+                    if not batch:
+                        return
+                    smtp, outcomes = self._send_batch(smtp, batch)
+                    self._record(batch, outcomes)
+                if len(batch) < self.batch_size or (SMTP_HOST and smtp is None):
+                    # Drained, or the server is unreachable: wait for the next run.
+                    return
+        finally:
+            if smtp is not None:
+                try:
+                    smtp.quit()
+                except OSError:
+                    smtp.close()
+
+    def _connect(self):
+        smtp = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT_SECONDS)
+        try:
+            if SMTP_STARTTLS:
+                smtp.starttls()
+            if SMTP_USERNAME:
+                smtp.login(SMTP_USERNAME, SMTP_PASSWORD)
+        except Exception:
+            smtp.close()
+            raise
+        return smtp
+
+    def _send_batch(self, smtp, batch: list):
+        """Returns the (possibly reconnected) connection and one error (or
+        None, or ``_NOT_SENT``) per message."""
+        outcomes = []
+        for doc in batch:
+            if not SMTP_HOST:
+                print(f"[EMAIL MOCK] to={doc['to']} subject={doc['subject']} message={doc['body']}")
+                outcomes.append(None)
+                continue
+            error = None
+            # A server that dropped an idle connection gets one reconnect.
+            for _ in range(2):
+                try:
+                    if smtp is None:
+                        smtp = self._connect()
+                    smtp.send_message(self._message(doc))
+                    error = None
+                    break
+                except (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError) as e:
+                    error = e
+                except smtplib.SMTPException as e:
+                    # This message was rejected; the connection is still usable.
+                    error = e
+                    break
+                except OSError as e:
+                    error = e
+                if smtp is not None:
+                    smtp.close()
+                smtp = None
+            outcomes.append(error)
+            if smtp is None:
+                # Server unreachable: leave the rest of the batch for the next run.
+                outcomes += [_NOT_SENT] * (len(batch) - len(outcomes))
+                break
+        return smtp, outcomes
+
+    @staticmethod
+    def _message(doc: dict) -> EmailMessage:
+        message = EmailMessage()
+        message["From"] = EMAIL_FROM
+        message["To"] = doc["to"]
+        message["Subject"] = doc["subject"]
+        # Stable per idempotency key, so receivers can drop a resend after a lost ack.
+        message["Message-ID"] = f"<{doc['idempotency_key']}@campus-admin>"
+        message.set_content(doc["body"])
+        return message
+
+    def _record(self, batch: list, outcomes: list):
+        now = datetime.datetime.utcnow()
+        expire_at = now + datetime.timedelta(days=EMAIL_RETENTION_DAYS)
+        ops = []
+        for doc, error in zip(batch, outcomes):
+            attempts = doc["attempts"] + 1
+            release = {"lease_owner": "", "lease_until": ""}
+            if error is _NOT_SENT:
+                update = {"$set": {"status": "pending"}, "$unset": release}
+            elif error is None:
+                _sent.inc()
+                update = {"$set": {"status": "sent", "attempts": attempts, "sent_at": now, "expire_at": expire_at},
+                          "$unset": release}
+            elif _permanent(error) or attempts >= EMAIL_MAX_ATTEMPTS:
+                _failed.inc()
+                update = {"$set": {"status": "failed", "attempts": attempts, "last_error": str(error),
+                                   "expire_at": expire_at}, "$unset": release}
+            else:
+                _retried.inc()
+                update = {"$set": {"status": "pending", "attempts": attempts, "last_error": str(error),
+                                   "next_attempt_at": now + datetime.timedelta(seconds=retry_delay(attempts))},
+                          "$unset": release}
+            ops.append(UpdateOne({"_id": doc["_id"], "lease_owner": doc["lease_owner"]}, update))
+        if ops:
+            outbox_collection.bulk_write(ops, ordered=False)
+
+
+email_outbox = EmailOutbox()
@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from backend.auth_utils import get_current_admin
+from backend.models import EmailStudentsRequest
+from backend.email_outbox import email_outbox, EMAIL_DEFAULT_SUBJECT
+from backend.tools import email_students
+
+router = APIRouter(tags=["Email"], dependencies=[Depends(get_current_admin)])
+
+
+@router.post("/emails")
+def queue_bulk_email(request: EmailStudentsRequest):
+    # Same as the agent's email_students tool: queued now, sent in the background.
+    result = email_students(
+        request.message, request.subject or EMAIL_DEFAULT_SUBJECT,
+        request.department, request.created_from, request.created_to,
+    )
+    if "error" in result:
+        raise HTTPException(status_code=400, detail=result["error"])
+    return result
+
+
+@router.get("/emails")
+def list_emails(status: str = Query(None, pattern="^(pending|sending|sent|failed)$"),
+                limit: int = Query(50, ge=1, le=500)):
+    return {"emails": email_outbox.recent(status, limit)}
+
+
+@router.get("/emails/stats")
+def email_stats():
+    return email_outbox.stats()
@@ -0,0 +1,49 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from backend.auth_utils import get_current_admin
+from backend.models import EventCreate, EventUpdate
+from backend.tools import add_event, update_event, delete_event, list_events, upcoming_events, EVENT_PAGE_MAX
+
+router = APIRouter(tags=["Events"], dependencies=[Depends(get_current_admin)])
+
+
+def _raise_on_error(result: dict, status_code: int = 400) -> dict:
+    if "error" in result:
+        raise HTTPException(status_code=status_code, detail=result["error"])
+    return result
+
+
+@router.post("/events")
+def create_event(event: EventCreate):
+    return _raise_on_error(add_event(event.name, event.date, event.location, event.end_date))
+
+
+@router.get("/events")
+def get_events(
+    date_from: str = None,
+    date_to: str = None,
+    location: str = None,
+    limit: int = Query(50, ge=1, le=EVENT_PAGE_MAX),
+    cursor: str = None,
+):
+    # Events starting in [date_from, date_to], in start order; pass next_cursor for the next page.
+    return _raise_on_error(list_events(date_from, date_to, location, limit, cursor))
+
+
+@router.get("/events/upcoming")
+def get_upcoming_events(
+    days: int = Query(7, ge=0, le=366),
+    location: str = None,
+    limit: int = Query(20, ge=1, le=EVENT_PAGE_MAX),
+):
+    return upcoming_events(days, location, limit)
+
+
+@router.patch("/events/{event_id}")
+def edit_event(event_id: str, event: EventUpdate):
+    result = update_event(event_id, event.name, event.date, event.location, event.end_date)
+    return _raise_on_error(result, 404 if result.get("error") == "Event not found" else 400)
+
+
+@router.delete("/events/{event_id}")
+def remove_event(event_id: str):
+    return _raise_on_error(delete_event(event_id), 404)
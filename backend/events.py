@@ -0,0 +1,64 @@
+import datetime
+from typing import Dict, Any
+
+# Formats accepted besides ISO 8601 (which covers "2025-03-01" and "2025-03-01 14:00").
+_EXTRA_FORMATS = ("%d/%m/%Y", "%d/%m/%Y %H:%M", "%B %d, %Y", "%B %d %Y", "%d %B %Y", "%b %d, %Y", "%b %d %Y", "%d %b %Y")
+
+
+def parse_event_time(value) -> datetime.datetime:
+    """Parse an event date/time into a naive local datetime.
+
+    Raises ``ValueError`` for anything it cannot read, so callers can reject
+    the input instead of storing a string no range query will match."""
+    if isinstance(value, datetime.datetime):
+        parsed = value
+    elif isinstance(value, datetime.date):
+        parsed = datetime.datetime.combine(value, datetime.time())
+    else:
+        text = str(value).strip()
+        try:
+            parsed = datetime.datetime.fromisoformat(text.replace("Z", "+00:00"))
+        except ValueError:
+            for fmt in _EXTRA_FORMATS:
+                try:
+                    parsed = datetime.datetime.strptime(text, fmt)
+                    break
+                except ValueError:
+                    continue
+            else:
+                raise ValueError(f"Unrecognized date {text!r}; use YYYY-MM-DD or YYYY-MM-DDTHH:MM")
+    if parsed.tzinfo is not None:
+        # Stored like students' created_at: naive, in the server's local time.
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+
+def _is_date_only(value) -> bool:
+    if isinstance(value, datetime.datetime):
+        return False
+    return isinstance(value, datetime.date) or len(str(value).strip()) == 10
+
+
+def location_key(location: str) -> str:
+    # Indexed, case-insensitive match key ("Main Hall" == "main hall ").
+    return " ".join(str(location).lower().split())
+
+
+def event_filter(date_from=None, date_to=None, location: str = None) -> Dict[str, Any]:
+    """Events starting in ``[date_from, date_to]``, optionally at ``location``.
+
+    A date-only ``date_to`` includes that whole day."""
+    query = {}
+    if location:
+        query["location_key"] = location_key(location)
+    if date_from or date_to:
+        query["starts_at"] = {}
+        if date_from:
+            query["starts_at"]["$gte"] = parse_event_time(date_from)
+        if date_to:
+            end = parse_event_time(date_to)
+            if _is_date_only(date_to):
+                query["starts_at"]["$lt"] = end + datetime.timedelta(days=1)
+            else:
+                query["starts_at"]["$lte"] = end
+    return query
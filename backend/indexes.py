@@ -0,0 +1,139 @@
+import datetime
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from pymongo.errors import OperationFailure
+from backend.db import db
+from backend.activity import ACTIVITY_RETENTION_DAYS
+from backend.events import parse_event_time, location_key
+from backend.transcripts import TranscriptStore
+
+# (collection, keys, options)
+INDEXES = [
+    ("students", [("email", ASCENDING)], {"name": "email_unique", "unique": True}),
+    ("students", [("student_id", ASCENDING)], {"name": "student_id_unique", "unique": True}),
+    ("students", [("created_at", DESCENDING), ("_id", DESCENDING)], {"name": "created_at_id_desc"}),
+    ("students", [("department", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+     {"name": "department_created_at_id"}),
+    ("threads", [("user_id", ASCENDING), ("thread_id", ASCENDING)], {"name": "user_thread_unique", "unique": True}),
+    ("threads", [("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+     {"name": "user_created_at_id"}),
+    ("thread_transcripts", [("user_id", ASCENDING), ("thread_id", ASCENDING), ("seq", ASCENDING)],
+     {"name": "user_thread_seq_unique", "unique": True}),
+    ("admins", [("email", ASCENDING)], {"name": "email_unique", "unique": True}),
+    ("student_activity_daily", [("day", ASCENDING), ("student_id", ASCENDING)], {"name": "day_student_unique", "unique": True}),
+    ("student_activity_daily", [("expire_at", ASCENDING)], {"name": "expire_at_ttl", "expireAfterSeconds": 0}),
+    ("events", [("starts_at", ASCENDING), ("_id", ASCENDING)], {"name": "starts_at_id"}),
+    ("events", [("location_key", ASCENDING), ("starts_at", ASCENDING), ("_id", ASCENDING)],
+     {"name": "location_starts_at_id"}),
+    ("email_outbox", [("idempotency_key", ASCENDING)], {"name": "idempotency_key_unique", "unique": True}),
+    ("email_outbox", [("status", ASCENDING), ("next_attempt_at", ASCENDING)], {"name": "status_next_attempt"}),
+    ("email_outbox", [("lease_owner", ASCENDING)], {"name": "lease_owner", "sparse": True}),
+    ("email_outbox", [("created_at", DESCENDING)], {"name": "created_at_desc"}),
+    ("email_outbox", [("expire_at", ASCENDING)], {"name": "expire_at_ttl", "expireAfterSeconds": 0}),
+]
+
+def ensure_activity_collection(database=db):
+    # Raw activity lives in a time-series collection: Mongo buckets events by
+    # student and time and drops them after the retention window.
+    if "student_activity" in database.list_collection_names():
+        return
+    try:
+        database.create_collection(
+            "student_activity",
+            timeseries={"timeField": "ts", "metaField": "student_id", "granularity": "minutes"},
+            expireAfterSeconds=ACTIVITY_RETENTION_DAYS * 86400,
+        )
+    except Exception as e:
+        # Servers (or stand-ins) without time-series support get a plain TTL collection.
+        print(f"Time-series collection unavailable, using TTL index instead, {e}")
+        database["student_activity"].create_index(
+            [("ts", ASCENDING)], name="ts_ttl", expireAfterSeconds=ACTIVITY_RETENTION_DAYS * 86400
+        )
+
+def normalize_student_ids(database=db) -> int:
+    # Older rows were written with integer ids; lookups only match strings now.
+    result = database["students"].update_many(
+        {"student_id": {"$type": "number"}},
+        [{"$set": {"student_id": {"$toString": "$student_id"}}}],
+    )
+    return result.modified_count
+
+def normalize_event_dates(database=db, batch: int = 1000) -> tuple:
+    """Give events stored with a free-form ``date`` string typed
+    ``starts_at``/``ends_at`` and a ``location_key``. Returns (converted,
+    unparseable); unparseable events are left as they are."""
+    converted, unparseable, ops = 0, 0, []
+    legacy = database["events"].find({"starts_at": {"$exists": False}}, {"date": 1, "location": 1})
+    for event in legacy:
+        try:
+            starts_at = parse_event_time(event.get("date") or "")
+        except ValueError:
+            unparseable += 1
+            continue
+        ops.append(UpdateOne({"_id": event["_id"]}, {"$set": {
+            "starts_at": starts_at, "ends_at": starts_at, "location_key": location_key(event.get("location") or ""),
+        }}))
+        if len(ops) >= batch:
+            converted += database["events"].bulk_write(ops, ordered=False).modified_count
+            ops = []
+    if ops:
+        converted += database["events"].bulk_write(ops, ordered=False).modified_count
+    return converted, unparseable
+
+def backfill_transcripts(database=db) -> int:
+    """Copy the messages stored on threads from before transcripts into
+    their transcript (only the last ``MEMORY_MAX_TURNS`` were kept, so
+    older turns are gone). Returns the number of threads copied."""
+    store = TranscriptStore(database["threads"], database["thread_transcripts"])
+    copied = 0
+    unclaimed = {"transcript_turns": {"$exists": False}, "transcript_backfill": {"$exists": False}}
+    legacy = database["threads"].find({**unclaimed, "messages.0": {"$exists": True}}, {"_id": 1})
+    for candidate in legacy:
+        # Every worker runs this at startup: claim the thread first so two
+        # starting together do not both copy it.
+        thread = database["threads"].find_one_and_update(
+            {"_id": candidate["_id"], **unclaimed}, {"$set": {"transcript_backfill": True}},
+            projection={"user_id": 1, "thread_id": 1, "messages": 1, "created_at": 1},
+        )
+        if thread is None:
+            continue
+        created_at = thread.get("created_at")
+        at = created_at.replace(tzinfo=datetime.timezone.utc).timestamp() if created_at else None
+        for message in thread["messages"]:
+            store.add(thread["user_id"], thread["thread_id"], message.get("role"), message.get("content"), at)
+        store.flush()
+        database["threads"].update_one({"_id": thread["_id"]}, {"$unset": {"transcript_backfill": ""}})
+        copied += 1
+    return copied
+
+def ensure_indexes(database=db):
+    try:
+        converted = normalize_student_ids(database)
+        if converted:
+            print(f"Normalized student_id type on {converted} students")
+    except OperationFailure as e:
+        print(f"Could not normalize student ids, {e}")
+
+    try:
+        converted, unparseable = normalize_event_dates(database)
+        if converted or unparseable:
+            print(f"Parsed dates on {converted} events ({unparseable} unreadable, left out of date queries)")
+    except OperationFailure as e:
+        print(f"Could not normalize event dates, {e}")
+
+    try:
+        copied = backfill_transcripts(database)
+        if copied:
+            print(f"Copied stored messages of {copied} threads into transcripts")
+    except OperationFailure as e:
+        print(f"Could not backfill thread transcripts, {e}")
+
+    try:
+        ensure_activity_collection(database)
+    except OperationFailure as e:
+        print(f"Could not create activity collection, {e}")
+
+    for collection, keys, options in INDEXES:
+        try:
+            database[collection].create_index(keys, **options)
+        except OperationFailure as e:
+            print(f"Could not create index {options['name']} on {collection}, {e}")
@@ -0,0 +1,93 @@
+import os
+import re
+from backend.tools import get_total_students_async, list_students_async, get_students_by_department_async
+from backend import metrics
+
+INTENT_CONFIDENCE_THRESHOLD = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.75"))
+INTENT_ROUTER_ENABLED = os.getenv("INTENT_ROUTER_ENABLED", "true").lower() == "true"
+
+_hits = metrics.counter("intent_router_hits_total", "Messages answered directly by the intent router")
+_fallbacks = metrics.counter("intent_router_fallbacks_total", "Messages passed on to the agent")
+_latency = metrics.histogram("intent_router_answer_seconds", "Time to answer a routed message")
+
+_WORD = re.compile(r"[a-z0-9]+")
+_FILLER = {
+    "please", "can", "could", "would", "you", "me", "the", "a", "an", "of", "all", "our", "we", "do",
+    "have", "there", "are", "is", "what", "whats", "s", "tell", "show", "give", "get", "in", "current",
+    "currently", "campus", "enrolled", "registered", "now", "just", "hey", "hi",
+}
+
+# ----------------- Formatting -----------------
+def _format_total(result: dict) -> str:
+    total = result["total_students"]
+    return "There is 1 student in total." if total == 1 else f"There are {total} students in total."
+
+def _format_list(result: dict) -> str:
+    students = result["students"]
+    if not students:
+        return "There are no students yet."
+    lines = [f"- {s['name']} ({s['student_id']}), {s['department']}, {s['email']}" for s in students]
+    if result.get("next_cursor"):
+        return f"The {len(students)} most recently added students:\n" + "\n".join(lines)
+    return f"Students ({len(students)}):\n" + "\n".join(lines)
+
+def _format_by_department(result: dict) -> str:
+    groups = sorted(result["students_by_department"], key=lambda g: g["count"], reverse=True)
+    if not groups:
+        return "There are no students yet."
+    lines = [f"- {g['_id'] or 'Unassigned'}: {g['count']}" for g in groups]
+    return "Students by department:\n" + "\n".join(lines)
+
+# ----------------- Intents -----------------
+# name, trigger phrases, tool, formatter. Confidence is the best phrase match
+# discounted by any words the phrase does not explain.
+INTENTS = [
+    ("total_students", ["how many students", "student count", "count students", "number of students",
+                        "total students", "total number of students"], get_total_students_async, _format_total),
+    ("list_students", ["list students", "show students", "list all students", "all students",
+                       "list the students"], list_students_async, _format_list),
+    ("students_by_department", ["students by department", "students per department", "department wise students",
+                                "students in each department", "department breakdown"],
+     get_students_by_department_async, _format_by_department),
+]
+
+def _stems(text: str) -> list:
+    # Crude plural folding so "student"/"students" match the same phrase.
+    return [w.rstrip("s") or w for w in _WORD.findall(text.lower()) if w not in _FILLER]
+
+_PHRASES = [(intent, _stems(phrase)) for intent in INTENTS for phrase in intent[1]]
+
+def match_intent(message: str):
+    """Return ``(intent, confidence)`` for the best matching intent, or ``(None, 0.0)``."""
+    stems = _stems(message)
+    if not stems or len(stems) > 8:
+        return None, 0.0
+    best, best_score = None, 0.0
+    for intent, phrase in _PHRASES:
+        if not all(w in stems for w in phrase):
+            continue
+        # Every word the phrase doesn't explain lowers confidence, so
+        # "list students in CS with gpa above 3" goes to the agent instead.
+        extra = len([w for w in stems if w not in phrase])
+        score = 1.0 / (1 + 0.5 * extra)
+        if score > best_score:
+            best, best_score = intent, score
+    return best, best_score
+
+async def try_answer(message: str, threshold: float = None):
+    """Answer simple data questions straight from the tools.
+
+    Returns the reply text, or None when the agent should handle the message.
+    """
+    if not INTENT_ROUTER_ENABLED:
+        return None
+    threshold = INTENT_CONFIDENCE_THRESHOLD if threshold is None else threshold
+    intent, confidence = match_intent(message)
+    if intent is None or confidence < threshold:
+        _fallbacks.inc()
+        return None
+    with _latency.time():
+        _, _, tool, formatter = intent
+        reply = formatter(await tool())
+    _hits.inc()
+    return reply
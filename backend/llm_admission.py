@@ -0,0 +1,331 @@
+import os
+import time
+import heapq
+import random
+import asyncio
+import itertools
+import contextvars
+from contextlib import contextmanager
+import openai
+from agents import OpenAIChatCompletionsModel
+from backend import metrics
+
+LLM_ADMISSION_ENABLED = os.getenv("LLM_ADMISSION_ENABLED", "true").lower() == "true"
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_MAX_PER_USER = int(os.getenv("LLM_MAX_PER_USER", "2"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "256"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE_SECONDS", "0.5"))
+LLM_RETRY_MAX_SECONDS = float(os.getenv("LLM_RETRY_MAX_SECONDS", "8"))
+# Used when the HTTP request does not ask for a shorter deadline.
+LLM_DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", "60"))
+
+# Lower runs first: people waiting on a chat answer go ahead of background work.
+PRIORITIES = {"interactive": 0, "batch": 1}
+
+_queue_depth = {p: metrics.gauge("llm_queue_depth", "Model calls waiting for a slot", priority=p) for p in PRIORITIES}
+_queue_wait = {p: metrics.histogram("llm_queue_wait_seconds", "Time a model call waited for a slot", priority=p)
+               for p in PRIORITIES}
+_in_flight = metrics.gauge("llm_in_flight", "Model calls holding a slot")
+_rejected_full = metrics.counter("llm_rejected_total", "Model calls refused before running", reason="queue_full")
+_rejected_deadline = metrics.counter("llm_rejected_total", "Model calls refused before running", reason="deadline")
+_deadline_exceeded = metrics.counter("llm_deadline_exceeded_total", "Model calls cut off by the request deadline")
+
+
+class LLMUnavailable(Exception):
+    """The model call was not made (or was cut off); ``status_code`` and
+    ``retry_after`` say how the HTTP layer should answer."""
+    status_code = 503
+
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LLMOverloaded(LLMUnavailable):
+    status_code = 503
+
+
+class LLMDeadlineExceeded(LLMUnavailable):
+    status_code = 504
+
+
+# ----------------- Request context -----------------
+# Who is asking, how urgent it is and when the HTTP request gives up. Set by
+# the chat entry points; tasks the agent SDK starts inherit it.
+_context = contextvars.ContextVar("llm_request", default=(None, "interactive", None))
+
+
+@contextmanager
+def llm_request(user: str = None, priority: str = None, deadline: float = None):
+    """Scope for model calls. ``deadline`` is an event-loop time
+    (``loop.time()``); unset fields keep the enclosing scope's values."""
+    outer_user, outer_priority, outer_deadline = _context.get()
+    if deadline is not None and outer_deadline is not None:
+        deadline = min(deadline, outer_deadline)
+    token = _context.set((user or outer_user, priority or outer_priority,
+                          deadline if deadline is not None else outer_deadline))
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+def deadline_in(seconds: float = None) -> float:
+    seconds = LLM_DEADLINE_SECONDS if seconds is None else min(float(seconds), LLM_DEADLINE_SECONDS)
+    return asyncio.get_running_loop().time() + max(0.0, seconds)
+
+
+def _remaining(deadline: float) -> float:
+    if deadline is None:
+        deadline = deadline_in()
+    return deadline - asyncio.get_running_loop().time()
+
+
+# ----------------- Admission -----------------
+class AdmissionController:
+    """Global and per-user caps on concurrent model calls, with a priority
+    queue in front of them.
+
+    A call gets a slot when fewer than ``max_concurrency`` are running and
+    its user has fewer than ``max_per_user``; otherwise it waits in the
+    queue (priority, then arrival order) until its deadline. A waiter whose
+    user is at the cap is skipped, not blocking the users behind it. Lives
+    on the worker's event loop; no locking needed.
+    """
+
+    def __init__(self, max_concurrency: int = LLM_MAX_CONCURRENCY, max_per_user: int = LLM_MAX_PER_USER,
+                 max_queue: int = LLM_MAX_QUEUE):
+        self.max_concurrency = max_concurrency
+        self.max_per_user = max_per_user
+        self.max_queue = max_queue
+        self._running = 0
+        self._per_user = {}
+        self._queue = []
+        self._seq = itertools.count()
+
+    def _can_run(self, user) -> bool:
+        return self._running < self.max_concurrency and (
+            user is None or self._per_user.get(user, 0) < self.max_per_user)
+
+    def _take(self, user):
+        self._running += 1
+        if user is not None:
+            self._per_user[user] = self._per_user.get(user, 0) + 1
+        _in_flight.set(self._running)
+
+    async def acquire(self, user, priority: str, deadline: float):
+        if len(self._queue) >= self.max_queue:
+            _rejected_full.inc()
+            raise LLMOverloaded("The assistant is busy, please retry shortly", retry_after=2.0)
+        remaining = _remaining(deadline)
+        if remaining <= 0:
+            _rejected_deadline.inc()
+            raise LLMDeadlineExceeded("Request deadline passed before the model call started")
+        future = asyncio.get_running_loop().create_future()
+        entry = [PRIORITIES[priority], next(self._seq), user, future]
+        heapq.heappush(self._queue, entry)
+        # Runs at once if a slot is free and nobody more urgent is eligible.
+        self._dispatch()
+        if future.done():
+            _queue_wait[priority].observe(0.0)
+            return
+        depth = _queue_depth[priority]
+        depth.set(depth.value + 1)
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), remaining)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done():
+                # Granted just as we gave up: hand the slot back.
+                self.release(user)
+            else:
+                future.cancel()
+                self._queue.remove(entry)
+                heapq.heapify(self._queue)
+            if isinstance(e, asyncio.TimeoutError):
+                _rejected_deadline.inc()
+                raise LLMDeadlineExceeded("Timed out waiting for the model, please retry", retry_after=2.0)
+            raise
+        finally:
+            depth.set(depth.value - 1)
+        _queue_wait[priority].observe(time.perf_counter() - started)
+
+    def release(self, user):
+        self._running -= 1
+        if user is not None:
+            count = self._per_user.get(user, 1) - 1
+            if count:
+                self._per_user[user] = count
+            else:
+                self._per_user.pop(user, None)
+        self._dispatch()
+        _in_flight.set(self._running)
+
+    def _dispatch(self):
+        blocked = []
+        while self._queue and self._running < self.max_concurrency:
+            entry = heapq.heappop(self._queue)
+            user, future = entry[2], entry[3]
+            if future.done():
+                continue
+            if not self._can_run(user):
+                blocked.append(entry)
+                continue
+            self._take(user)
+            future.set_result(None)
+        for entry in blocked:
+            heapq.heappush(self._queue, entry)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": LLM_ADMISSION_ENABLED,
+            "in_flight": self._running,
+            "queued": len(self._queue),
+            "max_concurrency": self.max_concurrency,
+            "max_per_user": self.max_per_user,
+            "users_in_flight": len(self._per_user),
+            **metrics.snapshot("llm_"),
+        }
+
+
+admission = AdmissionController()
+
+
+# ----------------- Retry -----------------
+def _retry_reason(error: Exception):
+    if isinstance(error, openai.RateLimitError):
+        return "429"
+    if isinstance(error, openai.APIStatusError) and error.status_code >= 500:
+        return "5xx"
+    if isinstance(error, openai.APITimeoutError):
+        return "timeout"
+    if isinstance(error, openai.APIConnectionError):
+        return "connection"
+    return None
+
+
+def retry_delay(attempt: int, error: Exception = None) -> float:
+    """Full-jitter exponential backoff; a server's Retry-After is a floor."""
+    delay = random.uniform(0, min(LLM_RETRY_MAX_SECONDS, LLM_RETRY_BASE_SECONDS * 2 ** attempt))
+    response = getattr(error, "response", None)
+    try:
+        retry_after = float(response.headers.get("retry-after")) if response is not None else 0.0
+    except (TypeError, ValueError):
+        retry_after = 0.0
+    return max(delay, min(retry_after, LLM_RETRY_MAX_SECONDS))
+
+
+def _count_retry(reason: str):
+    metrics.counter("llm_retries_total", "Model calls retried", reason=reason).inc()
+
+
+async def _backoff(attempt: int, error: Exception, deadline: float) -> bool:
+    """Sleep before the next attempt; False when there is no attempt left
+    or the deadline would pass first."""
+    reason = _retry_reason(error)
+    if reason is None or attempt >= LLM_MAX_RETRIES:
+        return False
+    delay = retry_delay(attempt, error)
+    if delay >= _remaining(deadline):
+        return False
+    _count_retry(reason)
+    await asyncio.sleep(delay)
+    return True
+
+
+# Streaming responses opened under track_upstream(), so they can be closed
+# when the run is abandoned.
+_upstream_streams = contextvars.ContextVar("llm_upstream_streams", default=None)
+
+
+@contextmanager
+def track_upstream(opened: list):
+    """Collect the HTTP streams model calls open in this context (and in
+    tasks created inside it) into ``opened``; see ``close_upstream``."""
+    token = _upstream_streams.set(opened)
+    try:
+        yield opened
+    finally:
+        _upstream_streams.reset(token)
+
+
+async def close_upstream(opened: list):
+    """Close the streams ``track_upstream`` collected. Cancelling a run
+    does not reliably close its HTTP response, which would leave the model
+    generating for a client that is gone, so this is done first, in a task
+    of its own that a further cancellation cannot cut short."""
+    if opened:
+        await asyncio.shield(asyncio.ensure_future(
+            asyncio.gather(*(stream.close() for stream in opened), return_exceptions=True)))
+
+
+class AdmittedChatCompletionsModel(OpenAIChatCompletionsModel):
+    """Chat completions model whose calls go through admission control,
+    retry 429/5xx/connection errors with jittered backoff, and stop at the
+    request deadline."""
+
+    # Private SDK method: it returns (response, stream) when streaming, in
+    # openai-agents 0.3.1 to 0.3.3, the versions pyproject.toml allows.
+    async def _fetch_response(self, *args, **kwargs):
+        result = await super()._fetch_response(*args, **kwargs)
+        opened = _upstream_streams.get()
+        if isinstance(result, tuple) and opened is not None:
+            opened.append(result[1])
+        return result
+
+    async def get_response(self, *args, **kwargs):
+        if not LLM_ADMISSION_ENABLED:
+            return await super().get_response(*args, **kwargs)
+        user, priority, deadline = _context.get()
+        if deadline is None:
+            deadline = deadline_in()
+        await admission.acquire(user, priority, deadline)
+        try:
+            for attempt in itertools.count():
+                try:
+                    return await asyncio.wait_for(super().get_response(*args, **kwargs), _remaining(deadline))
+                except asyncio.TimeoutError:
+                    _deadline_exceeded.inc()
+                    raise LLMDeadlineExceeded("The model did not answer before the request deadline")
+                except Exception as e:
+                    if not await _backoff(attempt, e, deadline):
+                        raise
+        finally:
+            admission.release(user)
+
+    async def stream_response(self, *args, **kwargs):
+        if not LLM_ADMISSION_ENABLED:
+            async for event in super().stream_response(*args, **kwargs):
+                yield event
+            return
+        user, priority, deadline = _context.get()
+        if deadline is None:
+            deadline = deadline_in()
+        await admission.acquire(user, priority, deadline)
+        try:
+            for attempt in itertools.count():
+                # Iterated in this task (no wait_for per event): the SDK keeps
+                # its tracing span in context variables across the yields. The
+                # deadline is checked between events; the client's read timeout
+                # bounds a stalled stream.
+                stream = super().stream_response(*args, **kwargs)
+                started = False
+                try:
+                    async for event in stream:
+                        started = True
+                        yield event
+                        if _remaining(deadline) <= 0:
+                            _deadline_exceeded.inc()
+                            raise LLMDeadlineExceeded("The model did not finish before the request deadline")
+                    return
+                except LLMUnavailable:
+                    raise
+                except Exception as e:
+                    # Once output has been passed on, a retry would repeat it.
+                    if started or not await _backoff(attempt, e, deadline):
+                        raise
+                finally:
+                    await stream.aclose()
+        finally:
+            admission.release(user)
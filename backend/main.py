@@ -1,29 +1,127 @@
+import os
+import math
+import asyncio
 import datetime
 import uvicorn
-from fastapi import FastAPI, Depends, HTTPException, Query, Body, status
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, HTTPException, Query, Body, Request, status
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
+from pymongo.errors import DuplicateKeyError
 
 from backend.models import AuthRequest
-from backend.db import admins_collection
-from backend.auth_utils import hash_password, verify_password, create_access_token, get_current_admin
+from backend.db import admins_collection, run_in_db_pool, ping as ping_db, pool_status as db_pool_status
+from backend.data_versions import notify_write
+from backend.resources import resources
+from backend.indexes import ensure_indexes
+from backend.memory import conversation_memory
+from backend.analytics_store import analytics_snapshot
+from backend.activity import activity_tracker
+from backend.email_outbox import email_outbox
+from backend.student_search import student_search
+from backend.auth_utils import (
+    hash_password_async, verify_password_async, create_access_token, get_current_admin, PasswordPoolSaturated,
+    password_pool_status,
+)
+from backend.rate_limit import login_email_limiter, login_ip_limiter
+from backend.tracing import TracingMiddleware, trace_store
+from backend import metrics
 
 from backend.student_router import router as student_router
 from backend.analytics_router import routers as analytics_router
 from backend.chat_router import router as chat_router
+from backend.document_router import router as document_router
+from backend.email_router import router as email_router
+from backend.event_router import router as event_router
+from backend.agent import get_agent
 
-app = FastAPI(title="Campus Admin Agent")
+READY_TIMEOUT_SECONDS = float(os.getenv("READY_TIMEOUT_SECONDS", "2"))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Runs in each worker after any fork: clients are created here, per
+    # process, rather than at import (see backend.resources). Going through
+    # the threadpool also loads what the first sync endpoint would need.
+    await run_in_threadpool(ensure_indexes)
+    print("DataBase connected successfully ")
+    get_agent()
+    trace_store.start()
+    conversation_memory.start()
+    activity_tracker.start()
+    analytics_snapshot.start()
+    student_search.start()
+    email_outbox.start()
+    yield
+    email_outbox.stop()
+    student_search.stop()
+    analytics_snapshot.stop()
+    activity_tracker.stop()
+    conversation_memory.stop()
+    trace_store.stop()
+    await resources.aclose()
+
+app = FastAPI(title="Campus Admin Agent", lifespan=lifespan)
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
+app.add_middleware(TracingMiddleware)
 
 @app.get("/")
 def root():
     return {"message": "AI Campus Admin Agent Server", "status": "running"}
 
+def _client_ip(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+def _too_many_requests(retry_after: float, detail: str):
+    raise HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=detail,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+@app.get("/health")
+def health():
+    # Liveness: the process is serving requests. Touches no dependency.
+    return {"status": "ok", "pid": os.getpid()}
+
+@app.get("/ready")
+async def ready():
+    # Readiness: Mongo answers a ping and neither thread pool is backed up.
+    checks = {}
+    try:
+        seconds = await asyncio.wait_for(run_in_db_pool(ping_db), READY_TIMEOUT_SECONDS)
+        checks["mongo"] = {"ok": True, "ping_ms": round(seconds * 1000, 3)}
+    except Exception as e:
+        checks["mongo"] = {"ok": False, "error": type(e).__name__}
+    checks["db_pool"] = db_pool_status()
+    checks["password_pool"] = password_pool_status()
+    ok = all(check["ok"] for check in checks.values())
+    return JSONResponse(
+        {"status": "ready" if ok else "not ready", "checks": checks, "resources": resources.status()},
+        status_code=200 if ok else 503,
+    )
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    return metrics.render_prometheus()
+
+@app.get("/traces")
+def recent_traces(limit: int = Query(50, ge=1, le=500), min_ms: float = 0, admin: str = Depends(get_current_admin)):
+    # Newest first; min_ms filters down to slow requests.
+    return {"traces": trace_store.recent(limit, min_ms)}
+
 @app.post("/admin/signup")
-def admin_signup(auth_data: AuthRequest):
+async def admin_signup(auth_data: AuthRequest, request: Request):
+    wait = login_ip_limiter.allow(_client_ip(request))
+    if wait:
+        _too_many_requests(wait, "Too many attempts, try again later")
     email = auth_data.email.lower().strip()
-    if admins_collection.find_one({"email": email}):
+    if await run_in_db_pool(admins_collection.find_one, {"email": email}):
         raise HTTPException(status_code=400, detail=f"Admin with email {email} already exists")
-    hashed = hash_password(auth_data.password)
+    try:
+        hashed = await hash_password_async(auth_data.password)
+    except PasswordPoolSaturated:
+        _too_many_requests(1, "Server busy, try again shortly")
     admin = {
         "email": email, 
         "password": hashed, 
@@ -31,16 +129,31 @@ def admin_signup(auth_data: AuthRequest):
         "created_at": datetime.datetime.now(), 
         "verified": True
     }
-    admins_collection.insert_one(admin)
+    try:
+        await run_in_db_pool(admins_collection.insert_one, admin)
+    except DuplicateKeyError:
+        # A concurrent signup for the same email won the race while we hashed.
+        raise HTTPException(status_code=400, detail=f"Admin with email {email} already exists")
+    # Drops tokens cached for an earlier admin with this email, and tells
+    # in-flight token checks the admins changed.
+    notify_write("admins", "insert", email=email)
     return {"message": "Admin created successfully", "admin": {"email": email, "name": auth_data.name}}
 
 @app.post("/admin/login")
-def admin_login(auth_data: AuthRequest):
+async def admin_login(auth_data: AuthRequest, request: Request):
     email = auth_data.email.lower().strip()
-    admin = admins_collection.find_one({"email": email})
+    # Checked before any bcrypt work so a password-guessing burst costs nothing.
+    wait = max(login_ip_limiter.allow(_client_ip(request)), login_email_limiter.allow(email))
+    if wait:
+        _too_many_requests(wait, "Too many login attempts, try again later")
+    admin = await run_in_db_pool(admins_collection.find_one, {"email": email})
     if not admin:
         raise HTTPException(status_code=401, detail="Invalid credentials")
-    if not verify_password(auth_data.password, admin["password"]):
+    try:
+        valid = await verify_password_async(auth_data.password, admin["password"])
+    except PasswordPoolSaturated:
+        _too_many_requests(1, "Server busy, try again shortly")
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     access_token = create_access_token(data={"sub": admin["email"]})
@@ -49,6 +162,9 @@ def admin_login(auth_data: AuthRequest):
 app.include_router(student_router)
 app.include_router(analytics_router)
 app.include_router(chat_router)
+app.include_router(document_router)
+app.include_router(email_router)
+app.include_router(event_router)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,295 @@
+import os
+import time
+import threading
+from collections import OrderedDict, defaultdict
+from pymongo import UpdateOne
+from backend.db import threads_collection
+from backend.background import PeriodicTask
+from backend.transcripts import transcript_store
+from backend import metrics
+
+MEMORY_CACHE_THREADS = int(os.getenv("MEMORY_CACHE_THREADS", "1000"))
+MEMORY_CACHE_TTL_SECONDS = float(os.getenv("MEMORY_CACHE_TTL_SECONDS", "1800"))
+MEMORY_MAX_TURNS = int(os.getenv("MEMORY_MAX_TURNS", "100"))
+MEMORY_FLUSH_INTERVAL_SECONDS = float(os.getenv("MEMORY_FLUSH_INTERVAL_SECONDS", "1.0"))
+MEMORY_FLUSH_BATCH = int(os.getenv("MEMORY_FLUSH_BATCH", "200"))
+
+_hits = metrics.counter("memory_local_hits_total", "Thread histories served from the local tier")
+_misses = metrics.counter("memory_local_misses_total", "Thread histories loaded from the durable tier")
+_lru_evictions = metrics.counter("memory_local_evictions_total", "Threads evicted from the local tier", reason="lru")
+_ttl_evictions = metrics.counter("memory_local_evictions_total", "Threads evicted from the local tier", reason="ttl")
+_trimmed = metrics.counter("memory_trimmed_messages_total", "Messages dropped by the per-thread cap")
+_flushes = metrics.counter("memory_flushes_total", "Write-behind flushes to the durable tier")
+_flushed = metrics.counter("memory_flushed_messages_total", "Messages written by write-behind flushes")
+_flush_errors = metrics.counter("memory_flush_errors_total", "Failed write-behind flushes")
+_local_threads = metrics.gauge("memory_local_threads", "Threads currently held in the local tier")
+_pending = metrics.gauge("memory_pending_messages", "Appended messages waiting to be flushed")
+
+
+class ThreadEntry:
+    __slots__ = ("messages", "flushed", "dropped", "summary", "summary_upto", "touched")
+
+    def __init__(self, messages, flushed: int, dropped: int = 0, summary: str = "", summary_upto: int = 0):
+        self.messages = messages
+        # Total messages known to be in the durable tier; used to detect
+        # appends made by other workers.
+        self.flushed = flushed
+        # Absolute position of messages[0] in the thread (older ones were capped).
+        self.dropped = dropped
+        # Running summary of every message before position summary_upto.
+        self.summary = summary
+        self.summary_upto = summary_upto
+        self.touched = time.monotonic()
+
+# ----------------- Local Tier -----------------
+class LocalMemoryTier:
+    """Per-worker LRU/TTL cache of thread histories."""
+
+    def __init__(self, max_threads: int, ttl_seconds: float, max_turns: int):
+        self.max_threads = max_threads
+        self.ttl_seconds = ttl_seconds
+        self.max_turns = max_turns
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry.touched > self.ttl_seconds:
+                del self._entries[key]
+                _ttl_evictions.inc()
+                _local_threads.set(len(self._entries))
+                return None
+            entry.touched = time.monotonic()
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry: ThreadEntry):
+        self._trim(entry)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_threads:
+                self._entries.popitem(last=False)
+                _lru_evictions.inc()
+            _local_threads.set(len(self._entries))
+
+    def append(self, entry: ThreadEntry, message: dict):
+        with self._lock:
+            entry.messages.append(message)
+        self._trim(entry)
+
+    def drop(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+            _local_threads.set(len(self._entries))
+
+    def expire(self):
+        now = time.monotonic()
+        with self._lock:
+            stale = [k for k, e in self._entries.items() if now - e.touched > self.ttl_seconds]
+            for key in stale:
+                del self._entries[key]
+            _local_threads.set(len(self._entries))
+        _ttl_evictions.inc(len(stale))
+
+    def _trim(self, entry: ThreadEntry):
+        overflow = len(entry.messages) - self.max_turns
+        if overflow > 0:
+            del entry.messages[:overflow]
+            entry.dropped += overflow
+            _trimmed.inc(overflow)
+
+# ----------------- Durable Tier -----------------
+class MongoMemoryTier:
+    """Thread histories stored on the existing ``threads`` documents.
+
+    Any durable tier needs the same calls: ``head`` (existence plus total
+    message count), ``load``, ``append_many``, ``set_summary`` and ``clear``.
+    """
+
+    def __init__(self, collection, max_turns: int):
+        self.collection = collection
+        self.max_turns = max_turns
+
+    def head(self, user_id: str, thread_id: str):
+        return self.collection.find_one({"user_id": user_id, "thread_id": thread_id}, {"message_count": 1})
+
+    def load(self, user_id: str, thread_id: str) -> dict:
+        return self.collection.find_one(
+            {"user_id": user_id, "thread_id": thread_id},
+            {"messages": {"$slice": -self.max_turns}, "message_count": 1, "summary": 1, "summary_upto": 1},
+        ) or {}
+
+    def append_many(self, batches: dict):
+        ops = [
+            UpdateOne(
+                {"user_id": user_id, "thread_id": thread_id},
+                {
+                    "$push": {"messages": {"$each": messages, "$slice": -self.max_turns}},
+                    "$inc": {"message_count": len(messages)},
+                },
+            )
+            for (user_id, thread_id), messages in batches.items()
+        ]
+        if ops:
+            self.collection.bulk_write(ops, ordered=False)
+
+    def set_summary(self, user_id: str, thread_id: str, summary: str, upto: int):
+        # Guard on summary_upto so a slower worker cannot roll the summary back.
+        self.collection.update_one(
+            {"user_id": user_id, "thread_id": thread_id, "summary_upto": {"$not": {"$gt": upto}}},
+            {"$set": {"summary": summary, "summary_upto": upto}},
+        )
+
+    def clear(self, user_id: str, thread_id: str):
+        self.collection.update_one(
+            {"user_id": user_id, "thread_id": thread_id},
+            {"$set": {"messages": [], "message_count": 0, "summary": "", "summary_upto": 0}},
+        )
+
+# ----------------- Tiered Memory -----------------
+class ConversationMemory:
+    """Thread histories with a local LRU/TTL tier in front of a durable tier.
+
+    Appends land in the local tier immediately and are written behind in
+    batches by a background flusher, so a chat turn never waits on Mongo.
+    The durable tier only keeps the last turns; ``transcripts`` (if given)
+    gets every turn and is flushed on the same schedule.
+    """
+
+    def __init__(self, local: LocalMemoryTier, durable: MongoMemoryTier,
+                 flush_interval: float = MEMORY_FLUSH_INTERVAL_SECONDS, flush_batch: int = MEMORY_FLUSH_BATCH,
+                 transcripts=None):
+        self.local = local
+        self.durable = durable
+        self.transcripts = transcripts
+        self.flush_batch = flush_batch
+        self._pending = defaultdict(list)
+        self._pending_count = 0
+        self._pending_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flusher = PeriodicTask("memory-flusher", flush_interval, self._background_run)
+
+    def start(self):
+        self._flusher.start()
+
+    def stop(self):
+        self._flusher.stop()
+
+    def sync(self, user_id: str, thread_id: str) -> bool:
+        """Return False if the thread does not exist; otherwise make sure the
+        local copy includes turns appended by other workers."""
+        key = (user_id, thread_id)
+        head = self.durable.head(user_id, thread_id)
+        if head is None:
+            self.local.drop(key)
+            return False
+        entry = self.local.get(key)
+        if entry is None or entry.flushed != head.get("message_count", 0):
+            self._reload(key)
+        return True
+
+    def get(self, user_id: str, thread_id: str):
+        return list(self._entry((user_id, thread_id)).messages)
+
+    def window(self, user_id: str, thread_id: str):
+        """Return ``(messages, start, summary, summary_upto)`` where ``start``
+        is the absolute position of ``messages[0]`` in the thread."""
+        entry = self._entry((user_id, thread_id))
+        return list(entry.messages), entry.dropped, entry.summary, entry.summary_upto
+
+    def set_summary(self, user_id: str, thread_id: str, summary: str, upto: int):
+        entry = self._entry((user_id, thread_id))
+        if upto < entry.summary_upto:
+            return
+        entry.summary, entry.summary_upto = summary, upto
+        self.durable.set_summary(user_id, thread_id, summary, upto)
+
+    def append(self, user_id: str, thread_id: str, role: str, content: str):
+        key = (user_id, thread_id)
+        message = {"role": role, "content": content}
+        self.local.append(self._entry(key), message)
+        if self.transcripts is not None:
+            self.transcripts.add(user_id, thread_id, role, content)
+        with self._pending_lock:
+            self._pending[key].append(message)
+            self._pending_count += 1
+            pending = self._pending_count
+        _pending.set(pending)
+        if pending >= self.flush_batch:
+            self._flusher.trigger()
+
+    def create(self, user_id: str, thread_id: str):
+        self.local.put((user_id, thread_id), ThreadEntry([], 0))
+
+    def delete(self, user_id: str, thread_id: str):
+        key = (user_id, thread_id)
+        self.local.drop(key)
+        with self._pending_lock:
+            self._pending_count -= len(self._pending.pop(key, []))
+
+    def flush(self):
+        with self._flush_lock:
+            with self._pending_lock:
+                batches, self._pending = self._pending, defaultdict(list)
+                self._pending_count = 0
+            _pending.set(0)
+            if not batches:
+                return
+            try:
+                self.durable.append_many(batches)
+            except Exception:
+                _flush_errors.inc()
+                with self._pending_lock:
+                    for key, messages in batches.items():
+                        self._pending[key][:0] = messages
+                        self._pending_count += len(messages)
+                raise
+            _flushes.inc()
+            _flushed.inc(sum(len(m) for m in batches.values()))
+            for key, messages in batches.items():
+                entry = self.local.get(key)
+                if entry is not None:
+                    entry.flushed += len(messages)
+
+    def _background_run(self):
+        self.local.expire()
+        try:
+            self.flush()
+        finally:
+            if self.transcripts is not None:
+                self.transcripts.flush()
+
+    def _entry(self, key):
+        entry = self.local.get(key)
+        if entry is not None:
+            _hits.inc()
+            return entry
+        return self._reload(key)
+
+    def _reload(self, key):
+        _misses.inc()
+        # Hold the flush lock so pending messages are neither lost nor
+        # counted twice while the durable copy is read.
+        with self._flush_lock:
+            doc = self.durable.load(*key)
+            messages, count = doc.get("messages", []), doc.get("message_count", 0)
+            dropped = count - len(messages)
+            with self._pending_lock:
+                messages = messages + self._pending.get(key, [])
+            entry = ThreadEntry(messages, count, dropped, doc.get("summary", ""), doc.get("summary_upto", 0))
+            self.local.put(key, entry)
+        return entry
+
+    def stats(self) -> dict:
+        return metrics.snapshot("memory_")
+
+
+conversation_memory = ConversationMemory(
+    LocalMemoryTier(MEMORY_CACHE_THREADS, MEMORY_CACHE_TTL_SECONDS, MEMORY_MAX_TURNS),
+    MongoMemoryTier(threads_collection, MEMORY_MAX_TURNS),
+    transcripts=transcript_store,
+)
@@ -0,0 +1,147 @@
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+# ----------------- Metric Types -----------------
+class Counter:
+    def __init__(self, name: str, help: str = "", labels: dict = None):
+        self.name, self.help, self.labels = name, help, labels or {}
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+
+    def snapshot(self):
+        return self.value
+
+
+class Gauge:
+    def __init__(self, name: str, help: str = "", labels: dict = None):
+        self.name, self.help, self.labels = name, help, labels or {}
+        self.value = 0
+
+    def set(self, value: float):
+        self.value = value
+
+    def snapshot(self):
+        return self.value
+
+
+class Histogram:
+    DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    def __init__(self, name: str, help: str = "", labels: dict = None, buckets=None, window: int = 2048):
+        self.name, self.help, self.labels = name, help, labels or {}
+        self.buckets = tuple(buckets or self.DEFAULT_BUCKETS)
+        self.bucket_counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        # Recent samples only, so quantiles reflect current behaviour.
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self.count += 1
+            self.sum += value
+            self._samples.append(value)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.bucket_counts[i] += 1
+                    break
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def quantile(self, q: float) -> float:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return 0.0
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+# ----------------- Registry -----------------
+_registry = {}
+_registry_lock = threading.Lock()
+
+def _get_or_create(cls, name, help, labels, **kwargs):
+    key = (name, tuple(sorted(labels.items())))
+    metric = _registry.get(key)
+    if metric is None:
+        with _registry_lock:
+            metric = _registry.get(key)
+            if metric is None:
+                metric = cls(name, help, labels, **kwargs)
+                _registry[key] = metric
+    return metric
+
+def counter(name: str, help: str = "", **labels) -> Counter:
+    return _get_or_create(Counter, name, help, labels)
+
+def gauge(name: str, help: str = "", **labels) -> Gauge:
+    return _get_or_create(Gauge, name, help, labels)
+
+def histogram(name: str, help: str = "", buckets=None, **labels) -> Histogram:
+    return _get_or_create(Histogram, name, help, labels, buckets=buckets)
+
+def all_metrics():
+    return list(_registry.values())
+
+def snapshot(prefix: str = "") -> dict:
+    out = {}
+    for metric in all_metrics():
+        if not metric.name.startswith(prefix):
+            continue
+        label_text = ",".join(f"{k}={v}" for k, v in sorted(metric.labels.items()))
+        out[f"{metric.name}{{{label_text}}}" if label_text else metric.name] = metric.snapshot()
+    return out
+
+# ----------------- Prometheus Exposition -----------------
+def _format_labels(labels: dict, extra: dict = None) -> str:
+    merged = {**labels, **(extra or {})}
+    if not merged:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n") for v in merged.values())
+    return "{" + ",".join(f'{k}="{v}"' for k, v in zip(merged, escaped)) + "}"
+
+def render_prometheus() -> str:
+    """Every registered metric in the Prometheus text format (0.0.4)."""
+    families = {}
+    for metric in all_metrics():
+        families.setdefault(metric.name, []).append(metric)
+    lines = []
+    for name, group in sorted(families.items()):
+        kind = {Counter: "counter", Gauge: "gauge", Histogram: "histogram"}[type(group[0])]
+        lines.append(f"# HELP {name} {group[0].help}")
+        lines.append(f"# TYPE {name} {kind}")
+        for metric in group:
+            if kind != "histogram":
+                lines.append(f"{name}{_format_labels(metric.labels)} {metric.value}")
+                continue
+            with metric._lock:
+                counts, total, count = list(metric.bucket_counts), metric.sum, metric.count
+            cumulative = 0
+            for bound, n in zip(metric.buckets, counts):
+                cumulative += n
+                lines.append(f"{name}_bucket{_format_labels(metric.labels, {'le': bound})} {cumulative}")
+            lines.append(f"{name}_bucket{_format_labels(metric.labels, {'le': '+Inf'})} {count}")
+            lines.append(f"{name}_sum{_format_labels(metric.labels)} {total}")
+            lines.append(f"{name}_count{_format_labels(metric.labels)} {count}")
+    return "\n".join(lines) + "\n"
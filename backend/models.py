@@ -25,3 +25,22 @@ class ChatRequest(BaseModel):
 class ThreadCreate(BaseModel):
     user_id: str
     thread_id: str
+
+class EmailStudentsRequest(BaseModel):
+    message: str
+    subject: Optional[str] = None
+    department: Optional[str] = None
+    created_from: Optional[str] = None
+    created_to: Optional[str] = None
+
+class EventCreate(BaseModel):
+    name: str
+    date: str
+    location: str
+    end_date: Optional[str] = None
+
+class EventUpdate(BaseModel):
+    name: Optional[str] = None
+    date: Optional[str] = None
+    location: Optional[str] = None
+    end_date: Optional[str] = None
@@ -0,0 +1,19 @@
+import json
+import base64
+import datetime
+from bson import ObjectId
+
+# Keyset page cursors: the sort field's value and _id of the last document
+# on a page, so the next page is a range query on an index, not a skip.
+
+def encode_cursor(doc: dict, field: str = "created_at") -> str:
+    raw = json.dumps({"c": doc[field].isoformat(), "i": str(doc["_id"])})
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str):
+    """``(sort value, _id)`` from ``encode_cursor``; ValueError if malformed."""
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.datetime.fromisoformat(raw["c"]), ObjectId(raw["i"])
+    except Exception:
+        raise ValueError("malformed cursor")
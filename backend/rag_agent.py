@@ -0,0 +1,398 @@
+import os
+import re
+import json
+import time
+import zlib
+import hashlib
+import datetime
+import threading
+from contextlib import contextmanager
+import numpy as np
+from backend import metrics
+from backend.data_versions import notify_write
+
+try:
+    import fcntl
+except ImportError:
+    # No cross-process lock (Windows): only one process may write the index.
+    fcntl = None
+
+RAG_INDEX_DIR = os.getenv("RAG_INDEX_DIR", "rag_index")
+RAG_DOCS_DIR = os.getenv("RAG_DOCS_DIR", "campus_docs")
+RAG_EMBED_DIMS = int(os.getenv("RAG_EMBED_DIMS", "384"))
+RAG_CHUNK_WORDS = int(os.getenv("RAG_CHUNK_WORDS", "200"))
+RAG_CHUNK_OVERLAP = int(os.getenv("RAG_CHUNK_OVERLAP", "40"))
+RAG_TOP_K = int(os.getenv("RAG_TOP_K", "5"))
+RAG_SEARCH_BLOCK = int(os.getenv("RAG_SEARCH_BLOCK", "65536"))
+RAG_EMBED_BATCH = 256
+SUPPORTED_EXTENSIONS = (".pdf", ".txt", ".md")
+
+_pages = metrics.counter("rag_pages_ingested_total", "Document pages extracted and indexed")
+_chunks_indexed = metrics.counter("rag_chunks_indexed_total", "Chunks embedded and appended to the index")
+_unchanged = metrics.counter("rag_documents_unchanged_total", "Ingests skipped because the file hash was already indexed")
+_ingest_seconds = metrics.histogram("rag_ingest_seconds", "Time to extract, chunk and embed one document")
+_search_seconds = metrics.histogram("rag_search_seconds", "Time to answer one batch of document queries")
+_rows = metrics.gauge("rag_index_rows", "Rows in the vector file, including replaced chunks")
+_live_rows = metrics.gauge("rag_index_live_rows", "Rows belonging to current documents")
+
+_WORD = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have how i in is it its of on or that the this to was "
+    "were what when where which who will with do does can my our we you your".split()
+)
+
+
+# ----------------- Extraction / Chunking / Embedding -----------------
+def iter_pages(path: str):
+    """Yield ``(page_number, text)`` one page at a time so large PDFs are never
+    held in memory whole. Text and Markdown files count as a single page."""
+    if path.lower().endswith(".pdf"):
+        # Imported on first ingest; the chat and student paths never need it.
+        import pymupdf
+        with pymupdf.open(path) as doc:
+            for page in doc:
+                yield page.number + 1, page.get_text("text")
+    else:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            yield 1, f.read()
+
+
+def chunk_text(text: str, size: int = RAG_CHUNK_WORDS, overlap: int = RAG_CHUNK_OVERLAP):
+    """Split text into windows of ``size`` words overlapping by ``overlap``."""
+    words = text.split()
+    step = max(1, size - overlap)
+    for start in range(0, len(words), step):
+        yield " ".join(words[start:start + size])
+        if start + size >= len(words):
+            break
+
+
+def embed_texts(texts, dims: int = RAG_EMBED_DIMS) -> np.ndarray:
+    """Local hashed bag-of-words embedding (unigrams + bigrams, signed feature
+    hashing, log term frequency, L2-normalized). CPU-only, no model download."""
+    out = np.zeros((len(texts), dims), dtype=np.float32)
+    for row, text in enumerate(texts):
+        words = [w for w in _WORD.findall(text.lower()) if w not in _STOPWORDS]
+        features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        if not features:
+            continue
+        hashes = np.fromiter((zlib.crc32(f.encode()) for f in features), dtype=np.uint32, count=len(features))
+        signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+        np.add.at(out[row], hashes % dims, signs)
+    np.copysign(np.log1p(np.abs(out)), out, out=out)
+    norms = np.linalg.norm(out, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    out /= norms
+    return out
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# ----------------- Vector Index -----------------
+class DocumentIndex:
+    """Append-only vector index persisted under ``path``.
+
+    - ``vectors.f32``: float32 rows of ``dims`` values, memory-mapped for search
+    - ``chunks.ndjson``: one ``[source, page, text]`` line per row
+    - ``manifest.json``: indexed documents (file hash and row range each)
+
+    Re-ingesting a file whose hash is already indexed is a no-op; a changed
+    file appends new rows and retires the old range. Retired rows are
+    compacted away once they make up half of the file. The manifest is
+    replaced atomically after each write, so rows appended by an interrupted
+    ingest are truncated on the next load.
+
+    Several processes (server workers) may share ``path``: writes hold an
+    exclusive lock on ``index.lock`` and first catch up with the manifest,
+    and reads reload when another process has replaced it (its
+    ``generation`` goes up with every write).
+    """
+
+    def __init__(self, path: str = RAG_INDEX_DIR, dims: int = RAG_EMBED_DIMS):
+        self.path = path
+        self.dims = dims
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._documents = {}
+        self._chunks = []
+        self._rows = 0
+        self._generation = 0
+        # os.stat of the manifest this process last loaded or wrote
+        self._stamp = None
+        # (vectors memmap, live-row mask, chunk list) swapped in one assignment
+        # so searches never see a half-applied write or compaction.
+        self._view = (np.zeros((0, dims), dtype=np.float32), np.zeros(0, dtype=bool), [])
+
+    # ---- files ----
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool):
+        """Shared (reload) or exclusive (write) lock across processes."""
+        os.makedirs(self.path, exist_ok=True)
+        if fcntl is None:
+            yield
+            return
+        with open(self._file("index.lock"), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _manifest_stamp(self):
+        try:
+            st = os.stat(self._file("manifest.json"))
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def _stale(self) -> bool:
+        return not self._loaded or self._manifest_stamp() != self._stamp
+
+    def _load(self):
+        """(Re)read the index; callers hold the file lock, so no other
+        process is part-way through a write."""
+        os.makedirs(self.path, exist_ok=True)
+        manifest = {}
+        stamp = self._manifest_stamp()
+        if stamp is not None:
+            with open(self._file("manifest.json")) as f:
+                manifest = json.load(f)
+        if manifest.get("dims", self.dims) != self.dims:
+            print(f"RAG index at {self.path} was built with {manifest['dims']} dims, rebuilding empty")
+            manifest = {}
+        self._rows = manifest.get("rows", 0)
+        self._documents = manifest.get("documents", {})
+        self._generation = manifest.get("generation", 0)
+
+        # Drop anything appended after the last manifest write.
+        with open(self._file("vectors.f32"), "ab") as f:
+            f.truncate(self._rows * self.dims * 4)
+        self._chunks = []
+        with open(self._file("chunks.ndjson"), "a+b") as f:
+            f.seek(0)
+            while len(self._chunks) < self._rows:
+                line = f.readline()
+                if not line:
+                    break
+                self._chunks.append(tuple(json.loads(line)))
+            f.truncate(f.tell())
+        if len(self._chunks) != self._rows:
+            raise RuntimeError(f"RAG index at {self.path} is corrupt: manifest has {self._rows} rows, "
+                               f"chunks file has {len(self._chunks)}")
+        self._publish()
+        self._stamp = stamp
+        self._loaded = True
+
+    def _ensure_loaded(self):
+        """Load on first use, and again after another process wrote (one
+        stat of the manifest per call otherwise)."""
+        if self._stale():
+            with self._lock:
+                if self._stale():
+                    with self._file_lock(exclusive=False):
+                        self._load()
+
+    @contextmanager
+    def _writing(self):
+        """Thread and file lock for a write, on an up-to-date index."""
+        with self._lock, self._file_lock(exclusive=True):
+            if self._stale():
+                self._load()
+            yield
+
+    def _save_manifest(self):
+        self._generation += 1
+        tmp = self._file("manifest.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump({"dims": self.dims, "rows": self._rows, "generation": self._generation,
+                       "documents": self._documents}, f)
+        os.replace(tmp, self._file("manifest.json"))
+        self._stamp = self._manifest_stamp()
+
+    def _publish(self):
+        if self._rows:
+            vectors = np.memmap(self._file("vectors.f32"), dtype=np.float32, mode="r", shape=(self._rows, self.dims))
+        else:
+            vectors = np.zeros((0, self.dims), dtype=np.float32)
+        alive = np.zeros(self._rows, dtype=bool)
+        for doc in self._documents.values():
+            alive[doc["rows"][0]:doc["rows"][1]] = True
+        self._view = (vectors, alive, self._chunks)
+        _rows.set(self._rows)
+        _live_rows.set(int(alive.sum()))
+
+    # ---- writes ----
+    def ingest_file(self, path: str, source: str = None) -> dict:
+        """Index ``path`` under ``source`` (defaults to the file name)."""
+        source = source or os.path.basename(path)
+        digest = file_sha256(path)
+        with self._writing():
+            previous = self._documents.get(source)
+            if previous and previous["sha256"] == digest:
+                _unchanged.inc()
+                return {"source": source, "status": "unchanged", "pages": previous["pages"],
+                        "chunks": previous["rows"][1] - previous["rows"][0]}
+            with _ingest_seconds.time():
+                start, pages = self._append_document(path, source)
+            self._documents[source] = {
+                "sha256": digest,
+                "rows": [start, self._rows],
+                "pages": pages,
+                "indexed_at": datetime.datetime.utcnow().isoformat(),
+            }
+            self._save_manifest()
+            self._publish()
+            self._maybe_compact()
+        notify_write("documents", "ingest", source=source)
+        return {"source": source, "status": "updated" if previous else "indexed",
+                "pages": pages, "chunks": self._documents[source]["rows"][1] - self._documents[source]["rows"][0]}
+
+    def _append_document(self, path: str, source: str) -> tuple:
+        start = self._rows
+        pages = 0
+        with open(self._file("vectors.f32"), "ab") as vf, open(self._file("chunks.ndjson"), "ab") as cf:
+            chunks_offset = cf.tell()
+            batch = []
+            try:
+                for page, text in iter_pages(path):
+                    pages += 1
+                    _pages.inc()
+                    for chunk in chunk_text(text):
+                        batch.append((source, page, chunk))
+                        if len(batch) >= RAG_EMBED_BATCH:
+                            self._write_batch(batch, vf, cf)
+                            batch = []
+                if batch:
+                    self._write_batch(batch, vf, cf)
+            except Exception:
+                # Unreadable file: roll the appended rows back before re-raising.
+                vf.truncate(start * self.dims * 4)
+                cf.truncate(chunks_offset)
+                del self._chunks[start:]
+                self._rows = start
+                raise
+        return start, pages
+
+    def _write_batch(self, batch: list, vf, cf):
+        embed_texts([text for _, _, text in batch], self.dims).tofile(vf)
+        cf.write("".join(json.dumps(row) + "\n" for row in batch).encode())
+        self._chunks.extend(batch)
+        self._rows += len(batch)
+        _chunks_indexed.inc(len(batch))
+
+    def remove(self, source: str) -> bool:
+        with self._writing():
+            if self._documents.pop(source, None) is None:
+                return False
+            self._save_manifest()
+            self._publish()
+            self._maybe_compact()
+        notify_write("documents", "delete", source=source)
+        return True
+
+    def sync_directory(self, directory: str = RAG_DOCS_DIR) -> dict:
+        """Index new or changed files under ``directory`` and drop documents
+        whose files are gone. Unchanged files cost one hash each."""
+        report = {"indexed": 0, "updated": 0, "unchanged": 0, "removed": 0, "failed": []}
+        seen = set()
+        for root, _, files in os.walk(directory):
+            for name in sorted(files):
+                if not name.lower().endswith(SUPPORTED_EXTENSIONS):
+                    continue
+                path = os.path.join(root, name)
+                source = os.path.relpath(path, directory)
+                seen.add(source)
+                try:
+                    report[self.ingest_file(path, source)["status"]] += 1
+                except Exception as e:
+                    report["failed"].append({"source": source, "error": str(e)})
+        self._ensure_loaded()
+        for source in set(self._documents) - seen:
+            if self.remove(source):
+                report["removed"] += 1
+        return report
+
+    def _maybe_compact(self):
+        live = sum(d["rows"][1] - d["rows"][0] for d in self._documents.values())
+        if self._rows < 1024 or live * 2 > self._rows:
+            return
+        vectors = self._view[0]
+        with open(self._file("vectors.f32.tmp"), "wb") as vf, open(self._file("chunks.ndjson.tmp"), "w", encoding="utf-8") as cf:
+            chunks, row = [], 0
+            for doc in self._documents.values():
+                start, end = doc["rows"]
+                np.asarray(vectors[start:end]).tofile(vf)
+                cf.write("".join(json.dumps(c) + "\n" for c in self._chunks[start:end]))
+                chunks.extend(self._chunks[start:end])
+                doc["rows"] = [row, row + end - start]
+                row += end - start
+        os.replace(self._file("vectors.f32.tmp"), self._file("vectors.f32"))
+        os.replace(self._file("chunks.ndjson.tmp"), self._file("chunks.ndjson"))
+        self._chunks = chunks
+        self._rows = row
+        self._save_manifest()
+        self._publish()
+
+    # ---- reads ----
+    def search(self, query: str, top_k: int = RAG_TOP_K) -> list:
+        return self.search_many([query], top_k)[0]
+
+    def search_many(self, queries: list, top_k: int = RAG_TOP_K) -> list:
+        """Top-k chunks per query: ``[[{"source", "page", "score", "text"}]]``.
+
+        All queries are scored together against ``RAG_SEARCH_BLOCK`` rows of
+        the memory-mapped matrix at a time, keeping each block's top k.
+        """
+        self._ensure_loaded()
+        vectors, alive, chunks = self._view
+        top_k = max(1, int(top_k))
+        started = time.perf_counter()
+        q = embed_texts(queries, self.dims)
+        best_scores, best_rows = [], []
+        for start in range(0, len(alive), RAG_SEARCH_BLOCK):
+            scores = q @ np.asarray(vectors[start:start + RAG_SEARCH_BLOCK]).T
+            scores[:, ~alive[start:start + RAG_SEARCH_BLOCK]] = -np.inf
+            k = min(top_k, scores.shape[1])
+            idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            best_scores.append(np.take_along_axis(scores, idx, axis=1))
+            best_rows.append(idx + start)
+        results = [[] for _ in queries]
+        if best_scores:
+            scores = np.concatenate(best_scores, axis=1)
+            rows = np.concatenate(best_rows, axis=1)
+            order = np.argsort(-scores, axis=1)[:, :top_k]
+            for qi, ranked in enumerate(order):
+                for j in ranked:
+                    score = float(scores[qi, j])
+                    if score <= 0:
+                        break
+                    source, page, text = chunks[rows[qi, j]]
+                    results[qi].append({"source": source, "page": page, "score": round(score, 4), "text": text})
+        _search_seconds.observe(time.perf_counter() - started)
+        return results
+
+    def documents(self) -> list:
+        self._ensure_loaded()
+        return [
+            {"source": source, "pages": d["pages"], "chunks": d["rows"][1] - d["rows"][0],
+             "sha256": d["sha256"], "indexed_at": d["indexed_at"]}
+            for source, d in sorted(self._documents.items())
+        ]
+
+    def stats(self) -> dict:
+        self._ensure_loaded()
+        alive = self._view[1]
+        return {"documents": len(self._documents), "rows": self._rows, "live_rows": int(alive.sum()),
+                "dims": self.dims, "index_bytes": self._rows * self.dims * 4}
+
+
+document_index = DocumentIndex()
@@ -0,0 +1,57 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from backend import metrics
+
+LOGIN_EMAIL_RATE_PER_MINUTE = float(os.getenv("LOGIN_EMAIL_RATE_PER_MINUTE", "10"))
+LOGIN_EMAIL_BURST = int(os.getenv("LOGIN_EMAIL_BURST", "5"))
+LOGIN_IP_RATE_PER_MINUTE = float(os.getenv("LOGIN_IP_RATE_PER_MINUTE", "60"))
+LOGIN_IP_BURST = int(os.getenv("LOGIN_IP_BURST", "20"))
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+
+
+class TokenBucketLimiter:
+    """In-process token buckets, one per key.
+
+    Each key may spend ``burst`` requests at once and regains ``rate``
+    requests per second. Buckets are kept in an LRU capped at ``max_keys``;
+    an evicted key simply starts again with a full bucket. Limits are per
+    worker.
+    """
+
+    def __init__(self, name: str, rate: float, burst: int, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self._limited = metrics.counter("rate_limited_total", "Requests rejected by a rate limiter", limiter=name)
+
+    def allow(self, key: str) -> float:
+        """Take one token for ``key``. Returns 0 if allowed, otherwise the
+        seconds until a token is available."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                wait = 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                wait = (1 - tokens) / self.rate
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        if wait:
+            self._limited.inc()
+        return wait
+
+    def reset(self, key: str):
+        with self._lock:
+            self._buckets.pop(key, None)
+
+
+login_email_limiter = TokenBucketLimiter("login_email", LOGIN_EMAIL_RATE_PER_MINUTE / 60, LOGIN_EMAIL_BURST)
+login_ip_limiter = TokenBucketLimiter("login_ip", LOGIN_IP_RATE_PER_MINUTE / 60, LOGIN_IP_BURST)
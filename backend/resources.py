@@ -0,0 +1,104 @@
+import os
+import inspect
+import threading
+
+
+class Resources:
+    """Process-wide clients and pools, created on first use.
+
+    Modules register a factory (and optionally a close function) by name at
+    import time; nothing is connected or spawned until ``get`` is called.
+    A forked child starts with an empty container, so every worker builds
+    its own Mongo client, thread pools and HTTP clients instead of sharing
+    sockets and dead threads inherited from the parent.
+    """
+
+    def __init__(self):
+        self._factories = {}
+        self._instances = {}
+        # Re-entrant: a factory may get() the resources it is built on.
+        self._lock = threading.RLock()
+        # Bumped whenever instances are dropped, so proxies that cache a
+        # resolved object know to look it up again.
+        self.generation = 0
+
+    def register(self, name: str, factory, close=None):
+        self._factories[name] = (factory, close)
+
+    def get(self, name: str):
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        with self._lock:
+            if name not in self._instances:
+                factory, _ = self._factories[name]
+                self._instances[name] = factory()
+            return self._instances[name]
+
+    def created(self, name: str) -> bool:
+        return name in self._instances
+
+    def status(self) -> dict:
+        return {name: name in self._instances for name in self._factories}
+
+    async def aclose(self):
+        """Close everything that was created, newest first."""
+        with self._lock:
+            instances = list(self._instances.items())
+            self._instances.clear()
+            self.generation += 1
+        for name, instance in reversed(instances):
+            close = self._factories[name][1]
+            if close is None:
+                continue
+            try:
+                result = close(instance)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                print(f"Could not close {name}, {e}")
+
+    def _after_fork(self):
+        # The parent still owns these; closing them here would close its sockets.
+        self._lock = threading.RLock()
+        self._instances = {}
+        self.generation += 1
+
+
+resources = Resources()
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=resources._after_fork)
+
+
+class LazyProxy:
+    """Stands in for a resource-backed object until it is first used.
+
+    ``resolve`` is called on first attribute access (and again after a fork
+    or ``resources.aclose()``); attribute access and indexing go to the result.
+    """
+
+    __slots__ = ("_resolve", "_name", "_target", "_generation")
+
+    def __init__(self, resolve, name: str = None):
+        self._resolve = resolve
+        self._name = name or resolve.__qualname__
+        self._target = None
+        self._generation = -1
+
+    def _get(self):
+        generation = resources.generation
+        if self._generation != generation or self._target is None:
+            # Tagged with the generation read before resolving, so a target
+            # resolved across an aclose() is looked up again next time.
+            self._target = self._resolve()
+            self._generation = generation
+        return self._target
+
+    def __getattr__(self, name):
+        return getattr(self._get(), name)
+
+    def __getitem__(self, key):
+        return self._get()[key]
+
+    def __repr__(self):
+        return f"<lazy {self._name}>"
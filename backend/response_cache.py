@@ -0,0 +1,183 @@
+import os
+import re
+import math
+import time
+import threading
+import zlib
+from collections import OrderedDict
+from backend import data_versions, metrics
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "512"))
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "300"))
+# Cosine similarity needed for a near-identical prompt to reuse an answer.
+# 0 disables similarity matching (normalized exact match only).
+RESPONSE_CACHE_SIMILARITY = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0"))
+
+# Collections each agent tool reads. Answers are tagged with these so a
+# write only invalidates answers that depended on the written collection.
+TOOL_READS = {
+    "get_student": {"students"},
+    "list_students": {"students"},
+    "search_students": {"students"},
+    "get_total_students": {"students"},
+    "get_students_by_department": {"students"},
+    "get_recent_onboarded_students": {"students"},
+    "get_active_students_last_7_days": {"students", "student_activity"},
+    "get_active_students": {"students", "student_activity"},
+    "list_events": {"events"},
+    "upcoming_events": {"events"},
+    "search_documents": {"documents"},
+}
+# Answers produced by runs that wrote data are never cached: replaying them
+# would skip the write.
+WRITE_TOOLS = {
+    "add_student", "update_student", "delete_student", "import_students_csv",
+    "add_event", "update_event", "delete_event", "send_email", "email_students",
+}
+
+_hits = metrics.counter("response_cache_hits_total", "Agent answers served from the cache")
+_similar_hits = metrics.counter("response_cache_similar_hits_total", "Cache hits matched by similarity")
+_misses = metrics.counter("response_cache_misses_total", "Agent answers not found in the cache")
+_invalidations = metrics.counter("response_cache_invalidations_total", "Entries dropped because data changed")
+_evictions = metrics.counter("response_cache_evictions_total", "Entries dropped by the size cap or TTL")
+_saved = metrics.counter("response_cache_seconds_saved_total", "Agent run time avoided by cache hits")
+_entries = metrics.gauge("response_cache_entries", "Entries currently cached")
+
+_PUNCT = re.compile(r"[^\w@.\s]+")
+_SPACE = re.compile(r"\s+")
+_LITERAL = re.compile(r"[\w.+-]+@[\w-]+\.[\w.]+|\d+")
+
+def normalize_prompt(prompt: str) -> str:
+    return _SPACE.sub(" ", _PUNCT.sub(" ", prompt.lower())).strip()
+
+def embed(text: str, dims: int = 1024) -> dict:
+    """Local hashed character-trigram embedding (sparse, L2-normalized)."""
+    padded = f"  {text} "
+    vector = {}
+    for i in range(len(padded) - 2):
+        bucket = zlib.crc32(padded[i:i + 3].encode()) % dims
+        vector[bucket] = vector.get(bucket, 0.0) + 1.0
+    norm = math.sqrt(sum(v * v for v in vector.values())) or 1.0
+    return {k: v / norm for k, v in vector.items()}
+
+def cosine(a: dict, b: dict) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(k, 0.0) for k, v in a.items())
+
+
+class CacheEntry:
+    __slots__ = ("response", "tags", "versions", "vector", "literals", "created", "cost")
+
+    def __init__(self, response, tags, versions, vector, literals, cost):
+        self.response = response
+        self.tags = tags
+        self.versions = versions
+        self.vector = vector
+        self.literals = literals
+        self.created = time.monotonic()
+        self.cost = cost
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES, ttl_seconds: float = RESPONSE_CACHE_TTL_SECONDS,
+                 similarity: float = RESPONSE_CACHE_SIMILARITY):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity = similarity
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, prompt: str):
+        key = normalize_prompt(prompt)
+        with self._lock:
+            entry = self._entries.get(key)
+            similar = False
+            if entry is None and self.similarity > 0:
+                key, entry = self._most_similar(key)
+                similar = entry is not None
+            if entry is not None and not self._is_fresh(entry):
+                del self._entries[key]
+                _entries.set(len(self._entries))
+                entry = None
+            if entry is None:
+                _misses.inc()
+                return None
+            self._entries.move_to_end(key)
+        _hits.inc()
+        if similar:
+            _similar_hits.inc()
+        _saved.inc(entry.cost)
+        return entry.response
+
+    def put(self, prompt: str, response: str, tools_used, versions: dict, cost: float):
+        """Cache ``response`` unless the run wrote data. ``versions`` must be
+        taken before the run started so writes made during it invalidate it."""
+        if any(name in WRITE_TOOLS for name in tools_used):
+            return
+        tags = set()
+        for name in tools_used:
+            tags |= TOOL_READS.get(name, set())
+        key = normalize_prompt(prompt)
+        entry = CacheEntry(
+            response, tags, {c: versions.get(c, 0) for c in tags},
+            embed(key) if self.similarity > 0 else None, set(_LITERAL.findall(key)), cost,
+        )
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                _evictions.inc()
+            _entries.set(len(self._entries))
+
+    def invalidate(self, collection: str, op: str = None, payload: dict = None):
+        with self._lock:
+            stale = [k for k, e in self._entries.items() if collection in e.tags]
+            for key in stale:
+                del self._entries[key]
+            _entries.set(len(self._entries))
+        _invalidations.inc(len(stale))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            _entries.set(0)
+
+    def stats(self) -> dict:
+        hits, misses = _hits.value, _misses.value
+        return {
+            "entries": len(self._entries),
+            "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            **metrics.snapshot("response_cache_"),
+        }
+
+    def _is_fresh(self, entry: CacheEntry) -> bool:
+        if time.monotonic() - entry.created > self.ttl_seconds:
+            _evictions.inc()
+            return False
+        if any(data_versions.version(c) != v for c, v in entry.versions.items()):
+            _invalidations.inc()
+            return False
+        return True
+
+    def _most_similar(self, key: str):
+        # Numbers and emails must match exactly: "student 101" is not "student 102".
+        literals = set(_LITERAL.findall(key))
+        vector = embed(key)
+        best_key, best_entry, best_score = None, None, self.similarity
+        for k, entry in self._entries.items():
+            if entry.vector is None or entry.literals != literals:
+                continue
+            score = cosine(vector, entry.vector)
+            if score >= best_score:
+                best_key, best_entry, best_score = k, entry, score
+        return best_key, best_entry
+
+
+response_cache = ResponseCache()
+data_versions.subscribe("students", response_cache.invalidate)
+data_versions.subscribe("events", response_cache.invalidate)
+data_versions.subscribe("student_activity", response_cache.invalidate)
+data_versions.subscribe("documents", response_cache.invalidate)
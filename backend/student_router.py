@@ -1,10 +1,19 @@
-from fastapi import APIRouter, HTTPException
+import io
+import csv
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, EmailStr
 
 from backend.models import Student, UpdateStudent
-from backend.tools import add_student, get_student, update_student, delete_student, list_students
+from backend.auth_utils import get_current_admin
+from backend.tools import (
+    add_student, get_student, update_student, delete_student, list_students, iter_students, student_projection,
+    search_students,
+    iter_import_rows, bulk_upsert_students, STUDENT_IMPORT_BATCH_SIZE
+)
 
-router = APIRouter(tags=["Students"])
+router = APIRouter(tags=["Students"], dependencies=[Depends(get_current_admin)])
 
 
 @router.post("/students")
@@ -16,6 +25,65 @@ def create_student(student: Student):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/students/bulk")
+def bulk_import_students(
+    file: UploadFile = File(...),
+    format: str = Query(None, pattern="^(csv|ndjson)$"),
+    batch_size: int = Query(STUDENT_IMPORT_BATCH_SIZE, ge=1, le=10000),
+):
+    # CSV needs the header name,student_id,department,email; NDJSON one object per line.
+    # Existing student_ids are updated, new ones inserted.
+    fmt = format or ("ndjson" if (file.filename or "").endswith((".ndjson", ".jsonl")) else "csv")
+    try:
+        stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+        return bulk_upsert_students(iter_import_rows(stream, fmt), batch_size)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="File must be UTF-8 encoded")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/students/export")
+def export_students(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    department: str = None,
+    created_from: str = None,
+    created_to: str = None,
+    fields: str = None,
+):
+    # Rows are written as the cursor yields them, so memory stays flat.
+    try:
+        rows = iter_students(department, created_from, created_to, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid date: {e}")
+    if format == "csv":
+        columns = ["_id"] + list(student_projection(fields))
+
+        def csv_lines():
+            buffer = io.StringIO()
+            writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+            writer.writeheader()
+            for row in rows:
+                writer.writerow(row)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+
+        return StreamingResponse(csv_lines(), media_type="text/csv",
+                                 headers={"Content-Disposition": "attachment; filename=students.csv"})
+
+    ndjson_lines = (json.dumps(row, default=str) + "\n" for row in rows)
+    return StreamingResponse(ndjson_lines, media_type="application/x-ndjson",
+                             headers={"Content-Disposition": "attachment; filename=students.ndjson"})
+
+
+@router.get("/students/search")
+def search_students_fuzzy(q: str = Query(..., min_length=1, max_length=200), limit: int = Query(10, ge=1, le=50)):
+    # Declared before /students/{student_id} so "search" is not taken for an id.
+    result = search_students(q, limit)
+    return {**result, "count": len(result["results"])}
+
+
 @router.get("/students/{student_id}")
 def get_student_by_id(student_id: str):
     try:
@@ -56,9 +124,18 @@ def delete_student_by_id(student_id: str):
 
 
 @router.get("/students")
-def list_all_students():
+def list_all_students(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: str = None,
+    department: str = None,
+    created_from: str = None,
+    created_to: str = None,
+    fields: str = None,
+):
     try:
-        students = list_students()
-        return {"students": students, "count": len(students)}
+        page = list_students(limit, cursor, department, created_from, created_to, fields)
+        return {"students": page["students"], "count": len(page["students"]), "next_cursor": page["next_cursor"]}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor or date: {e}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,260 @@
+import os
+import re
+import sys
+import threading
+from array import array
+import numpy as np
+from backend import data_versions, metrics
+from backend.background import PeriodicTask
+from backend.db import students_collection
+
+STUDENT_SEARCH_REFRESH_SECONDS = float(os.getenv("STUDENT_SEARCH_REFRESH_SECONDS", "300"))
+# Query grams are used rarest first until this many postings have been read,
+# so grams shared by most students ("edu", "cam") do not dominate latency.
+STUDENT_SEARCH_MAX_POSTINGS = int(os.getenv("STUDENT_SEARCH_MAX_POSTINGS", "20000"))
+STUDENT_SEARCH_MAX_RESULTS = int(os.getenv("STUDENT_SEARCH_MAX_RESULTS", "50"))
+
+# Indexed fields and how much a match on each counts.
+FIELDS = ("name", "email", "student_id", "department")
+WEIGHTS = (1.0, 0.9, 1.0, 0.6)
+_WEIGHTS = np.array(WEIGHTS)
+
+_TOKEN = re.compile(r"[^\W_]+")
+
+_builds = metrics.counter("student_search_builds_total", "Full rebuilds of the student search index")
+_searches = metrics.histogram("student_search_seconds", "Student search latency (in memory)")
+_students_gauge = metrics.gauge("student_search_students", "Students in the search index")
+_memory_gauge = metrics.gauge("student_search_memory_bytes", "Approximate size of the student search index")
+
+
+def grams(text: str, query: bool = False) -> list:
+    """Trigrams of each word padded with spaces (so word starts and ends
+    count). Indexed words also get a one-letter prefix gram, which a query
+    only uses for a one-letter word (it would match most students otherwise).
+    A query's last word is treated as a prefix: it may still be typed."""
+    out = []
+    tokens = _TOKEN.findall(str(text or "").lower())
+    for i, token in enumerate(tokens):
+        padded = f" {token} "
+        if query and i == len(tokens) - 1:
+            padded = padded[:-1]
+        if not query or len(token) == 1:
+            out.append(padded[:2])
+        if not query or len(token) > 1:
+            out.extend(padded[j:j + 3] for j in range(len(padded) - 2))
+    return out
+
+
+class _Index:
+    """Append-only postings: a student is a dense int; updates add a new
+    entry and tombstone the old one, and the index is rebuilt when too much
+    of it is dead."""
+
+    def __init__(self):
+        self.postings = [{} for _ in FIELDS]      # per field: gram -> array of doc number * 4 + field
+        self.lengths = array("H")                 # doc number * 4 + field -> distinct grams
+        self.docs = []                            # doc number -> (_id, name, email, student_id, department)
+        self.alive = bytearray()
+        self.by_id = {}                           # _id -> doc number
+        self.dead = 0
+
+    def add(self, student: dict):
+        _id = str(student["_id"])
+        if _id in self.by_id:
+            self.remove(_id)
+        number = len(self.docs)
+        self.docs.append((_id, student.get("name"), student.get("email"),
+                          student.get("student_id"), student.get("department")))
+        self.alive.append(1)
+        self.by_id[_id] = number
+        for f, field in enumerate(FIELDS):
+            field_grams = set(grams(student.get(field)))
+            self.lengths.append(min(len(field_grams), 65535))
+            postings = self.postings[f]
+            for gram in field_grams:
+                posting = postings.get(gram)
+                if posting is None:
+                    posting = postings[gram] = array("i")
+                posting.append(number * 4 + f)
+
+    def remove(self, _id: str):
+        number = self.by_id.pop(str(_id), None)
+        if number is not None and self.alive[number]:
+            self.alive[number] = 0
+            self.dead += 1
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def search(self, query: str, limit: int) -> list:
+        query_grams = set(grams(query, query=True))
+        if not query_grams or not self.docs:
+            return []
+        q = len(query_grams)
+        parts, read = [], 0
+        for f in range(len(FIELDS)):
+            postings = self.postings[f]
+            found = [p for p in (postings.get(g) for g in query_grams) if p is not None]
+            parts.extend((len(p), p) for p in found)
+        # Rarest grams first pick the candidates; once the budget is spent,
+        # the common grams are only checked against a shortlist. Postings
+        # are sorted (doc numbers only grow), so that is a binary search.
+        keys, skipped = [], []
+        for size, posting in sorted(parts, key=lambda part: part[0]):
+            # Entries are (doc number, field) packed into one int, so one np.unique counts both.
+            entries = np.frombuffer(posting, dtype=np.int32)
+            if read and read + size > STUDENT_SEARCH_MAX_POSTINGS:
+                skipped.append(entries)
+            else:
+                keys.append(entries)
+                read += size
+        if not keys:
+            return []
+        candidates, matched = np.unique(np.concatenate(keys), return_counts=True)
+        scores = self._scores(candidates, matched, q)
+        if skipped:
+            shortlist = min(len(scores), max(100, limit * 10))
+            pick = np.argpartition(-scores, shortlist - 1)[:shortlist]
+            candidates, matched = candidates[pick], matched[pick]
+            for posting in skipped:
+                at = np.minimum(np.searchsorted(posting, candidates), len(posting) - 1)
+                matched = matched + (posting[at] == candidates)
+            scores = self._scores(candidates, matched, q)
+        numbers = candidates >> 2
+        # A student counts once, with their best field (up to four entries each).
+        top = min(len(scores), limit * len(FIELDS))
+        order = np.argpartition(-scores, top - 1)[:top]
+        order = order[np.argsort(-scores[order], kind="stable")]
+        out, seen = [], set()
+        for i in order:
+            if scores[i] <= 0 or len(out) >= limit:
+                break
+            n = int(numbers[i])
+            if n in seen:
+                continue
+            seen.add(n)
+            doc = self.docs[n]
+            out.append({"_id": doc[0], "name": doc[1], "email": doc[2], "student_id": doc[3],
+                        "department": doc[4], "score": round(float(scores[i]), 3)})
+        return out
+
+    def _scores(self, candidates, matched, q: int):
+        lengths = np.frombuffer(self.lengths, dtype=np.uint16)[candidates]
+        # Mostly "how much of the query matched", with a small preference for
+        # fields that are mostly the query (an exact id or name scores 1.0).
+        scores = _WEIGHTS[candidates & 3] * matched / q * (0.8 + 0.2 * matched / np.maximum(lengths, 1))
+        scores[np.frombuffer(self.alive, dtype=np.uint8)[candidates >> 2] == 0] = 0.0
+        return scores
+
+    def memory_bytes(self) -> int:
+        total = sys.getsizeof(self.docs) + sys.getsizeof(self.alive) + sys.getsizeof(self.by_id)
+        for doc in self.docs:
+            total += sys.getsizeof(doc) + sum(sys.getsizeof(v) for v in doc)
+        total += sys.getsizeof(self.lengths)
+        for postings in self.postings:
+            total += sys.getsizeof(postings)
+            total += sum(sys.getsizeof(g) + sys.getsizeof(p) for g, p in postings.items())
+        return total
+
+
+class StudentSearchIndex:
+    """In-memory fuzzy search over name, email, student_id and department.
+
+    Built from Mongo in the background at startup and kept current from the
+    student write notifications in this worker; a periodic rebuild picks up
+    writes made by other workers (and bulk imports, which carry no rows).
+    Results come from memory, with no Mongo round trip.
+    """
+
+    def __init__(self, refresh_seconds: float = STUDENT_SEARCH_REFRESH_SECONDS):
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._index = None
+        self._pending = None
+        self._rebuilder = PeriodicTask("student-search-rebuild", refresh_seconds, self.rebuild)
+
+    def start(self):
+        self._rebuilder.start()
+        self._rebuilder.trigger()
+
+    def stop(self):
+        self._rebuilder.stop(final_run=False)
+
+    @property
+    def loaded(self) -> bool:
+        return self._index is not None
+
+    def rebuild(self):
+        with self._build_lock:
+            with self._lock:
+                # Writes that land while the collection is read are replayed on the new index.
+                self._pending = []
+            index = _Index()
+            try:
+                cursor = students_collection.find({}, {f: 1 for f in FIELDS}).batch_size(5000)
+                for student in cursor:
+                    index.add(student)
+            except Exception:
+                with self._lock:
+                    self._pending = None
+                raise
+            with self._lock:
+                for op, payload in self._pending:
+                    self._apply(index, op, payload)
+                self._pending = None
+                self._index = index
+            _builds.inc()
+            _students_gauge.set(len(index))
+            _memory_gauge.set(index.memory_bytes())
+
+    def apply_write(self, collection: str, op: str, payload: dict):
+        if op == "bulk":
+            self._rebuilder.trigger()
+            return
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((op, payload))
+            if self._index is not None:
+                self._apply(self._index, op, payload)
+                index = self._index
+            else:
+                return
+        _students_gauge.set(len(index))
+        if index.dead > max(1000, len(index) // 4):
+            self._rebuilder.trigger()
+
+    @staticmethod
+    def _apply(index: _Index, op: str, payload: dict):
+        doc = payload.get("doc")
+        if not doc:
+            return
+        if op in ("insert", "update"):
+            index.add(doc)
+        elif op == "delete":
+            index.remove(doc["_id"])
+
+    def search(self, query: str, limit: int = 10) -> list:
+        if self._index is None:
+            # Startup build not finished yet: build here rather than answer empty.
+            self.rebuild()
+        with _searches.time():
+            with self._lock:
+                return self._index.search(query, max(1, min(int(limit), STUDENT_SEARCH_MAX_RESULTS)))
+
+    def stats(self) -> dict:
+        with self._lock:
+            index = self._index
+            if index is None:
+                return {"loaded": False}
+            return {
+                "loaded": True,
+                "students": len(index),
+                "tombstones": index.dead,
+                "grams": sum(len(p) for p in index.postings),
+                "postings": sum(len(a) for p in index.postings for a in p.values()),
+                "memory_bytes": index.memory_bytes(),
+            }
+
+
+student_search = StudentSearchIndex()
+data_versions.subscribe("students", student_search.apply_write)
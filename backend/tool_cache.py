@@ -0,0 +1,93 @@
+import os
+import copy
+import json
+import time
+import threading
+from collections import OrderedDict
+from backend import data_versions, metrics
+from backend.response_cache import TOOL_READS
+
+TOOL_CACHE_ENABLED = os.getenv("TOOL_CACHE_ENABLED", "true").lower() == "true"
+TOOL_CACHE_TTL_SECONDS = float(os.getenv("TOOL_CACHE_TTL_SECONDS", "5"))
+TOOL_CACHE_MAX_ENTRIES = int(os.getenv("TOOL_CACHE_MAX_ENTRIES", "256"))
+
+# Read-only tools whose results may be reused. get_student is left out
+# because each lookup is recorded as student activity.
+CACHEABLE_TOOLS = {
+    "list_students", "get_total_students", "get_students_by_department", "get_recent_onboarded_students",
+    "get_active_students_last_7_days", "get_active_students", "list_events", "search_documents",
+}
+
+MISSING = object()
+_entries_gauge = metrics.gauge("tool_cache_entries", "Tool results currently cached")
+_invalidations = metrics.counter("tool_cache_invalidations_total", "Tool results dropped because data changed")
+
+
+class ToolResultCache:
+    """Short-lived cache of read-only tool results, keyed by tool and arguments.
+
+    Entries are tagged with the collections the tool reads (``TOOL_READS``)
+    and dropped as soon as this worker writes to one of them. The TTL bounds
+    how long a write made by another worker can go unseen.
+    """
+
+    def __init__(self, ttl_seconds: float = TOOL_CACHE_TTL_SECONDS, max_entries: int = TOOL_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(tool: str, arguments: dict) -> str:
+        return json.dumps([tool, arguments], sort_keys=True, default=str)
+
+    def get(self, tool: str, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[2] > self.ttl_seconds:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None:
+            metrics.counter("tool_cache_misses_total", "Cacheable tool calls that ran the tool", tool=tool).inc()
+            return MISSING
+        metrics.counter("tool_cache_hits_total", "Tool calls answered from the cache", tool=tool).inc()
+        # Callers own their result; never hand out the cached object itself.
+        return copy.deepcopy(entry[0])
+
+    def put(self, tool: str, key: str, result, versions: dict):
+        tags = TOOL_READS.get(tool, set())
+        # A write that landed while the tool ran may not be reflected in it.
+        if data_versions.snapshot(tags) != versions:
+            return
+        with self._lock:
+            self._entries[key] = (copy.deepcopy(result), tags, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            _entries_gauge.set(len(self._entries))
+
+    def invalidate(self, collection: str, op: str = None, payload: dict = None):
+        with self._lock:
+            stale = [k for k, entry in self._entries.items() if collection in entry[1]]
+            for k in stale:
+                del self._entries[k]
+            _entries_gauge.set(len(self._entries))
+        _invalidations.inc(len(stale))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            _entries_gauge.set(0)
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = len(self._entries)
+        return {"enabled": TOOL_CACHE_ENABLED, "entries": size, "ttl_seconds": self.ttl_seconds,
+                **metrics.snapshot("tool_cache_")}
+
+
+tool_cache = ToolResultCache()
+for _collection in sorted(set().union(*TOOL_READS.values())):
+    data_versions.subscribe(_collection, tool_cache.invalidate)
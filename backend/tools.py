@@ -1,89 +1,291 @@
 import os
+import csv
+import io
+import json
+import time
 import datetime
-import pymongo
+import asyncio
+import inspect
+import functools
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError, BulkWriteError
+from pydantic import ValidationError
 from typing import Dict, Any, List
 from agents import function_tool
-from backend.db import students_collection, admins_collection, get_db
+from backend.db import students_collection, admins_collection, get_db, run_in_db_pool
+from backend import data_versions, metrics
+from backend.data_versions import notify_write
+from backend.response_cache import TOOL_READS
+from backend.tool_cache import tool_cache, TOOL_CACHE_ENABLED, CACHEABLE_TOOLS, MISSING
+from backend.tracing import record_span
+from backend.models import Student
+from backend.activity import activity_tracker
+from backend.rag_agent import document_index, RAG_TOP_K
+from backend.email_outbox import email_outbox, EMAIL_DEFAULT_SUBJECT
+from backend.events import parse_event_time, location_key, event_filter
+from backend.student_search import student_search
+from backend.pagination import encode_cursor, decode_cursor
 
 # ----------------- Student Functions -----------------
-def add_student(name: str, student_id: int, department: str, email: str) -> Dict[str, Any]:
+def _normalize_student_id(student_id) -> str:
+    return str(student_id).strip()
+
+def _student_query(identifier: str) -> Dict[str, Any]:
+    # Single indexed lookup by email or student_id (ids are stored as strings).
+    identifier = identifier.strip()
+    return {"$or": [{"email": identifier.lower()}, {"student_id": identifier}]}
+
+def _duplicate_field(error: DuplicateKeyError) -> str:
+    key_pattern = (error.details or {}).get("keyPattern") or {"email": 1}
+    return next(iter(key_pattern))
+
+def add_student(name: str, student_id: str, department: str, email: str) -> Dict[str, Any]:
     email = email.lower().strip()
-    if students_collection.find_one({"email": email}):
-        return {"error": f"Student with email {email} already exists"}
     student = {
         "name": name,
-        "student_id": student_id,
+        "student_id": _normalize_student_id(student_id),
         "department": department,
         "email": email,
         "created_at": datetime.datetime.now()
     }
-    result = students_collection.insert_one(student)
+    try:
+        result = students_collection.insert_one(student)
+    except DuplicateKeyError as e:
+        field = _duplicate_field(e)
+        return {"error": f"Student with {field} {student[field]} already exists"}
     student["_id"] = str(result.inserted_id)
+    notify_write("students", "insert", doc=student)
     return {"message": "Student added successfully", "student": student}
 
 def get_student(identifier: str) -> Dict[str, Any]:
-    identifier = identifier.strip()
-    student = students_collection.find_one({"email": identifier.lower()}) \
-              or students_collection.find_one({"student_id": identifier})
-    if student:
-        student["_id"] = str(student["_id"])
-        return student
-    try:
-        sid = int(identifier)
-        student = students_collection.find_one({"student_id": sid})
-        if student:
-            student["_id"] = str(student["_id"])
-            return student
-    except Exception:
-        pass
-    return {"error": "Student not found"}
+    student = students_collection.find_one(_student_query(identifier))
+    if not student:
+        if student_search.loaded:
+            # Likely a typo or partial name: offer the closest matches instead of a dead end.
+            return {"error": "Student not found", "did_you_mean": student_search.search(identifier, 3)}
+        return {"error": "Student not found"}
+    student["_id"] = str(student["_id"])
+    activity_tracker.record(student["student_id"], "lookup")
+    return student
 
 def update_student(identifier: str, field: str, new_value: str) -> Dict[str, Any]:
-    identifier = identifier.strip()
     if field not in ["name", "department", "email", "student_id"]:
         return {"error": "Invalid field"}
-    student = students_collection.find_one({"email": identifier.lower()}) \
-              or students_collection.find_one({"student_id": identifier})
-    if not student:
-        try:
-            sid = int(identifier)
-            student = students_collection.find_one({"student_id": sid})
-        except:
-            pass
-    if not student:
-        return {"error": "Student not found"}
     if field == "email":
         new_value = new_value.lower().strip()
-    result = students_collection.update_one(
-        {"_id": student["_id"]}, 
-        {"$set": {field: new_value}}
-    )
-    if result.matched_count:
-        updated_student = students_collection.find_one({"_id": student["_id"]})
-        updated_student["_id"] = str(updated_student["_id"])
-        return {"message": "Student updated successfully", "student": updated_student}
-    return {"error": "Update failed"}
+    elif field == "student_id":
+        new_value = _normalize_student_id(new_value)
+    try:
+        # Fetch the old version so write subscribers see what changed.
+        previous = students_collection.find_one_and_update(
+            _student_query(identifier),
+            {"$set": {field: new_value}},
+            return_document=ReturnDocument.BEFORE,
+        )
+    except DuplicateKeyError:
+        return {"error": f"Student with {field} {new_value} already exists"}
+    if not previous:
+        return {"error": "Student not found"}
+    previous["_id"] = str(previous["_id"])
+    updated_student = {**previous, field: new_value}
+    notify_write("students", "update", before=previous, doc=updated_student)
+    activity_tracker.record(updated_student["student_id"], "update")
+    return {"message": "Student updated successfully", "student": updated_student}
 
 def delete_student(identifier: str) -> Dict[str, Any]:
-    identifier = identifier.strip()
-    query = {"email": identifier.lower()} if "@" in identifier else {"student_id": identifier}
-    result = students_collection.delete_one(query)
-    if result.deleted_count:
-        return {"message": "Student deleted successfully"}
-    try:
-        sid = int(identifier)
-        result = students_collection.delete_one({"student_id": sid})
-        if result.deleted_count:
-            return {"message": "Student deleted successfully"}
-    except Exception:
-        pass
-    return {"error": "Student not found"}
-
-def list_students() -> Dict[str, Any]:
-    result = list(students_collection.find().sort("created_at", -1))
+    student = students_collection.find_one_and_delete(_student_query(identifier))
+    if not student:
+        return {"error": "Student not found"}
+    student["_id"] = str(student["_id"])
+    notify_write("students", "delete", doc=student)
+    return {"message": "Student deleted successfully"}
+
+def search_students(query: str, limit: int = 10) -> Dict[str, Any]:
+    """Fuzzy search students by partial or misspelled name, email, student ID
+    or department. Returns the best matches with a 0-1 score.
+
+    Args:
+        query: What to look for, e.g. "jon smth" or "smith@".
+        limit: Maximum matches (max 50).
+    """
+    return {"query": query, "results": student_search.search(query, limit)}
+
+STUDENT_FIELDS = ("name", "student_id", "department", "email", "created_at")
+STUDENT_PAGE_MAX = int(os.getenv("STUDENT_PAGE_MAX", "500"))
+
+def _student_filter(department: str = None, created_from: str = None, created_to: str = None) -> Dict[str, Any]:
+    query = {}
+    if department:
+        query["department"] = department
+    if created_from or created_to:
+        query["created_at"] = {}
+        if created_from:
+            query["created_at"]["$gte"] = datetime.datetime.fromisoformat(created_from)
+        if created_to:
+            query["created_at"]["$lte"] = datetime.datetime.fromisoformat(created_to)
+    return query
+
+def student_projection(fields: str = None) -> Dict[str, int]:
+    # created_at and _id are always returned: the page cursor is built from them.
+    wanted = [f.strip() for f in fields.split(",")] if fields else STUDENT_FIELDS
+    projection = {f: 1 for f in wanted if f in STUDENT_FIELDS}
+    projection["created_at"] = 1
+    return projection
+
+def list_students(limit: int = 50, cursor: str = None, department: str = None,
+                  created_from: str = None, created_to: str = None, fields: str = None) -> Dict[str, Any]:
+    """List students newest first, one page at a time.
+
+    Args:
+        limit: Page size (max 500).
+        cursor: next_cursor from the previous page.
+        department: Only students in this department.
+        created_from: ISO date; only students created on or after it.
+        created_to: ISO date; only students created on or before it.
+        fields: Comma-separated fields to return (name, student_id, department, email, created_at).
+    """
+    limit = max(1, min(int(limit), STUDENT_PAGE_MAX))
+    query = _student_filter(department, created_from, created_to)
+    if cursor:
+        # Keyset pagination on (created_at, _id): an index seek, no skip().
+        created_at, last_id = decode_cursor(cursor)
+        query = {"$and": [query, {"$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": last_id}},
+        ]}]}
+    result = list(
+        students_collection.find(query, student_projection(fields))
+        .sort([("created_at", -1), ("_id", -1)])
+        .limit(limit + 1)
+    )
+    next_cursor = encode_cursor(result[limit - 1]) if len(result) > limit else None
+    result = result[:limit]
     for s in result:
         s["_id"] = str(s["_id"])
-    return {"students": result}
+    return {"students": result, "next_cursor": next_cursor}
+
+def iter_students(department: str = None, created_from: str = None, created_to: str = None,
+                  fields: str = None, batch_size: int = 500):
+    """Return an iterator over matching students, read straight off the
+    cursor (for exports). The filter is built here, so a bad date raises
+    ValueError before anything is streamed."""
+    cursor = students_collection.find(
+        _student_filter(department, created_from, created_to), student_projection(fields)
+    ).sort([("created_at", -1), ("_id", -1)]).batch_size(batch_size)
+
+    def rows():
+        for s in cursor:
+            s["_id"] = str(s["_id"])
+            yield s
+    return rows()
+
+# ----------------- Bulk Import -----------------
+STUDENT_IMPORT_BATCH_SIZE = int(os.getenv("STUDENT_IMPORT_BATCH_SIZE", "1000"))
+STUDENT_IMPORT_MAX_ERRORS = int(os.getenv("STUDENT_IMPORT_MAX_ERRORS", "1000"))
+
+def iter_import_rows(stream, fmt: str = "csv"):
+    """Yield ``(row_number, row)`` from a CSV or NDJSON text stream, one line
+    at a time. Unparseable lines yield the parse error instead of a row; a
+    decoding error ends the stream with an error for the line it hit."""
+    line_number = 0
+    try:
+        if fmt == "csv":
+            reader = csv.DictReader(stream)
+            for row in reader:
+                line_number = reader.line_num
+                if None in row:
+                    yield line_number, ValueError("row has more columns than the header")
+                else:
+                    yield line_number, row
+            return
+        for line_number, line in enumerate(stream, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_number, ValueError(f"invalid JSON: {e.msg}")
+                continue
+            if not isinstance(row, dict):
+                yield line_number, ValueError("expected a JSON object")
+            else:
+                yield line_number, row
+    except (UnicodeDecodeError, csv.Error) as e:
+        reason = "file is not valid UTF-8" if isinstance(e, UnicodeDecodeError) else str(e)
+        yield line_number + 1, ValueError(f"{reason}; this and later rows were not imported")
+
+def _add_import_error(report: Dict[str, Any], row_number: int, error: str):
+    report["failed"] += 1
+    if len(report["errors"]) < STUDENT_IMPORT_MAX_ERRORS:
+        report["errors"].append({"row": row_number, "error": error})
+
+def _write_student_batch(batch: list, report: Dict[str, Any]):
+    try:
+        result = students_collection.bulk_write([op for _, op in batch], ordered=False)
+        inserted, updated = result.upserted_count, result.matched_count
+    except BulkWriteError as e:
+        details = e.details
+        inserted, updated = details.get("nUpserted", 0), details.get("nMatched", 0)
+        for error in details.get("writeErrors", []):
+            row_number = batch[error["index"]][0]
+            if error.get("code") == 11000:
+                field = next(iter(error.get("keyPattern") or {"email": 1}))
+                _add_import_error(report, row_number, f"{field} already belongs to another student")
+            else:
+                _add_import_error(report, row_number, error.get("errmsg", "write failed"))
+    report["inserted"] += inserted
+    report["updated"] += updated
+
+def bulk_upsert_students(rows, batch_size: int = STUDENT_IMPORT_BATCH_SIZE) -> Dict[str, Any]:
+    """Validate rows with the Student model and upsert them by student_id in
+    unordered bulk writes of ``batch_size``. Returns a per-row error report."""
+    report = {"processed": 0, "inserted": 0, "updated": 0, "failed": 0, "errors": []}
+    now = datetime.datetime.now()
+    batch = []
+    for row_number, row in rows:
+        report["processed"] += 1
+        if isinstance(row, Exception):
+            _add_import_error(report, row_number, str(row))
+            continue
+        if not isinstance(row, dict) or any(not isinstance(key, str) for key in row):
+            _add_import_error(report, row_number, "expected one object with name, student_id, department, email")
+            continue
+        if row.get("student_id") is not None:
+            row["student_id"] = _normalize_student_id(row["student_id"])
+        try:
+            student = Student(**row)
+        except ValidationError as e:
+            _add_import_error(report, row_number, "; ".join(
+                f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()
+            ))
+            continue
+        except TypeError as e:
+            _add_import_error(report, row_number, str(e))
+            continue
+        batch.append((row_number, UpdateOne(
+            {"student_id": student.student_id},
+            {
+                "$set": {"name": student.name, "department": student.department, "email": student.email.lower()},
+                "$setOnInsert": {"created_at": now},
+            },
+            upsert=True,
+        )))
+        if len(batch) >= batch_size:
+            _write_student_batch(batch, report)
+            batch = []
+    if batch:
+        _write_student_batch(batch, report)
+    if report["inserted"] or report["updated"]:
+        notify_write("students", "bulk", inserted=report["inserted"], updated=report["updated"])
+    return report
+
+def import_students_csv(csv_text: str) -> Dict[str, Any]:
+    """Add or update many students at once from CSV text with the header
+    name,student_id,department,email. Existing student_ids are updated."""
+    return bulk_upsert_students(iter_import_rows(io.StringIO(csv_text), "csv"))
 
 # ----------------- Analytics Functions -----------------
 def get_total_students() -> Dict[str, Any]:
@@ -102,72 +304,329 @@ def get_recent_onboarded_students(limit: int = 5) -> Dict[str, Any]:
         out.append(s)
     return {"recent_students": out}
 
-def get_active_students_last_7_days() -> Dict[str, Any]:
-    cursor = students_collection.find().limit(3)
+def get_active_students(days: int = 7, limit: int = 50) -> Dict[str, Any]:
+    """Students with recorded activity (lookups, updates, emails, chat
+    mentions) in the last ``days`` days, most recently active first."""
+    activity = activity_tracker.active_students(int(days), int(limit))
+    if not activity:
+        return {"active_students": [], "days": int(days)}
+    students = {
+        s["student_id"]: s
+        for s in students_collection.find({"student_id": {"$in": [a["student_id"] for a in activity]}})
+    }
     out = []
-    for s in cursor:
-        s["_id"] = str(s["_id"])
-        out.append(s)
-    return {"active_last_7_days": out}
+    for a in activity:
+        s = students.get(a["student_id"])
+        if s:
+            s["_id"] = str(s["_id"])
+            out.append({**s, "last_active": a["last_seen"], "activity_count": a["events"]})
+    return {"active_students": out, "days": int(days)}
+
+def get_active_students_last_7_days() -> Dict[str, Any]:
+    return {"active_last_7_days": get_active_students(7)["active_students"]}
 
 # ----------------- Event Functions -----------------
-def add_event(name: str, date: str, location: str):
-    event = {"name": name, "date": date, "location": location}
+# Events carry parsed starts_at/ends_at datetimes and a normalized
+# location_key, so date-range, upcoming and per-location questions are index
+# range scans (see backend/indexes.py) returning one page, not the collection.
+EVENT_PAGE_MAX = int(os.getenv("EVENT_PAGE_MAX", "200"))
+EVENT_PROJECTION = {"location_key": 0}
+
+def _event_id(event_id: str):
+    try:
+        return ObjectId(event_id)
+    except (InvalidId, TypeError):
+        return None
+
+def add_event(name: str, date: str, location: str, end_date: str = None) -> Dict[str, Any]:
+    """Add a campus event.
+
+    Args:
+        name: Event name.
+        date: Start, as YYYY-MM-DD or YYYY-MM-DDTHH:MM.
+        location: Where it takes place.
+        end_date: Optional end, same format; defaults to the start.
+    """
+    try:
+        starts_at = parse_event_time(date)
+        ends_at = parse_event_time(end_date) if end_date else starts_at
+    except ValueError as e:
+        return {"error": str(e)}
+    if ends_at < starts_at:
+        return {"error": "end_date is before date"}
+    event = {
+        "name": name,
+        "location": location,
+        "location_key": location_key(location),
+        "starts_at": starts_at,
+        "ends_at": ends_at,
+        "created_at": datetime.datetime.now(),
+    }
     result = get_db.insert_one(event)
     event["_id"] = str(result.inserted_id)
+    del event["location_key"]
+    notify_write("events", "insert", doc=event)
     return {"message": "Event added", "event": event}
 
-def update_event(event_id: str, name: str = None, date: str = None, location: str = None):
-    update_fields = {k: v for k, v in (("name", name), ("date", date), ("location", location)) if v}
-    result = get_db.update_one({"_id": pymongo.ObjectId(event_id)}, {"$set": update_fields})
-    if result.matched_count:
-        updated_event = get_db.find_one({"_id": pymongo.ObjectId(event_id)})
-        updated_event["_id"] = str(updated_event["_id"])
-        return {"message": "Event updated", "event": updated_event}
-    return {"error": "Event not found"}
-
-def delete_event(event_id: str):
-    result = get_db.delete_one({"_id": pymongo.ObjectId(event_id)})
-    if result.deleted_count:
-        return {"message": "Event deleted", "event_id": event_id}
-    return {"error": "Event not found"}
-
-def list_events():
-    events = list(get_db.find())
-    for event in events:
+def update_event(event_id: str, name: str = None, date: str = None, location: str = None,
+                 end_date: str = None) -> Dict[str, Any]:
+    """Change an event's name, start, end or location. Moving the start
+    without an end_date keeps the event's duration."""
+    oid = _event_id(event_id)
+    if oid is None:
+        return {"error": "Event not found"}
+    update_fields = {}
+    if name:
+        update_fields["name"] = name
+    if location:
+        update_fields["location"] = location
+        update_fields["location_key"] = location_key(location)
+    try:
+        if date:
+            update_fields["starts_at"] = parse_event_time(date)
+        if end_date:
+            update_fields["ends_at"] = parse_event_time(end_date)
+    except ValueError as e:
+        return {"error": str(e)}
+    if not update_fields:
+        return {"error": "Nothing to update"}
+    if bool(date) != bool(end_date):
+        # Only one end moves: the other comes from the stored event.
+        previous = get_db.find_one({"_id": oid}, {"starts_at": 1, "ends_at": 1})
+        if not previous:
+            return {"error": "Event not found"}
+        starts_at, ends_at = previous.get("starts_at"), previous.get("ends_at")
+        if date:
+            duration = datetime.timedelta(0)
+            if isinstance(starts_at, datetime.datetime) and isinstance(ends_at, datetime.datetime):
+                duration = ends_at - starts_at
+            update_fields["ends_at"] = update_fields["starts_at"] + duration
+        elif isinstance(starts_at, datetime.datetime) and update_fields["ends_at"] < starts_at:
+            return {"error": "end_date is before date"}
+    elif date and update_fields["ends_at"] < update_fields["starts_at"]:
+        return {"error": "end_date is before date"}
+    updated_event = get_db.find_one_and_update(
+        {"_id": oid}, {"$set": update_fields}, projection=EVENT_PROJECTION, return_document=ReturnDocument.AFTER,
+    )
+    if not updated_event:
+        return {"error": "Event not found"}
+    updated_event["_id"] = str(updated_event["_id"])
+    notify_write("events", "update", doc=updated_event)
+    return {"message": "Event updated", "event": updated_event}
+
+def delete_event(event_id: str) -> Dict[str, Any]:
+    oid = _event_id(event_id)
+    if oid is None or not get_db.delete_one({"_id": oid}).deleted_count:
+        return {"error": "Event not found"}
+    notify_write("events", "delete", event_id=event_id)
+    return {"message": "Event deleted", "event_id": event_id}
+
+def list_events(date_from: str = None, date_to: str = None, location: str = None,
+                limit: int = 50, cursor: str = None) -> Dict[str, Any]:
+    """List events in start order, one page at a time.
+
+    Args:
+        date_from: YYYY-MM-DD (or with time); only events starting on or after it.
+        date_to: YYYY-MM-DD (or with time); only events starting on or before it.
+        location: Only events at this location (case-insensitive).
+        limit: Page size (max 200).
+        cursor: next_cursor from the previous page.
+    """
+    limit = max(1, min(int(limit), EVENT_PAGE_MAX))
+    try:
+        query = event_filter(date_from, date_to, location)
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        return {"error": str(e)}
+    query.setdefault("starts_at", {"$exists": True})
+    if after:
+        starts_at, last_id = after
+        query = {"$and": [query, {"$or": [
+            {"starts_at": {"$gt": starts_at}},
+            {"starts_at": starts_at, "_id": {"$gt": last_id}},
+        ]}]}
+    result = list(
+        get_db.find(query, EVENT_PROJECTION)
+        .sort([("starts_at", 1), ("_id", 1)])
+        .limit(limit + 1)
+    )
+    next_cursor = encode_cursor(result[limit - 1], "starts_at") if len(result) > limit else None
+    result = result[:limit]
+    for event in result:
         event["_id"] = str(event["_id"])
-    return {"events": events}
+    return {"events": result, "next_cursor": next_cursor}
+
+def upcoming_events(days: int = 7, location: str = None, limit: int = 20) -> Dict[str, Any]:
+    """Events starting between now and ``days`` days from now, soonest first.
+
+    Args:
+        days: How far ahead to look (max 366).
+        location: Only events at this location (case-insensitive).
+        limit: Maximum events to return.
+    """
+    now = datetime.datetime.now()
+    days = max(0, min(int(days), 366))
+    result = list_events(now, now + datetime.timedelta(days=days), location, limit)
+    result["days"] = days
+    return result
 
 # ----------------- Email -----------------
-def send_email(student_identifier: str, message: str) -> Dict[str, Any]:
-    student_identifier = student_identifier.strip()
-    student = students_collection.find_one({"email": student_identifier.lower()})
+# Emails are queued in the outbox and delivered by its background dispatcher,
+# so a tool call costs one insert, not an SMTP round trip.
+EMAIL_BULK_MAX_RECIPIENTS = int(os.getenv("EMAIL_BULK_MAX_RECIPIENTS", "5000"))
+
+def send_email(student_identifier: str, message: str, subject: str = EMAIL_DEFAULT_SUBJECT) -> Dict[str, Any]:
+    """Email one student, found by email or student ID. Delivery happens in the background."""
+    student = students_collection.find_one(_student_query(student_identifier), {"email": 1, "student_id": 1})
     if not student:
+        return {"error": "Student not found"}
+    result = email_outbox.enqueue([
+        {"to": student["email"], "student_id": student["student_id"], "subject": subject, "body": message}
+    ])
+    activity_tracker.record(student["student_id"], "email")
+    if result["duplicates"]:
+        return {"message": f"The same email to {student['email']} was already queued today"}
+    return {"message": f"Email to {student['email']} queued for delivery"}
+
+def email_students(message: str, subject: str = EMAIL_DEFAULT_SUBJECT, department: str = None,
+                   created_from: str = None, created_to: str = None) -> Dict[str, Any]:
+    """Email every student in a department and/or created in a date range.
+
+    Args:
+        message: Email body.
+        subject: Email subject.
+        department: Only students in this department.
+        created_from: ISO date; only students created on or after it.
+        created_to: ISO date; only students created on or before it.
+    """
+    if not (department or created_from or created_to):
+        return {"error": "Give a department or a created_from/created_to range"}
+    try:
+        query = _student_filter(department, created_from, created_to)
+    except ValueError as e:
+        return {"error": f"Invalid date: {e}"}
+    recipients = students_collection.count_documents(query)
+    if recipients > EMAIL_BULK_MAX_RECIPIENTS:
+        return {"error": f"{recipients} students match, more than the limit of {EMAIL_BULK_MAX_RECIPIENTS}; narrow the filter"}
+
+    queued = duplicates = 0
+    batch = []
+    for s in students_collection.find(query, {"email": 1, "student_id": 1}).batch_size(1000):
+        batch.append({"to": s["email"], "student_id": s["student_id"], "subject": subject, "body": message})
+        activity_tracker.record(s["student_id"], "email")
+        if len(batch) == 1000:
+            result = email_outbox.enqueue(batch)
+            queued, duplicates = queued + result["queued"], duplicates + result["duplicates"]
+            batch = []
+    if batch:
+        result = email_outbox.enqueue(batch)
+        queued, duplicates = queued + result["queued"], duplicates + result["duplicates"]
+    return {"recipients": queued + duplicates, "queued": queued, "duplicates": duplicates}
+
+# ----------------- Documents -----------------
+def search_documents(query: str, top_k: int = RAG_TOP_K) -> Dict[str, Any]:
+    """Search indexed campus documents (handbooks, policy PDFs) and return the
+    most relevant passages with their source file and page number."""
+    return {"query": query, "results": document_index.search(query, min(int(top_k), 20))}
+
+# ----------------- Async variants -----------------
+# Same functions, executed on the DB thread pool so async callers (the agent
+# loop, async routes) never block the event loop on a Mongo round trip. The
+# agent SDK awaits all tool calls of one model turn together, so a turn that
+# asks for several tools costs the slowest one, not the sum.
+async def _run_in_thread(fn, *args, **kwargs):
+    return await asyncio.to_thread(fn, *args, **kwargs)
+
+def _to_async(fn, run=run_in_db_pool):
+    name = fn.__name__
+    signature = inspect.signature(fn)
+    seconds = metrics.histogram("agent_tool_seconds", "Tool execution time (cache hits excluded)", tool=name)
+    errors = metrics.counter("agent_tool_errors_total", "Tool calls that raised", tool=name)
+    cacheable = TOOL_CACHE_ENABLED and name in CACHEABLE_TOOLS
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        if cacheable:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = tool_cache.key(name, bound.arguments)
+            cached = tool_cache.get(name, key)
+            if cached is not MISSING:
+                record_span("tool", name, time.perf_counter(), 0.0, cached=True)
+                return cached
+            versions = data_versions.snapshot(TOOL_READS[name])
+        start = time.perf_counter()
         try:
-            sid = int(student_identifier)
-            student = students_collection.find_one({"student_id": sid})
+            result = await run(fn, *args, **kwargs)
         except Exception:
-            pass
-    if not student:
-        return {"error": "Student not found"}
-    print(f"[EMAIL MOCK] to={student['email']} message={message}")
-    return {"message": f"Email mock sent to {student['email']}"}
+            errors.inc()
+            record_span("tool", name, start, time.perf_counter() - start, error=True)
+            raise
+        elapsed = time.perf_counter() - start
+        seconds.observe(elapsed)
+        record_span("tool", name, start, elapsed)
+        if cacheable:
+            tool_cache.put(name, key, result, versions)
+        return result
+    return wrapper
+
+add_student_async = _to_async(add_student)
+get_student_async = _to_async(get_student)
+update_student_async = _to_async(update_student)
+delete_student_async = _to_async(delete_student)
+list_students_async = _to_async(list_students)
+import_students_csv_async = _to_async(import_students_csv)
+
+get_total_students_async = _to_async(get_total_students)
+get_students_by_department_async = _to_async(get_students_by_department)
+get_recent_onboarded_students_async = _to_async(get_recent_onboarded_students)
+get_active_students_last_7_days_async = _to_async(get_active_students_last_7_days)
+get_active_students_async = _to_async(get_active_students)
+
+add_event_async = _to_async(add_event)
+update_event_async = _to_async(update_event)
+delete_event_async = _to_async(delete_event)
+list_events_async = _to_async(list_events)
+upcoming_events_async = _to_async(upcoming_events)
+
+send_email_async = _to_async(send_email)
+email_students_async = _to_async(email_students)
+
+# Student search runs in memory in well under a millisecond, less than a
+# thread hop; only the first search before the index is built goes to the pool.
+async def _run_search(fn, *args, **kwargs):
+    if student_search.loaded:
+        return fn(*args, **kwargs)
+    return await run_in_db_pool(fn, *args, **kwargs)
+
+search_students_async = _to_async(search_students, run=_run_search)
+
+# Document search is numpy work, not a Mongo call, so it runs on the default
+# executor instead of holding a DB pool thread.
+search_documents_async = _to_async(search_documents, run=_run_in_thread)
 
 # ----------------- Wrap with function_tool -----------------
-add_student_tool = function_tool(add_student)
-get_student_tool = function_tool(get_student)
-update_student_tool = function_tool(update_student)
-delete_student_tool = function_tool(delete_student)
-list_students_tool = function_tool(list_students)
-
-get_total_students_tool = function_tool(get_total_students)
-get_students_by_department_tool = function_tool(get_students_by_department)
-get_recent_onboarded_students_tool = function_tool(get_recent_onboarded_students)
-get_active_students_last_7_days_tool = function_tool(get_active_students_last_7_days)
-
-add_event_tool = function_tool(add_event)
-update_event_tool = function_tool(update_event)
-delete_event_tool = function_tool(delete_event)
-list_events_tool = function_tool(list_events)
-
-send_email_tool = function_tool(send_email)
+add_student_tool = function_tool(add_student_async)
+get_student_tool = function_tool(get_student_async)
+update_student_tool = function_tool(update_student_async)
+delete_student_tool = function_tool(delete_student_async)
+list_students_tool = function_tool(list_students_async)
+search_students_tool = function_tool(search_students_async)
+import_students_csv_tool = function_tool(import_students_csv_async)
+
+get_total_students_tool = function_tool(get_total_students_async)
+get_students_by_department_tool = function_tool(get_students_by_department_async)
+get_recent_onboarded_students_tool = function_tool(get_recent_onboarded_students_async)
+get_active_students_last_7_days_tool = function_tool(get_active_students_last_7_days_async)
+get_active_students_tool = function_tool(get_active_students_async)
+
+add_event_tool = function_tool(add_event_async)
+update_event_tool = function_tool(update_event_async)
+delete_event_tool = function_tool(delete_event_async)
+list_events_tool = function_tool(list_events_async)
+upcoming_events_tool = function_tool(upcoming_events_async)
+
+send_email_tool = function_tool(send_email_async)
+email_students_tool = function_tool(email_students_async)
+
+search_documents_tool = function_tool(search_documents_async)
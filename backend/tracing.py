@@ -0,0 +1,206 @@
+import os
+import json
+import time
+import uuid
+import datetime
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from pymongo import monitoring
+from backend import metrics
+from backend.background import PeriodicTask
+
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "200"))
+TRACE_MAX_SPANS = int(os.getenv("TRACE_MAX_SPANS", "500"))
+TRACE_DUMP_PATH = os.getenv("TRACE_DUMP_PATH", "")
+TRACE_DUMP_INTERVAL_SECONDS = float(os.getenv("TRACE_DUMP_INTERVAL_SECONDS", "5"))
+
+# The trace of the HTTP request being handled. Tasks and to_thread calls
+# inherit it; run_in_db_pool copies it onto the Mongo executor threads.
+_current = contextvars.ContextVar("request_trace", default=None)
+
+
+class RequestTrace:
+    """Spans recorded while serving one HTTP request."""
+
+    __slots__ = ("trace_id", "name", "started_at", "start", "duration", "status", "spans", "dropped", "totals")
+
+    def __init__(self, name: str):
+        self.trace_id = uuid.uuid4().hex
+        self.name = name
+        self.started_at = datetime.datetime.utcnow()
+        self.start = time.perf_counter()
+        self.duration = None
+        self.status = None
+        self.spans = []
+        self.dropped = 0
+        # Seconds per span kind (llm / tool / mongo), kept even past TRACE_MAX_SPANS.
+        self.totals = {}
+
+    def add_span(self, kind: str, name: str, start: float, duration: float, attrs: dict):
+        self.totals[kind] = self.totals.get(kind, 0.0) + duration
+        if len(self.spans) >= TRACE_MAX_SPANS:
+            self.dropped += 1
+            return
+        self.spans.append((kind, name, start, duration, attrs))
+
+    def finish(self, name: str, status: int):
+        self.name = name
+        self.status = status
+        self.duration = time.perf_counter() - self.start
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "started_at": self.started_at.isoformat() + "Z",
+            "duration_ms": round((self.duration or 0.0) * 1000, 3),
+            "status": self.status,
+            "breakdown_ms": {kind: round(s * 1000, 3) for kind, s in self.totals.items()},
+            "spans": [
+                {"kind": kind, "name": name, "offset_ms": round((start - self.start) * 1000, 3),
+                 "duration_ms": round(duration * 1000, 3), **attrs}
+                for kind, name, start, duration, attrs in self.spans
+            ],
+            "dropped_spans": self.dropped,
+        }
+
+
+def current_trace():
+    return _current.get()
+
+
+def record_span(kind: str, name: str, start: float, duration: float, **attrs):
+    """Attach a finished span to the current request's trace, if any."""
+    trace = _current.get()
+    if trace is not None:
+        trace.add_span(kind, name, start, duration, attrs)
+
+
+@contextmanager
+def span(kind: str, name: str, **attrs):
+    start = time.perf_counter()
+    try:
+        yield attrs
+    finally:
+        record_span(kind, name, start, time.perf_counter() - start, **attrs)
+
+
+# ----------------- Trace Store -----------------
+class TraceStore:
+    """Keeps the last ``TRACE_BUFFER_SIZE`` request traces in memory and, when
+    ``TRACE_DUMP_PATH`` is set, appends every trace to that file as NDJSON
+    from a background thread."""
+
+    def __init__(self, size: int = TRACE_BUFFER_SIZE, dump_path: str = TRACE_DUMP_PATH):
+        self.dump_path = dump_path
+        self._recent = deque(maxlen=size)
+        self._pending = deque(maxlen=size * 50)
+        self._dumper = PeriodicTask("trace-dump", TRACE_DUMP_INTERVAL_SECONDS, self.flush)
+
+    def start(self):
+        if self.dump_path:
+            self._dumper.start()
+
+    def stop(self):
+        if self.dump_path:
+            self._dumper.stop()
+
+    def add(self, trace: RequestTrace):
+        self._recent.append(trace)
+        if self.dump_path:
+            self._pending.append(trace)
+
+    def recent(self, limit: int = 50, min_ms: float = 0) -> list:
+        out = []
+        for trace in reversed(self._recent):
+            if (trace.duration or 0) * 1000 >= min_ms:
+                out.append(trace.to_dict())
+                if len(out) >= limit:
+                    break
+        return out
+
+    def flush(self):
+        if not self._pending:
+            return
+        lines = []
+        while self._pending:
+            lines.append(json.dumps(self._pending.popleft().to_dict(), default=str))
+        with open(self.dump_path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+
+trace_store = TraceStore()
+
+
+# ----------------- HTTP -----------------
+class TracingMiddleware:
+    """ASGI middleware: one trace per HTTP request, finished after the last
+    body chunk is sent (so streamed responses are timed end to end)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not TRACING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        trace = RequestTrace(f"{scope['method']} {scope['path']}")
+        token = _current.set(trace)
+        status = [500]
+
+        async def traced_send(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, traced_send)
+        finally:
+            _current.reset(token)
+            # Label by route template, not raw path, to keep series bounded.
+            route = getattr(scope.get("route"), "path", "unmatched")
+            trace.finish(f"{scope['method']} {route}", status[0])
+            metrics.histogram(
+                "http_request_seconds", "HTTP request duration including streamed bodies",
+                method=scope["method"], route=route, status=str(status[0]),
+            ).observe(trace.duration)
+            trace_store.add(trace)
+
+
+# ----------------- Mongo -----------------
+class MongoCommandListener(monitoring.CommandListener):
+    """Times every Mongo command and adds it to the current request trace.
+
+    Callbacks run on the thread that issued the command, which has the
+    request's context when the call came through run_in_db_pool or a
+    FastAPI sync endpoint.
+    """
+
+    def __init__(self):
+        self._collections = {}
+
+    def started(self, event):
+        if TRACING_ENABLED:
+            target = event.command.get(event.command_name)
+            self._collections[event.request_id] = target if isinstance(target, str) else ""
+
+    def succeeded(self, event):
+        self._finish(event, "ok")
+
+    def failed(self, event):
+        self._finish(event, "error")
+
+    def _finish(self, event, outcome: str):
+        if not TRACING_ENABLED:
+            return
+        collection = self._collections.pop(event.request_id, "")
+        duration = event.duration_micros / 1e6
+        metrics.histogram("mongo_command_seconds", "Mongo command round trip time",
+                          command=event.command_name, outcome=outcome).observe(duration)
+        record_span("mongo", event.command_name, time.perf_counter() - duration, duration,
+                    collection=collection, outcome=outcome)
+
+
+mongo_listener = MongoCommandListener()
@@ -0,0 +1,242 @@
+import os
+import json
+import time
+import zlib
+import datetime
+import threading
+from bson import Binary
+from pymongo import ReturnDocument
+from backend.db import threads_collection, transcripts_collection
+from backend import metrics
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Turns per segment. A thread keeps the size it started with, so changing
+# this only affects new threads.
+TRANSCRIPT_SEGMENT_TURNS = int(os.getenv("TRANSCRIPT_SEGMENT_TURNS", "256"))
+# zstd needs the zstandard package; zlib is always available.
+TRANSCRIPT_CODEC = os.getenv("TRANSCRIPT_CODEC", "zstd" if zstandard else "zlib")
+TRANSCRIPT_PAGE_MAX = int(os.getenv("TRANSCRIPT_PAGE_MAX", "500"))
+
+# Known roles are stored as their index.
+ROLES = ("user", "assistant", "system", "tool")
+
+_appended = metrics.counter("transcript_turns_total", "Turns written to thread transcripts")
+_sealed = metrics.counter("transcript_segments_sealed_total", "Transcript segments compressed")
+_raw_bytes = metrics.counter("transcript_sealed_raw_bytes_total", "Sealed segment size before compression")
+_stored_bytes = metrics.counter("transcript_sealed_stored_bytes_total", "Sealed segment size after compression")
+_flush_errors = metrics.counter("transcript_flush_errors_total", "Failed transcript writes (retried)")
+_dropped = metrics.counter("transcript_dropped_turns_total", "Turns for threads deleted before they were written")
+_pending = metrics.gauge("transcript_pending_turns", "Turns waiting to be written")
+_reads = metrics.histogram("transcript_read_seconds", "Transcript page reads")
+
+
+def _compress(raw: bytes) -> tuple:
+    if TRANSCRIPT_CODEC == "zstd" and zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=9).compress(raw)
+    return "zlib", zlib.compress(raw, 9)
+
+
+def _decompress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("transcript segment is zstd-compressed; install zstandard to read it")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+def _record(offset: int, role: str, ts: int, content: str) -> list:
+    return [offset, ROLES.index(role) if role in ROLES else role, ts, content]
+
+
+def _segment_records(segment: dict) -> dict:
+    """offset -> record for one segment, sealed part and any later appends."""
+    records = {}
+    if segment.get("z") is not None:
+        for record in json.loads(_decompress(segment["codec"], segment["z"])):
+            records.setdefault(record[0], record)
+    for record in segment.get("t", ()):
+        # A retried write can repeat a turn; the first copy wins.
+        records.setdefault(record[0], record)
+    return records
+
+
+def _turn(position: int, record: list) -> dict:
+    role, ts = record[1], record[2]
+    return {
+        "position": position,
+        "role": ROLES[role] if isinstance(role, int) else role,
+        "content": record[3],
+        "at": datetime.datetime.fromtimestamp(ts, datetime.timezone.utc).isoformat() if ts is not None else None,
+    }
+
+
+class TranscriptStore:
+    """Full thread transcripts, kept apart from the capped conversation memory.
+
+    Turns are buffered and written behind in batches (the memory flusher
+    drives ``flush``). Each write reserves positions with one ``$inc`` on the
+    thread document, so workers appending to the same thread never collide,
+    then pushes compact ``[offset, role, ts, content]`` records onto the
+    segment documents those positions fall in. A segment that fills up is
+    sealed: its records are compressed into one binary field. Reading a page
+    fetches and decompresses only the segments it spans.
+    """
+
+    def __init__(self, threads=threads_collection, segments=transcripts_collection,
+                 segment_turns: int = TRANSCRIPT_SEGMENT_TURNS):
+        self.threads = threads
+        self.segments = segments
+        self.segment_turns = segment_turns
+        # (user_id, thread_id) -> [[start or None, segment size, records], ...];
+        # start is set once positions are reserved, so a retry reuses them.
+        self._pending = {}
+        self._pending_count = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+    def add(self, user_id: str, thread_id: str, role: str, content: str, at: float = None):
+        turn = (role, int(time.time() if at is None else at), content)
+        with self._lock:
+            chunks = self._pending.setdefault((user_id, thread_id), [])
+            if not chunks or chunks[-1][0] is not None:
+                chunks.append([None, None, []])
+            chunks[-1][2].append(turn)
+            self._pending_count += 1
+            _pending.set(self._pending_count)
+
+    def flush(self, key: tuple = None):
+        """Write buffered turns (only ``key``'s if given). Chunks that fail
+        go back to the front of the buffer with their reserved positions."""
+        with self._flush_lock:
+            with self._lock:
+                if key is None:
+                    batches, self._pending = self._pending, {}
+                else:
+                    batches = {key: self._pending.pop(key)} if key in self._pending else {}
+                self._pending_count -= sum(len(c[2]) for chunks in batches.values() for c in chunks)
+            failed, error = {}, None
+            for (user_id, thread_id), chunks in batches.items():
+                for i, chunk in enumerate(chunks):
+                    try:
+                        self._write(user_id, thread_id, chunk)
+                    except Exception as e:
+                        _flush_errors.inc()
+                        failed[(user_id, thread_id)], error = chunks[i:], e
+                        break
+            with self._lock:
+                for failed_key, chunks in failed.items():
+                    self._pending[failed_key] = chunks + self._pending.get(failed_key, [])
+                    self._pending_count += sum(len(c[2]) for c in chunks)
+                _pending.set(self._pending_count)
+            if error is not None:
+                raise error
+
+    def _write(self, user_id: str, thread_id: str, chunk: list):
+        start, size, turns = chunk
+        if start is None:
+            reserved = self._reserve(user_id, thread_id, len(turns))
+            if reserved is None:
+                _dropped.inc(len(turns))
+                return
+            chunk[0], chunk[1] = start, size = reserved
+        by_segment = {}
+        for position, (role, ts, content) in enumerate(turns, start):
+            seq, offset = divmod(position, size)
+            by_segment.setdefault(seq, []).append(_record(offset, role, ts, content))
+        for seq, records in by_segment.items():
+            segment = self.segments.find_one_and_update(
+                {"user_id": user_id, "thread_id": thread_id, "seq": seq},
+                {"$push": {"t": {"$each": records}}, "$inc": {"count": len(records)},
+                 "$setOnInsert": {"start": seq * size, "size": size}},
+                projection={"count": 1}, upsert=True, return_document=ReturnDocument.AFTER,
+            )
+            if segment["count"] >= size:
+                self._seal(segment["_id"])
+        _appended.inc(len(turns))
+
+    def _reserve(self, user_id: str, thread_id: str, count: int):
+        """(first position, segment size) for ``count`` new turns, or None if
+        the thread no longer exists."""
+        query = {"user_id": user_id, "thread_id": thread_id}
+        thread = self.threads.find_one_and_update(
+            query, {"$inc": {"transcript_turns": count}},
+            projection={"transcript_turns": 1, "transcript_segment_turns": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+        if thread is None:
+            return None
+        size = thread.get("transcript_segment_turns")
+        if size is None:
+            # Threads created before transcripts: the first writer fixes the size.
+            self.threads.update_one({**query, "transcript_segment_turns": {"$exists": False}},
+                                    {"$set": {"transcript_segment_turns": self.segment_turns}})
+            size = self.threads.find_one(query, {"transcript_segment_turns": 1})["transcript_segment_turns"]
+        return thread["transcript_turns"] - count, size
+
+    def _seal(self, segment_id):
+        segment = self.segments.find_one({"_id": segment_id})
+        records = _segment_records(segment)
+        raw = json.dumps([records[o] for o in sorted(records)], separators=(",", ":")).encode()
+        codec, data = _compress(raw)
+        # Only if nothing was pushed meanwhile; otherwise the next push seals it.
+        result = self.segments.update_one(
+            {"_id": segment_id, "count": segment["count"]},
+            {"$set": {"z": Binary(data), "codec": codec, "raw_bytes": len(raw), "stored_bytes": len(data)},
+             "$unset": {"t": ""}},
+        )
+        if result.modified_count:
+            _sealed.inc()
+            _raw_bytes.inc(len(raw))
+            _stored_bytes.inc(len(data))
+
+    def history(self, user_id: str, thread_id: str, limit: int = 50, before: int = None):
+        """Up to ``limit`` turns before position ``before`` (default: the
+        end), oldest first, or None if the thread does not exist. Pass
+        ``next_before`` back as ``before`` for the previous page."""
+        # Read your own writes: this worker's buffered turns go out first.
+        self.flush((user_id, thread_id))
+        with _reads.time():
+            thread = self.threads.find_one({"user_id": user_id, "thread_id": thread_id},
+                                           {"transcript_turns": 1, "transcript_segment_turns": 1})
+            if thread is None:
+                return None
+            total = thread.get("transcript_turns", 0)
+            size = thread.get("transcript_segment_turns", self.segment_turns)
+            end = total if before is None else max(0, min(int(before), total))
+            start = max(0, end - max(1, min(int(limit), TRANSCRIPT_PAGE_MAX)))
+            turns = list(self._read(user_id, thread_id, start, end, size)) if end > start else []
+        return {"user_id": user_id, "thread_id": thread_id, "total": total, "turns": turns,
+                "next_before": start if start > 0 else None}
+
+    def iter_turns(self, user_id: str, thread_id: str):
+        """Every turn of the thread, oldest first, one segment in memory at a time."""
+        self.flush((user_id, thread_id))
+        yield from self._read(user_id, thread_id, 0, None)
+
+    def _read(self, user_id: str, thread_id: str, start: int, end: int, size: int = None):
+        query = {"user_id": user_id, "thread_id": thread_id}
+        if end is not None:
+            query["seq"] = {"$gte": start // size, "$lte": (end - 1) // size}
+        for segment in self.segments.find(query).sort("seq", 1).batch_size(8):
+            base = segment["start"]
+            for offset, record in sorted(_segment_records(segment).items()):
+                position = base + offset
+                if position >= start and (end is None or position < end):
+                    yield _turn(position, record)
+
+    def delete(self, user_id: str, thread_id: str):
+        with self._lock:
+            chunks = self._pending.pop((user_id, thread_id), [])
+            self._pending_count -= sum(len(c[2]) for c in chunks)
+            _pending.set(self._pending_count)
+        self.segments.delete_many({"user_id": user_id, "thread_id": thread_id})
+
+    def stats(self) -> dict:
+        return metrics.snapshot("transcript_")
+
+
+transcript_store = TranscriptStore()
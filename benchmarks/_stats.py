@@ -0,0 +1,19 @@
+import statistics
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def describe_ms(label, values):
+    """One-line latency summary for a list of durations in seconds."""
+    if not values:
+        return f"{label}: no samples"
+    return (f"{label}: n={len(values)} mean={statistics.mean(values) * 1000:.2f}ms "
+            f"p50={percentile(values, 50) * 1000:.2f}ms "
+            f"p95={percentile(values, 95) * 1000:.2f}ms "
+            f"p99={percentile(values, 99) * 1000:.2f}ms")
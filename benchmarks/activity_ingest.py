@@ -0,0 +1,77 @@
+"""Activity event ingest load test.
+
+Records N synthetic activity events from several threads through the
+buffered ``ActivityTracker`` into a scratch database, then reports
+record() throughput, flushed events/sec and the latency of the
+"active in the last 7 days" rollup query.
+
+    poetry run python -m benchmarks.activity_ingest --events 1000000 --threads 8 --students 50000
+"""
+import argparse
+import os
+import random
+import threading
+import time
+
+os.environ["DB_NAME"] = os.getenv("BENCH_DB_NAME", "campus_admin_agent_bench")
+
+from benchmarks._stats import describe_ms  # noqa: E402
+from backend.db import client, DB_NAME  # noqa: E402
+from backend.indexes import ensure_indexes  # noqa: E402
+from backend.activity import ActivityTracker, activity_collection  # noqa: E402
+from backend import metrics  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=1_000_000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--students", type=int, default=50_000)
+    parser.add_argument("--buffer-size", type=int, default=5000)
+    parser.add_argument("--flush-interval", type=float, default=0.5)
+    args = parser.parse_args()
+
+    client.drop_database(DB_NAME)
+    ensure_indexes()
+    tracker = ActivityTracker(buffer_size=args.buffer_size, flush_interval=args.flush_interval)
+    tracker.start()
+
+    kinds = ["lookup", "update", "email", "chat_mention"]
+    per_thread = args.events // args.threads
+
+    def produce():
+        rng = random.Random()
+        for _ in range(per_thread):
+            tracker.record(rng.randrange(args.students), rng.choice(kinds))
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=produce) for _ in range(args.threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    produced = time.perf_counter() - start
+    tracker.stop()
+    drained = time.perf_counter() - start
+
+    snap = metrics.snapshot("activity_")
+    total = per_thread * args.threads
+    print(f"record(): {total:,} events in {produced:.2f}s = {total / produced:,.0f} events/s")
+    print(f"written: {snap['activity_events_written_total']:,} events in {drained:.2f}s "
+          f"= {snap['activity_events_written_total'] / drained:,.0f} events/s "
+          f"(dropped={snap['activity_events_dropped_total']})")
+    print(f"flush batches: {snap['activity_flush_seconds']}")
+    print(f"raw events stored: {activity_collection.estimated_document_count():,}")
+
+    timings = []
+    for _ in range(50):
+        t = time.perf_counter()
+        tracker.active_students(7, 50)
+        timings.append(time.perf_counter() - t)
+    print(describe_ms("active_students(7 days, top 50)", timings))
+
+    client.drop_database(DB_NAME)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Per-request cost of authenticating an admin bearer token.
+
+Compares the old dependency (decode the JWT, then ``find_one`` the admin on
+every request) with ``get_current_admin`` served from the principal cache,
+against a scratch database.
+
+    poetry run python -m benchmarks.auth_overhead --requests 20000
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ["DB_NAME"] = os.getenv("BENCH_DB_NAME", "campus_admin_agent_bench")
+
+import jwt  # noqa: E402
+from benchmarks._stats import describe_ms  # noqa: E402
+from backend.db import client, admins_collection, DB_NAME  # noqa: E402
+from backend.auth_utils import (  # noqa: E402
+    create_access_token, get_current_admin, principal_cache, SECRET_KEY, ALGORITHM
+)
+
+
+def uncached(token):
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    return admins_collection.find_one({"email": payload["sub"]}) is not None
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20_000)
+    args = parser.parse_args()
+
+    admins_collection.insert_one({"email": "bench@campus.edu", "password": "x"})
+    token = create_access_token({"sub": "bench@campus.edu"})
+
+    timings = []
+    for _ in range(min(args.requests, 5000)):
+        t = time.perf_counter()
+        uncached(token)
+        timings.append(time.perf_counter() - t)
+    print(describe_ms("decode + find_one per request", timings))
+    print(f"uncached auth overhead: {sum(timings) / len(timings) * 1e6:.1f}us per request")
+
+    principal_cache.clear()
+    await get_current_admin(token)
+    timings = []
+    for _ in range(args.requests):
+        t = time.perf_counter()
+        await get_current_admin(token)
+        timings.append(time.perf_counter() - t)
+    print(describe_ms("get_current_admin (cached)", timings))
+    print(f"cached auth overhead: {sum(timings) / len(timings) * 1e6:.1f}us per request")
+
+    client.drop_database(DB_NAME)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,59 @@
+"""Bulk student import throughput.
+
+Imports N synthetic students into a scratch database twice: once through
+``add_student`` one row at a time (what ``POST /students`` does) and once
+through ``bulk_upsert_students``. Reports rows/sec for each.
+
+    poetry run python -m benchmarks.bulk_import --rows 20000 --batch-size 1000
+"""
+import argparse
+import io
+import os
+import time
+
+os.environ["DB_NAME"] = os.getenv("BENCH_DB_NAME", "campus_admin_agent_bench")
+
+from backend.db import client, db, DB_NAME  # noqa: E402
+from backend.indexes import ensure_indexes  # noqa: E402
+from backend.tools import add_student, bulk_upsert_students, iter_import_rows  # noqa: E402
+
+
+def synthetic_csv(rows, offset=0):
+    lines = ["name,student_id,department,email"]
+    for i in range(offset, offset + rows):
+        lines.append(f"Student {i},{i},Dept {i % 40},student{i}@campus.edu")
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--single-rows", type=int, default=2_000, help="rows for the one-at-a-time baseline")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    db.drop_collection("students")
+    ensure_indexes()
+
+    start = time.perf_counter()
+    for i in range(args.single_rows):
+        add_student(f"Student {i}", str(i), f"Dept {i % 40}", f"student{i}@campus.edu")
+    elapsed = time.perf_counter() - start
+    print(f"add_student one by one: {args.single_rows} rows in {elapsed:.2f}s "
+          f"= {args.single_rows / elapsed:,.0f} rows/s")
+
+    # Fresh ids so the bulk run measures inserts, then re-run to measure updates.
+    text = synthetic_csv(args.rows, offset=args.single_rows)
+    for label in ("bulk insert", "bulk update"):
+        start = time.perf_counter()
+        report = bulk_upsert_students(iter_import_rows(io.StringIO(text), "csv"), args.batch_size)
+        elapsed = time.perf_counter() - start
+        print(f"{label} (batch={args.batch_size}): {report['processed']} rows in {elapsed:.2f}s "
+              f"= {report['processed'] / elapsed:,.0f} rows/s "
+              f"(inserted={report['inserted']} updated={report['updated']} failed={report['failed']})")
+
+    client.drop_database(DB_NAME)
+
+
+if __name__ == "__main__":
+    main()
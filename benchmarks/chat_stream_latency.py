@@ -0,0 +1,108 @@
+"""Concurrent /chat/stream latency benchmark.
+
+Fires N concurrent streaming chat requests at a running server and reports
+p50/p95/p99 of time-to-first-byte and total request time. To compare two
+trees, record a baseline with the server on the previous commit, then rerun
+against the current tree with ``--compare`` (p95 and p99 before -> after;
+exits 1 when p95 or throughput regress beyond ``--tolerance``):
+
+    poetry run python -m benchmarks.chat_stream_latency --concurrency 50 --requests 500 --save-baseline
+    poetry run python -m benchmarks.chat_stream_latency --concurrency 50 --requests 500 --compare
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+
+import httpx
+
+from benchmarks._stats import describe_ms
+from benchmarks.harness import Recorder, compare_baseline, save_baseline
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "chat_stream_baseline.json")
+
+
+async def one_request(client, sem, base_url, user_id, thread_id, message, ttfb, totals, errors):
+    async with sem:
+        start = time.perf_counter()
+        first = None
+        try:
+            async with client.stream(
+                "POST", f"{base_url}/chat/stream/{thread_id}",
+                json={"user_id": user_id, "message": message},
+            ) as resp:
+                async for _ in resp.aiter_bytes():
+                    if first is None:
+                        first = time.perf_counter() - start
+            if resp.status_code != 200:
+                errors.append(resp.status_code)
+                return
+        except httpx.HTTPError as e:
+            errors.append(str(e))
+            return
+        ttfb.append(first if first is not None else time.perf_counter() - start)
+        totals.append(time.perf_counter() - start)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--token", default=None)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--message", default="How many students are there?")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--compare", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p95/throughput change before failing")
+    args = parser.parse_args()
+
+    headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+    user_id = f"bench-{uuid.uuid4().hex[:8]}"
+    ttfb, totals, errors = [], [], []
+
+    async with httpx.AsyncClient(headers=headers, timeout=120) as client:
+        thread_ids = []
+        for _ in range(args.concurrency):
+            thread_id = uuid.uuid4().hex[:12]
+            await client.post(f"{args.url}/threads/create", json={"user_id": user_id, "thread_id": thread_id})
+            thread_ids.append(thread_id)
+
+        sem = asyncio.Semaphore(args.concurrency)
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            one_request(client, sem, args.url, user_id, thread_ids[i % len(thread_ids)],
+                        args.message, ttfb, totals, errors)
+            for i in range(args.requests)
+        ])
+        elapsed = time.perf_counter() - start
+
+        for thread_id in thread_ids:
+            await client.delete(f"{args.url}/threads/delete", params={"user_id": user_id, "thread_id": thread_id})
+
+    print(f"requests={args.requests} concurrency={args.concurrency} errors={len(errors)} "
+          f"throughput={len(totals) / elapsed:.1f} req/s")
+    print(describe_ms("ttfb", ttfb))
+    print(describe_ms("total", totals))
+
+    recorder = Recorder()
+    for op, values in (("ttfb", ttfb), ("total", totals)):
+        recorder.samples[op] = values
+    recorder.errors["total"] = len(errors)
+    results = {"chat_stream": recorder.summary(elapsed)}
+    params = {"concurrency": args.concurrency, "requests": args.requests, "message": args.message}
+    if args.save_baseline:
+        save_baseline(args.baseline, results, params)
+        print(f"baseline written to {args.baseline}")
+    if args.compare:
+        regressions = compare_baseline(args.baseline, results, params, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print(f"\nno regressions beyond {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
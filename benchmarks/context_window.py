@@ -0,0 +1,86 @@
+"""Prompt size and build latency over a long chat thread.
+
+Replays a synthetic N-turn thread and compares the old prompt (every past
+message joined on each turn) with ``ContextWindow`` (running summary plus
+recent turns under a token budget). Runs without Mongo or a model.
+
+    poetry run python -m benchmarks.context_window --turns 200
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks._stats import describe_ms
+from backend.context_window import ContextWindow, estimate_tokens
+from backend.memory import ConversationMemory, LocalMemoryTier
+
+
+class InMemoryDurableTier:
+    def __init__(self):
+        self.docs = {}
+
+    def head(self, user_id, thread_id):
+        return self.docs.get((user_id, thread_id))
+
+    def load(self, user_id, thread_id):
+        return self.docs.get((user_id, thread_id), {})
+
+    def append_many(self, batches):
+        for key, messages in batches.items():
+            doc = self.docs.setdefault(key, {"messages": [], "message_count": 0})
+            doc["messages"].extend(messages)
+            doc["message_count"] += len(messages)
+
+    def set_summary(self, user_id, thread_id, summary, upto):
+        self.docs.setdefault((user_id, thread_id), {}).update(summary=summary, summary_upto=upto)
+
+    def clear(self, user_id, thread_id):
+        self.docs.pop((user_id, thread_id), None)
+
+
+def synthetic_turn(i):
+    user = f"Turn {i}: please look up student {1000 + i} and tell me their department. " \
+           f"Also remember that I prefer short answers about the {i % 7} block."
+    assistant = f"Student {1000 + i} is in Dept {i % 12}. " + "Here are the details you asked for. " * 6
+    return user, assistant
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=200)
+    args = parser.parse_args()
+
+    memory = ConversationMemory(LocalMemoryTier(10, 3600, 1000), InMemoryDurableTier(), flush_batch=10**9)
+    window = ContextWindow()
+    memory.create("bench", "t1")
+    naive_history = []
+
+    naive_times, window_times = [], []
+    samples = {}
+    for i in range(1, args.turns + 1):
+        user, assistant = synthetic_turn(i)
+
+        start = time.perf_counter()
+        naive_history.append({"role": "user", "content": user})
+        naive_prompt = "\n".join([f"{m['role']}: {m['content']}" for m in naive_history])
+        naive_times.append(time.perf_counter() - start)
+        naive_history.append({"role": "assistant", "content": assistant})
+
+        start = time.perf_counter()
+        memory.append("bench", "t1", "user", user)
+        prompt = await window.build(memory, "bench", "t1")
+        window_times.append(time.perf_counter() - start)
+        memory.append("bench", "t1", "assistant", assistant)
+
+        if i in (1, 10, 50, 100, args.turns):
+            samples[i] = (estimate_tokens(naive_prompt), estimate_tokens(prompt))
+
+    print(f"{'turn':>6} {'naive tokens':>14} {'window tokens':>14}")
+    for turn, (naive_tokens, window_tokens) in samples.items():
+        print(f"{turn:>6} {naive_tokens:>14} {window_tokens:>14}")
+    print(describe_ms("naive build", naive_times))
+    print(describe_ms("window build", window_times))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,144 @@
+"""Email outbox throughput against a local SMTP server (aiosmtpd).
+
+Compares SMTP delivery with one connection per message (what a tool call
+doing its own delivery would do) with the dispatcher's send path, which
+reuses one connection per batch; then times the ``send_email`` tool call
+(now an enqueue), queueing a whole department with ``email_students`` and
+draining the outbox end to end. ``--fail-rate`` makes the server answer 451
+to that share of messages, to exercise the retry path.
+
+    poetry run python -m benchmarks.email_outbox --students 5000 --latency-ms 2
+    poetry run python -m benchmarks.email_outbox --mongo-uri mongodb://localhost:27017
+
+Without ``--mongo-uri`` the outbox lives in mongomock, whose unique-index
+inserts and ``$in`` updates scan the collection, so the enqueue and drain
+figures are then bound by the stand-in rather than by the outbox.
+"""
+import argparse
+import asyncio
+import datetime
+import os
+import random
+import smtplib
+import time
+from email.message import EmailMessage
+
+from aiosmtpd.controller import Controller
+
+from benchmarks._stats import describe_ms
+from benchmarks.harness import free_port
+
+
+class CountingHandler:
+    def __init__(self, latency: float, fail_rate: float):
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.accepted = 0
+        self.deferred = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if random.random() < self.fail_rate:
+            self.deferred += 1
+            return "451 4.3.0 Try again later"
+        self.accepted += 1
+        return "250 Message accepted for delivery"
+
+
+def send_inline(port: int, count: int) -> float:
+    start = time.perf_counter()
+    for i in range(count):
+        message = EmailMessage()
+        message["From"], message["To"], message["Subject"] = "bench@campus.edu", f"inline{i}@campus.edu", "Bench"
+        message.set_content("Inline delivery")
+        with smtplib.SMTP("127.0.0.1", port, timeout=10) as smtp:
+            smtp.send_message(message)
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--inline", type=int, default=500, help="messages for the inline baseline")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="server time per message")
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--mongo-uri", default=None)
+    args = parser.parse_args()
+
+    port = free_port()
+    handler = CountingHandler(args.latency_ms / 1000, args.fail_rate)
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+
+    os.environ["SMTP_HOST"], os.environ["SMTP_PORT"] = "127.0.0.1", str(port)
+    # Retries become due immediately so one run shows the retry path end to end.
+    os.environ.setdefault("EMAIL_RETRY_BASE_SECONDS", "0")
+    if args.mongo_uri:
+        os.environ["DB_URI"] = args.mongo_uri
+        os.environ["DB_NAME"] = os.getenv("BENCH_DB_NAME", "campus_admin_agent_bench")
+    else:
+        from benchmarks.harness import use_mongomock
+        use_mongomock()
+
+    from backend.db import client, students_collection, DB_NAME
+    from backend.indexes import ensure_indexes
+    from backend.email_outbox import email_outbox, outbox_collection
+    from backend.tools import send_email, email_students, EMAIL_BULK_MAX_RECIPIENTS
+
+    client.drop_database(DB_NAME)
+    ensure_indexes()
+    now = datetime.datetime.now()
+    students_collection.insert_many([
+        {"name": f"Student {i}", "student_id": str(i), "department": "Bench", "email": f"student{i}@campus.edu",
+         "created_at": now} for i in range(args.students)
+    ])
+    if args.students > EMAIL_BULK_MAX_RECIPIENTS:
+        print(f"note: EMAIL_BULK_MAX_RECIPIENTS={EMAIL_BULK_MAX_RECIPIENTS} caps the department email")
+
+    if args.inline:
+        print(f"SMTP, connection per message:   {send_inline(port, args.inline):8.1f} msgs/s")
+        # The dispatcher's send path on its own (no Mongo): batches over one connection.
+        docs = [{"to": f"reuse{i}@campus.edu", "subject": "Bench", "body": "Reused connection",
+                 "idempotency_key": f"reuse{i}"} for i in range(args.inline)]
+        start = time.perf_counter()
+        smtp = None
+        for i in range(0, len(docs), email_outbox.batch_size):
+            smtp, _ = email_outbox._send_batch(smtp, docs[i:i + email_outbox.batch_size])
+        smtp.quit()
+        print(f"SMTP, reused connection:        {len(docs) / (time.perf_counter() - start):8.1f} msgs/s")
+        handler.accepted = handler.deferred = 0
+
+    timings = []
+    for i in range(min(200, args.students)):
+        start = time.perf_counter()
+        send_email(str(i), f"Reminder {i}")
+        timings.append(time.perf_counter() - start)
+    print(describe_ms("send_email tool call (enqueue)", timings))
+
+    start = time.perf_counter()
+    result = email_students("Outbox benchmark", "Bench", department="Bench")
+    enqueue_s = time.perf_counter() - start
+    print(f"enqueue {result['queued']} messages:  {result['queued'] / enqueue_s:8.1f} msgs/s ({enqueue_s * 1000:.0f}ms)")
+
+    start = time.perf_counter()
+    runs = 0
+    while outbox_collection.count_documents({"status": {"$in": ["pending", "sending"]}}) and runs < 20:
+        email_outbox.dispatch()
+        runs += 1
+    drain_s = time.perf_counter() - start
+    sent = outbox_collection.count_documents({"status": "sent"})
+    print(f"outbox drain (Mongo + SMTP):    {sent / drain_s:8.1f} msgs/s "
+          f"(sent {sent}, failed {outbox_collection.count_documents({'status': 'failed'})}, "
+          f"server deferrals {handler.deferred}, dispatch runs {runs})")
+
+    again = email_students("Outbox benchmark", "Bench", department="Bench")
+    print(f"re-enqueue same message:        queued {again['queued']}, duplicates {again['duplicates']}")
+    print(f"server accepted {handler.accepted} messages")
+
+    client.drop_database(DB_NAME)
+    controller.stop()
+
+
+if __name__ == "__main__":
+    main()
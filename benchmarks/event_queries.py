@@ -0,0 +1,116 @@
+"""Event query benchmark.
+
+Seeds a scratch database with synthetic events spread over two years, then
+compares the old ``list_events`` (the whole collection, which the agent
+then had to read) with the typed queries in ``backend.tools``: the next
+week's events, one location's events in a month, and one page of a date
+range. Reports latency, documents returned and the JSON size handed to the
+model, plus the query plan's winning stage against a real server.
+
+    poetry run python -m benchmarks.event_queries --events 100000
+    poetry run python -m benchmarks.event_queries --mongo-uri mongodb://localhost:27017
+
+Without ``--mongo-uri`` the database is mongomock, which has no indexes:
+its range queries still scan the collection, so the latency gap there comes
+from the smaller result, and the index benefit only shows on a real server.
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import time
+
+from benchmarks._stats import describe_ms
+
+LOCATIONS = [f"Hall {i}" for i in range(40)]
+
+
+def seed(collection, total, batch=10_000):
+    from backend.events import location_key
+    rng = random.Random(7)
+    start = datetime.datetime.now().replace(minute=0, second=0, microsecond=0) - datetime.timedelta(days=365)
+    for first in range(0, total, batch):
+        docs = []
+        for i in range(first, min(first + batch, total)):
+            starts_at = start + datetime.timedelta(hours=rng.randrange(2 * 365 * 24))
+            location = rng.choice(LOCATIONS)
+            docs.append({"name": f"Event {i}", "location": location, "location_key": location_key(location),
+                         "starts_at": starts_at, "ends_at": starts_at + datetime.timedelta(hours=2),
+                         "created_at": start})
+        collection.insert_many(docs, ordered=False)
+
+
+def legacy_list_events(collection):
+    events = list(collection.find())
+    for event in events:
+        event["_id"] = str(event["_id"])
+    return {"events": events}
+
+
+def run(label, fn, runs):
+    timings, result = [], None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    size = len(json.dumps(result, default=str))
+    print(f"{label}: docs={len(result['events'])} payload={size / 1024:.1f}KB")
+    print(describe_ms(f"{label} latency", timings))
+
+
+def winning_stage(collection, query, sort) -> str:
+    plan = collection.find(query).sort(sort).limit(50).explain().get("queryPlanner", {}).get("winningPlan", {})
+    stages = []
+    while plan:
+        stages.append(plan.get("stage", "?"))
+        plan = plan.get("inputStage")
+    return " <- ".join(stages)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=100_000)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--mongo-uri", default=None)
+    args = parser.parse_args()
+
+    if args.mongo_uri:
+        os.environ["DB_URI"] = args.mongo_uri
+        os.environ["DB_NAME"] = os.getenv("BENCH_DB_NAME", "campus_admin_agent_bench")
+    else:
+        from benchmarks.harness import use_mongomock
+        use_mongomock()
+
+    from backend.db import client, get_db, DB_NAME
+    from backend.indexes import ensure_indexes
+    from backend.events import event_filter
+    from backend.tools import list_events, upcoming_events
+
+    client.drop_database(DB_NAME)
+    print(f"seeding {args.events} events...")
+    seed(get_db, args.events)
+    start = time.perf_counter()
+    ensure_indexes()
+    print(f"ensure_indexes: {time.perf_counter() - start:.1f}s")
+
+    month = datetime.date.today().replace(day=1)
+    month_end = (month + datetime.timedelta(days=32)).replace(day=1) - datetime.timedelta(days=1)
+    # The full dump is slow on mongomock; a few runs are enough to see it.
+    run("legacy list_events (everything)", lambda: legacy_list_events(get_db), max(1, args.runs // 10))
+    run("upcoming_events(days=7)", lambda: upcoming_events(7, limit=200), args.runs)
+    run("list_events(month, location)", lambda: list_events(month.isoformat(), month_end.isoformat(),
+                                                            LOCATIONS[3], limit=200), args.runs)
+    run("list_events(month) first page", lambda: list_events(month.isoformat(), month_end.isoformat(),
+                                                             limit=50), args.runs)
+
+    if args.mongo_uri:
+        sort = [("starts_at", 1), ("_id", 1)]
+        print("plan, month range:", winning_stage(get_db, event_filter(month, month_end), sort))
+        print("plan, month + location:", winning_stage(get_db, event_filter(month, month_end, LOCATIONS[3]), sort))
+
+    client.drop_database(DB_NAME)
+
+
+if __name__ == "__main__":
+    main()
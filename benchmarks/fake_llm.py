@@ -0,0 +1,213 @@
+"""Local OpenAI-compatible chat completions server for benchmarks.
+
+Streams a fixed reply word by word with a configurable delay so streaming,
+time-to-first-token and cancellation can be measured without a Gemini key.
+A ``tool_script`` makes it answer matching prompts with tool calls first (all
+in one turn), then with the reply once the tool results come back.
+``max_concurrency`` and ``error_rate`` make it answer 429 (with Retry-After)
+like a rate-limited provider, and ``latency_jitter`` adds random delay.
+Point the app at it with ``GEMINI_BASE_URL=http://127.0.0.1:9100/v1/``.
+
+    poetry run python -m benchmarks.fake_llm --port 9100 --token-delay 0.02
+    poetry run python -m benchmarks.fake_llm --max-concurrency 8 --error-rate 0.05 --latency-jitter 0.5
+"""
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+DEFAULT_REPLY = ("There are currently 42 students enrolled across 5 departments. "
+                 "Computer Science has the most students, followed by Business.")
+
+
+class FakeLLMConfig:
+    def __init__(self, reply: str = DEFAULT_REPLY, first_token_delay: float = 0.2, token_delay: float = 0.02,
+                 tool_script: dict = None, max_concurrency: int = 0, error_rate: float = 0.0,
+                 latency_jitter: float = 0.0, retry_after: float = 1.0):
+        self.reply = reply
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        # {"phrase in the user message": [("tool_name", {arguments}), ...]}
+        self.tool_script = tool_script or {}
+        # Rate limiting: 429 above this many requests in flight (0 = no limit)
+        # and for this share of the rest.
+        self.max_concurrency = max_concurrency
+        self.error_rate = error_rate
+        self.latency_jitter = latency_jitter
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.stats = {"requests": 0, "tool_calls": 0, "streams_completed": 0, "streams_aborted": 0,
+                      "rate_limited": 0, "max_in_flight": 0}
+
+    def first_delay(self) -> float:
+        return self.first_token_delay + random.uniform(0, self.latency_jitter)
+
+
+def _chunk(completion_id, model, delta, finish_reason=None):
+    return {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+
+
+def _message_text(message) -> str:
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        content = " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content
+
+
+def _planned_tool_calls(config: FakeLLMConfig, body: dict) -> list:
+    """Tool calls to make for this request: only on the first model call of a
+    turn (no tool results after the last user message) and only for tools the
+    client actually offered."""
+    messages = body.get("messages", [])
+    users = [i for i, m in enumerate(messages) if m.get("role") == "user"]
+    if not users or any(m.get("role") == "tool" for m in messages[users[-1] + 1:]):
+        return []
+    offered = {t.get("function", {}).get("name") for t in body.get("tools") or []}
+    text = _message_text(messages[users[-1]]).lower()
+    for phrase, calls in config.tool_script.items():
+        if phrase in text:
+            return [
+                {"id": f"call_{uuid.uuid4().hex[:12]}", "type": "function",
+                 "function": {"name": name, "arguments": json.dumps(args)}}
+                for name, args in calls if name in offered
+            ]
+    return []
+
+
+def create_app(config: FakeLLMConfig) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/stats")
+    def stats():
+        return config.stats
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        config.stats["requests"] += 1
+        if (config.max_concurrency and config.in_flight >= config.max_concurrency) or random.random() < config.error_rate:
+            config.stats["rate_limited"] += 1
+            return JSONResponse(
+                {"error": {"message": "Resource has been exhausted (e.g. check quota).", "type": "rate_limit_exceeded",
+                           "code": 429}},
+                status_code=429, headers={"Retry-After": str(config.retry_after)},
+            )
+        config.in_flight += 1
+        config.stats["max_in_flight"] = max(config.stats["max_in_flight"], config.in_flight)
+        try:
+            return await _respond(body, request)
+        except BaseException:
+            config.in_flight -= 1
+            raise
+
+    async def _respond(body: dict, request: Request):
+        # Every branch gives back its in-flight slot when the response is done.
+        model = body.get("model", "fake")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        words = config.reply.split(" ")
+        tool_calls = _planned_tool_calls(config, body)
+        config.stats["tool_calls"] += len(tool_calls)
+
+        if tool_calls and not body.get("stream"):
+            await asyncio.sleep(config.first_delay())
+            config.in_flight -= 1
+            return JSONResponse({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": None, "tool_calls": tool_calls},
+                             "finish_reason": "tool_calls"}],
+                "usage": {"prompt_tokens": 10, "completion_tokens": len(tool_calls), "total_tokens": 10 + len(tool_calls)},
+            })
+
+        if tool_calls:
+            async def tool_stream():
+                try:
+                    await asyncio.sleep(config.first_delay())
+                    yield f"data: {json.dumps(_chunk(completion_id, model, {'role': 'assistant', 'content': None}))}\n\n"
+                    for i, call in enumerate(tool_calls):
+                        yield f"data: {json.dumps(_chunk(completion_id, model, {'tool_calls': [{'index': i, **call}]}))}\n\n"
+                    yield f"data: {json.dumps(_chunk(completion_id, model, {}, 'tool_calls'))}\n\n"
+                    yield "data: [DONE]\n\n"
+                    config.stats["streams_completed"] += 1
+                finally:
+                    config.in_flight -= 1
+
+            return StreamingResponse(tool_stream(), media_type="text/event-stream")
+
+        if not body.get("stream"):
+            await asyncio.sleep(config.first_delay() + config.token_delay * len(words))
+            config.in_flight -= 1
+            return JSONResponse({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": config.reply},
+                             "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 10, "completion_tokens": len(words), "total_tokens": 10 + len(words)},
+            })
+
+        async def stream():
+            completed = False
+            try:
+                await asyncio.sleep(config.first_delay())
+                yield f"data: {json.dumps(_chunk(completion_id, model, {'role': 'assistant', 'content': ''}))}\n\n"
+                for i, word in enumerate(words):
+                    # Writes to a closed connection are dropped silently, so
+                    # look for the disconnect the way a real provider would.
+                    if await request.is_disconnected():
+                        return
+                    text = word if i == 0 else f" {word}"
+                    yield f"data: {json.dumps(_chunk(completion_id, model, {'content': text}))}\n\n"
+                    await asyncio.sleep(config.token_delay)
+                yield f"data: {json.dumps(_chunk(completion_id, model, {}, 'stop'))}\n\n"
+                yield "data: [DONE]\n\n"
+                completed = True
+            finally:
+                config.in_flight -= 1
+                config.stats["streams_completed" if completed else "streams_aborted"] += 1
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    return app
+
+
+def serve_in_thread(config: FakeLLMConfig, port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(create_app(config), host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--first-token-delay", type=float, default=0.2)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    parser.add_argument("--tool-script", default=None,
+                        help='JSON, e.g. {"how many": [["get_total_students", {}]]}')
+    parser.add_argument("--max-concurrency", type=int, default=0, help="answer 429 above this many in flight")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of other requests answered with 429")
+    parser.add_argument("--latency-jitter", type=float, default=0.0, help="extra random first-token delay (s)")
+    args = parser.parse_args()
+    cfg = FakeLLMConfig(first_token_delay=args.first_token_delay, token_delay=args.token_delay,
+                        tool_script=json.loads(args.tool_script) if args.tool_script else None,
+                        max_concurrency=args.max_concurrency, error_rate=args.error_rate,
+                        latency_jitter=args.latency_jitter)
+    uvicorn.run(create_app(cfg), host="127.0.0.1", port=args.port, log_level="warning")
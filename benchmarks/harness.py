@@ -0,0 +1,190 @@
+"""Offline stack for load tests: the real FastAPI app on a local port, a
+scripted fake LLM (``benchmarks.fake_llm``) and an in-memory Mongo.
+
+``backend.db`` reads its settings at import time, so ``start_stack``
+prepares the environment (Mongo stand-in, model URL, scratch directories)
+before it imports ``backend.main``. Pass ``mongo_uri`` to run against a real server
+instead of mongomock.
+"""
+import json
+import os
+import platform
+import shutil
+import socket
+import statistics
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+
+import uvicorn
+
+from benchmarks._stats import percentile
+from benchmarks.fake_llm import FakeLLMConfig, serve_in_thread
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def use_mongomock():
+    """Swap pymongo.MongoClient for mongomock's in-memory client."""
+    import mongomock
+    import pymongo
+    from mongomock.collection import BulkOperationBuilder
+
+    # pymongo >= 4.11 passes sort= to bulk update/replace ops; mongomock 4.x
+    # predates it. Accept and ignore it (the app never sorts bulk updates).
+    for name in ("add_update", "add_replace"):
+        original = getattr(BulkOperationBuilder, name)
+
+        def accept_sort(self, *args, _original=original, sort=None, **kwargs):
+            return _original(self, *args, **kwargs)
+
+        setattr(BulkOperationBuilder, name, accept_sort)
+    pymongo.MongoClient = mongomock.MongoClient
+
+
+class Stack:
+    def __init__(self, base_url, token, llm, server, thread, workdir, real_mongo):
+        self.base_url = base_url
+        self.token = token
+        self.llm = llm
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self._server = server
+        self._thread = thread
+        self._workdir = workdir
+        self._real_mongo = real_mongo
+
+    def stop(self):
+        self._server.should_exit = True
+        self._thread.join(timeout=10)
+        if self._real_mongo:
+            from backend.db import client, DB_NAME
+            client.drop_database(DB_NAME)
+        shutil.rmtree(self._workdir, ignore_errors=True)
+
+
+def start_stack(llm: FakeLLMConfig, mongo_uri: str = None) -> Stack:
+    workdir = tempfile.mkdtemp(prefix="campus-bench-")
+    if mongo_uri:
+        os.environ["DB_URI"] = mongo_uri
+        os.environ["DB_NAME"] = os.getenv("BENCH_DB_NAME", "campus_admin_agent_bench")
+    else:
+        use_mongomock()
+    llm_port = free_port()
+    serve_in_thread(llm, llm_port)
+    os.environ["GEMINI_BASE_URL"] = f"http://127.0.0.1:{llm_port}/v1/"
+    os.environ["GEMINI_API_KEY"] = "fake"
+    os.environ["RAG_INDEX_DIR"] = os.path.join(workdir, "rag_index")
+    os.environ["RAG_DOCS_DIR"] = os.path.join(workdir, "docs")
+
+    from backend.main import app
+    from backend.db import admins_collection, client, DB_NAME
+    from backend.auth_utils import create_access_token
+
+    if mongo_uri:
+        client.drop_database(DB_NAME)
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+
+    admins_collection.insert_one({"email": "bench@campus.edu", "password": "unused", "name": "Bench"})
+    token = create_access_token({"sub": "bench@campus.edu"})
+    return Stack(f"http://127.0.0.1:{port}", token, llm, server, thread, workdir, bool(mongo_uri))
+
+
+class Recorder:
+    """Latency samples and error counts per operation."""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.errors = Counter()
+        self.extra = defaultdict(dict)
+
+    def add(self, op: str, seconds: float, ok: bool = True):
+        if ok:
+            self.samples[op].append(seconds)
+        else:
+            self.errors[op] += 1
+
+    async def timed(self, op: str, request):
+        start = time.perf_counter()
+        try:
+            resp = await request
+        except Exception:
+            self.errors[op] += 1
+            return None
+        self.add(op, time.perf_counter() - start, resp.status_code < 400)
+        return resp
+
+    def summary(self, elapsed: float) -> dict:
+        out = {}
+        for op in sorted(set(self.samples) | set(self.errors)):
+            values = self.samples.get(op, [])
+            out[op] = {
+                "count": len(values),
+                "errors": self.errors[op],
+                "throughput": round(len(values) / elapsed, 2) if elapsed else 0.0,
+                "mean_ms": round(statistics.mean(values) * 1000, 3) if values else 0.0,
+                "p50_ms": round(percentile(values, 50) * 1000, 3),
+                "p95_ms": round(percentile(values, 95) * 1000, 3),
+                "p99_ms": round(percentile(values, 99) * 1000, 3),
+                **self.extra.get(op, {}),
+            }
+        return out
+
+
+def print_report(results: dict):
+    header = f"{'scenario':<10} {'operation':<22} {'count':>7} {'err':>5} {'ops/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    print(header)
+    print("-" * len(header))
+    for scenario, ops in results.items():
+        for op, s in ops.items():
+            print(f"{scenario:<10} {op:<22} {s['count']:>7} {s['errors']:>5} {s['throughput']:>9.1f} "
+                  f"{s['p50_ms']:>9.2f} {s['p95_ms']:>9.2f} {s['p99_ms']:>9.2f}")
+
+
+# ----------------- Baselines -----------------
+def machine_info() -> dict:
+    return {"python": platform.python_version(), "machine": platform.machine(), "cpus": os.cpu_count()}
+
+
+def save_baseline(path: str, results: dict, params: dict):
+    with open(path, "w") as f:
+        json.dump({"meta": {**machine_info(), "params": params}, "results": results}, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def compare_baseline(path: str, results: dict, params: dict, tolerance: float) -> list:
+    """Print the change against the baseline per operation and return the
+    regressions: p95 up, or throughput down, by more than ``tolerance``."""
+    with open(path) as f:
+        baseline = json.load(f)
+    meta = baseline.get("meta", {})
+    if {k: meta.get(k) for k in machine_info()} != machine_info() or meta.get("params") != params:
+        print(f"note: baseline was recorded with {meta}, this run is {machine_info()} with {params}")
+    regressions = []
+    print(f"\n{'scenario':<10} {'operation':<22} {'p95 ms (base -> now)':>28} {'p99 ms (base -> now)':>28}"
+          f" {'ops/s (base -> now)':>28}")
+    for scenario, ops in results.items():
+        for op, now in ops.items():
+            base = baseline["results"].get(scenario, {}).get(op)
+            if not base or not base["count"] or not now["count"]:
+                continue
+            p95_change = now["p95_ms"] / base["p95_ms"] - 1 if base["p95_ms"] else 0.0
+            p99_change = now["p99_ms"] / base["p99_ms"] - 1 if base["p99_ms"] else 0.0
+            tput_change = now["throughput"] / base["throughput"] - 1 if base["throughput"] else 0.0
+            flag = ""
+            if p95_change > tolerance or tput_change < -tolerance:
+                regressions.append(f"{scenario}/{op}")
+                flag = "  REGRESSION"
+            print(f"{scenario:<10} {op:<22} {base['p95_ms']:>10.2f} -> {now['p95_ms']:>8.2f} ({p95_change:+6.1%})"
+                  f" {base['p99_ms']:>10.2f} -> {now['p99_ms']:>8.2f} ({p99_change:+6.1%})"
+                  f" {base['throughput']:>10.1f} -> {now['throughput']:>8.1f} ({tput_change:+6.1%}){flag}")
+    return regressions
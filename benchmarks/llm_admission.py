@@ -0,0 +1,121 @@
+"""LLM admission control under provider rate limiting.
+
+Runs the same burst of agent calls (``backend.agent.run_agent``) against the
+local fake model server configured like a rate-limited provider: it answers
+429 once more than ``--provider-limit`` requests are in flight, plus a small
+random share of 429s, with jittered latency. Each mode runs in a fresh
+process:
+
+- off: ``LLM_ADMISSION_ENABLED=false`` (the client's own two retries, no cap)
+- on:  admission control with ``LLM_MAX_CONCURRENCY`` at the provider limit
+
+Part of the burst is sent as ``priority="batch"``, to show interactive calls
+being served first. Reports successes, failures by type, 429s seen by the
+server and latency per priority.
+
+    poetry run python -m benchmarks.llm_admission --requests 200 --concurrency 50 --provider-limit 8
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import Counter
+
+from benchmarks._stats import describe_ms
+from benchmarks.fake_llm import FakeLLMConfig, serve_in_thread
+from benchmarks.harness import free_port
+
+
+async def burst(args) -> dict:
+    from backend.agent import run_agent, get_agent
+    from backend.llm_admission import deadline_in
+    get_agent()
+    gate = asyncio.Semaphore(args.concurrency)
+    latencies = {"interactive": [], "batch": []}
+    outcomes = Counter()
+
+    async def one(i):
+        priority = "batch" if i % args.batch_every == 0 else "interactive"
+        async with gate:
+            start = time.perf_counter()
+            try:
+                await run_agent(f"benchmark question {i}", user=f"user-{i % args.users}",
+                                deadline=deadline_in(args.timeout), priority=priority)
+                outcomes["ok"] += 1
+                latencies[priority].append(time.perf_counter() - start)
+            except Exception as e:
+                outcomes[type(e).__name__] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(args.requests)))
+    return {"elapsed": time.perf_counter() - started, "outcomes": dict(outcomes), "latencies": latencies}
+
+
+def child(args):
+    from benchmarks.harness import use_mongomock
+    use_mongomock()
+    print(json.dumps(asyncio.run(burst(args))))
+
+
+def run_mode(mode: str, args) -> tuple:
+    config = FakeLLMConfig(first_token_delay=args.first_token_delay, token_delay=0.002,
+                           max_concurrency=args.provider_limit, error_rate=args.error_rate,
+                           latency_jitter=args.latency_jitter)
+    port = free_port()
+    server = serve_in_thread(config, port)
+    env = {
+        **os.environ,
+        "GEMINI_BASE_URL": f"http://127.0.0.1:{port}/v1/",
+        "GEMINI_API_KEY": "fake",
+        "RESPONSE_CACHE_ENABLED": "false",
+        "INTENT_ROUTER_ENABLED": "false",
+        "LLM_ADMISSION_ENABLED": "true" if mode == "on" else "false",
+        "LLM_MAX_CONCURRENCY": str(args.provider_limit),
+        "LLM_MAX_PER_USER": str(args.per_user),
+        "LLM_RETRY_BASE_SECONDS": str(args.retry_base),
+    }
+    cmd = [sys.executable, "-m", "benchmarks.llm_admission", "--child"] + sys.argv[1:]
+    proc = subprocess.run(cmd, capture_output=True, text=True, env=env)
+    server.should_exit = True
+    if proc.returncode:
+        raise SystemExit(proc.stderr)
+    return json.loads(proc.stdout.strip().splitlines()[-1]), config.stats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50, help="calls in flight from the app")
+    parser.add_argument("--users", type=int, default=40)
+    parser.add_argument("--per-user", type=int, default=2)
+    parser.add_argument("--batch-every", type=int, default=4, help="every Nth call is priority=batch")
+    parser.add_argument("--provider-limit", type=int, default=8, help="fake provider: 429 above this many in flight")
+    parser.add_argument("--error-rate", type=float, default=0.02, help="fake provider: share of random 429s")
+    parser.add_argument("--first-token-delay", type=float, default=0.2)
+    parser.add_argument("--latency-jitter", type=float, default=0.2)
+    parser.add_argument("--retry-base", type=float, default=0.25)
+    parser.add_argument("--timeout", type=float, default=30, help="per-request deadline (s)")
+    parser.add_argument("--modes", default="off,on")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args)
+        return
+
+    for mode in args.modes.split(","):
+        result, server = run_mode(mode, args)
+        ok = result["outcomes"].get("ok", 0)
+        print(f"\nadmission {mode}: {ok}/{args.requests} ok in {result['elapsed']:.1f}s "
+              f"({ok / result['elapsed']:.1f}/s), outcomes={result['outcomes']}")
+        print(f"  provider: requests={server['requests']} 429s={server['rate_limited']} "
+              f"max_in_flight={server['max_in_flight']}")
+        for priority, values in result["latencies"].items():
+            print("  " + describe_ms(f"{priority:<11}", values)
+                  + (f" max={max(values) * 1000:.0f}ms" if values else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""/students latency while the server absorbs a burst of logins.
+
+Measures ``GET /students`` latency on an idle server, then again while
+``--logins`` concurrent ``POST /admin/login`` requests are in flight, and
+reports the status codes the logins got (200/401 = bcrypt ran, 429 = rate
+limited or the password pool was full). Run it against a running server:
+
+    poetry run python -m benchmarks.login_burst --email admin@test.com --password admin123 --logins 200
+
+With the default limits most of a single-client burst is rejected up front
+by the per-email/IP buckets. To load the bcrypt pool itself, start the server
+with e.g. ``LOGIN_EMAIL_BURST=100000 LOGIN_IP_BURST=100000``.
+"""
+import argparse
+import asyncio
+import time
+from collections import Counter
+
+import httpx
+
+from benchmarks._stats import describe_ms
+
+
+async def probe(client, url, stop, timings):
+    while not stop.is_set():
+        start = time.perf_counter()
+        resp = await client.get(f"{url}/students", params={"limit": 20})
+        resp.raise_for_status()
+        timings.append(time.perf_counter() - start)
+        await asyncio.sleep(0.01)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--baseline-seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    async with httpx.AsyncClient(timeout=120) as client:
+        login = await client.post(f"{args.url}/admin/login", json={"email": args.email, "password": args.password})
+        login.raise_for_status()
+        token = login.json()["access_token"]
+        authed = httpx.AsyncClient(timeout=120, headers={"Authorization": f"Bearer {token}"})
+
+        idle, stop = [], asyncio.Event()
+        task = asyncio.create_task(probe(authed, args.url, stop, idle))
+        await asyncio.sleep(args.baseline_seconds)
+        stop.set()
+        await task
+        print(describe_ms("/students idle", idle))
+
+        busy, stop = [], asyncio.Event()
+        task = asyncio.create_task(probe(authed, args.url, stop, busy))
+        start = time.perf_counter()
+        logins = await asyncio.gather(*[
+            client.post(f"{args.url}/admin/login", json={"email": args.email, "password": args.password})
+            for _ in range(args.logins)
+        ])
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await task
+        await authed.aclose()
+        print(describe_ms(f"/students during {args.logins} concurrent logins", busy))
+        codes = Counter(r.status_code for r in logins)
+        print(f"logins finished in {elapsed:.2f}s, status codes: {dict(sorted(codes.items()))}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,102 @@
+"""Document index ingest throughput and query latency.
+
+Builds a scratch index in a temporary directory:
+
+1. ingests a synthetic PDF of ``--pages`` pages and reports pages/sec,
+2. grows the index to ``--chunks`` chunks from synthetic text files,
+3. reports single-query latency and per-query cost of batched queries.
+
+    poetry run python -m benchmarks.rag_search --pages 500 --chunks 100000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from benchmarks._stats import describe_ms
+from backend.rag_agent import DocumentIndex, RAG_CHUNK_WORDS, RAG_CHUNK_OVERLAP
+
+VOCAB = [f"term{i}" for i in range(20_000)] + [
+    "tuition", "housing", "library", "exam", "grade", "appeal", "scholarship", "parking",
+    "deadline", "enrollment", "withdrawal", "attendance", "plagiarism", "residence", "fees",
+]
+
+
+def words(rng, n):
+    return " ".join(rng.choice(VOCAB) for _ in range(n))
+
+
+def write_pdf(path, pages, rng):
+    import pymupdf
+    doc = pymupdf.open()
+    for _ in range(pages):
+        page = doc.new_page()
+        page.insert_textbox(page.rect + (36, 36, -36, -36), words(rng, 450), fontsize=9)
+    doc.save(path)
+    doc.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--chunks", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=32)
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+    rng = random.Random(7)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = DocumentIndex(os.path.join(tmp, "index"))
+
+        pdf = os.path.join(tmp, "handbook.pdf")
+        write_pdf(pdf, args.pages, rng)
+        start = time.perf_counter()
+        report = index.ingest_file(pdf)
+        elapsed = time.perf_counter() - start
+        print(f"PDF ingest: {report['pages']} pages, {report['chunks']} chunks in {elapsed:.2f}s "
+              f"= {report['pages'] / elapsed:,.1f} pages/s")
+
+        start = time.perf_counter()
+        index.ingest_file(pdf)
+        print(f"re-ingest unchanged PDF (hash check only): {(time.perf_counter() - start) * 1000:.1f}ms")
+
+        # Each text file is one long "page" chunked into ~1000 rows.
+        step = RAG_CHUNK_WORDS - RAG_CHUNK_OVERLAP
+        per_file = 1000
+        start = time.perf_counter()
+        file_no = 0
+        while index.stats()["live_rows"] < args.chunks:
+            path = os.path.join(tmp, f"policy_{file_no}.txt")
+            with open(path, "w") as f:
+                f.write(words(rng, per_file * step + RAG_CHUNK_OVERLAP))
+            index.ingest_file(path)
+            os.remove(path)
+            file_no += 1
+        elapsed = time.perf_counter() - start
+        stats = index.stats()
+        print(f"text ingest: {stats['live_rows']:,} chunks in {elapsed:.1f}s = {stats['live_rows'] / elapsed:,.0f} chunks/s "
+              f"(index {stats['index_bytes'] / 1e6:.0f} MB)")
+
+        # Reload from disk so searches go through the memory map.
+        index = DocumentIndex(index.path)
+        queries = [words(rng, 6) for _ in range(args.queries)]
+        timings = []
+        for q in queries:
+            t = time.perf_counter()
+            index.search(q, args.top_k)
+            timings.append(time.perf_counter() - t)
+        print(describe_ms(f"single query @ {stats['live_rows']:,} chunks", timings))
+
+        timings = []
+        for i in range(0, len(queries), args.batch):
+            batch = queries[i:i + args.batch]
+            t = time.perf_counter()
+            index.search_many(batch, args.top_k)
+            timings.extend([(time.perf_counter() - t) / len(batch)] * len(batch))
+        print(describe_ms(f"batched ({args.batch}/batch) per query", timings))
+
+
+if __name__ == "__main__":
+    main()
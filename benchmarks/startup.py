@@ -0,0 +1,111 @@
+"""Import, startup and cold first-request time of the app.
+
+Each run is a fresh interpreter that times ``import backend.main``, the
+lifespan startup, and the first and second authenticated ``GET /students``
+(through the ASGI app in process). Medians over the runs are reported.
+
+    poetry run python -m benchmarks.startup --runs 10
+    poetry run python -m benchmarks.startup --mongo-uri mongodb://localhost:27017 --importtime
+
+Without ``--mongo-uri`` the database is mongomock, so client creation is
+nearly free and the numbers isolate the app's own import/startup work.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PHASES = ("import_s", "startup_s", "first_request_s", "second_request_s")
+
+
+async def _requests(app, headers) -> tuple:
+    import httpx
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as http:
+        timings = []
+        for _ in range(2):
+            start = time.perf_counter()
+            resp = await http.get("/students", params={"limit": 1})
+            resp.raise_for_status()
+            timings.append(time.perf_counter() - start)
+    return tuple(timings)
+
+
+async def _child_lifespan(app, headers) -> tuple:
+    start = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        startup = time.perf_counter() - start
+        first, second = await _requests(app, headers)
+    return startup, first, second
+
+
+def child(mongo_uri: str):
+    os.environ.setdefault("GEMINI_API_KEY", "fake")
+    if mongo_uri:
+        os.environ["DB_URI"] = mongo_uri
+        os.environ["DB_NAME"] = os.getenv("BENCH_DB_NAME", "campus_admin_agent_bench")
+    else:
+        from benchmarks.harness import use_mongomock
+        use_mongomock()
+
+    start = time.perf_counter()
+    from backend.main import app
+    imported = time.perf_counter() - start
+
+    from backend.db import admins_collection
+    from backend.auth_utils import create_access_token
+    admins_collection.update_one({"email": "bench@campus.edu"}, {"$set": {"password": "x"}}, upsert=True)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'bench@campus.edu'})}"}
+    startup, first, second = asyncio.run(_child_lifespan(app, headers))
+    print(json.dumps(dict(zip(PHASES, (imported, startup, first, second)))))
+
+
+def import_profile(top: int = 15):
+    """Slowest modules (cumulative) from ``python -X importtime``."""
+    env = {**os.environ, "GEMINI_API_KEY": os.getenv("GEMINI_API_KEY", "fake")}
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import backend.main"],
+                          capture_output=True, text=True, env=env)
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), name.strip()))
+    for cumulative_us, name in sorted(rows, reverse=True)[:top]:
+        print(f"  {cumulative_us / 1000:9.1f}ms  {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--mongo-uri", default=None)
+    parser.add_argument("--importtime", action="store_true", help="also list the slowest imports")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.mongo_uri)
+        return
+
+    cmd = [sys.executable, "-m", "benchmarks.startup", "--child"]
+    if args.mongo_uri:
+        cmd += ["--mongo-uri", args.mongo_uri]
+    samples = {phase: [] for phase in PHASES}
+    for _ in range(args.runs):
+        proc = subprocess.run(cmd, capture_output=True, text=True, check=True)
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        for phase in PHASES:
+            samples[phase].append(result[phase])
+    for phase in PHASES:
+        values = samples[phase]
+        print(f"{phase:<18} median={statistics.median(values) * 1000:8.1f}ms  min={min(values) * 1000:8.1f}ms")
+    if args.importtime:
+        print("slowest imports (cumulative):")
+        import_profile()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Time-to-first-token: blocking run vs streamed run.
+
+Starts the local fake LLM (``benchmarks.fake_llm``), then compares how long
+the agent takes to produce its first text with ``Runner.run`` (what the old
+``stream_agent`` awaited) and with ``Runner.run_streamed``. Also checks that
+abandoning a stream aborts the upstream model request.
+
+    poetry run python -m benchmarks.stream_ttft --runs 20
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks._stats import describe_ms
+from benchmarks.fake_llm import FakeLLMConfig, serve_in_thread
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--port", type=int, default=9101)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    args = parser.parse_args()
+
+    config = FakeLLMConfig(token_delay=args.token_delay)
+    serve_in_thread(config, args.port)
+    os.environ["GEMINI_BASE_URL"] = f"http://127.0.0.1:{args.port}/v1/"
+    os.environ.setdefault("GEMINI_API_KEY", "fake")
+
+    from agents import Runner, set_tracing_disabled
+    from openai.types.responses import ResponseTextDeltaEvent
+    from backend.agent import get_agent
+
+    set_tracing_disabled(True)
+    bench_agent = get_agent().clone(tools=[])
+
+    blocking, streamed_ttft, streamed_total = [], [], []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        await Runner.run(bench_agent, "How many students are there?")
+        blocking.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        first = None
+        result = Runner.run_streamed(bench_agent, "How many students are there?")
+        async for event in result.stream_events():
+            if first is None and event.type == "raw_response_event" and isinstance(event.data, ResponseTextDeltaEvent):
+                first = time.perf_counter() - start
+        streamed_ttft.append(first)
+        streamed_total.append(time.perf_counter() - start)
+
+    print(describe_ms("blocking run (first byte == last byte)", blocking))
+    print(describe_ms("streamed run time-to-first-token", streamed_ttft))
+    print(describe_ms("streamed run total", streamed_total))
+
+    # Abandon a stream after a few deltas, the way a disconnected client would.
+    aborted_before = config.stats["streams_aborted"]
+    result = Runner.run_streamed(bench_agent, "How many students are there?")
+    events = result.stream_events()
+    seen = 0
+    async for event in events:
+        if event.type == "raw_response_event" and isinstance(event.data, ResponseTextDeltaEvent):
+            seen += 1
+            if seen == 3:
+                break
+    result.cancel()
+    await events.aclose()
+    await asyncio.sleep(0.2)
+    print(f"cancelled after {seen} deltas; upstream streams aborted: "
+          f"{config.stats['streams_aborted'] - aborted_before}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
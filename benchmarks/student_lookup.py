@@ -0,0 +1,110 @@
+"""Student identifier lookup benchmark.
+
+Seeds a scratch database with synthetic students, then compares the old
+lookup pattern (email, then string id, then int id -- no indexes) with the
+single indexed ``$or`` query used by ``backend.tools``. Reports Mongo round
+trips per lookup (counted with a command listener) and latency.
+
+    poetry run python -m benchmarks.student_lookup --students 1000000 --lookups 200
+"""
+import argparse
+import datetime
+import os
+import random
+import time
+
+from pymongo import MongoClient, monitoring
+
+from benchmarks._stats import describe_ms
+from backend.indexes import ensure_indexes
+from backend.tools import _student_query
+
+
+class CommandCounter(monitoring.CommandListener):
+    def __init__(self):
+        self.count = 0
+
+    def started(self, event):
+        if event.command_name in ("find", "delete", "findAndModify"):
+            self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def seed(collection, total, batch=10_000):
+    now = datetime.datetime.now()
+    for start in range(0, total, batch):
+        collection.insert_many([
+            {
+                "name": f"Student {i}",
+                # Mirror legacy data: a mix of int and string ids.
+                "student_id": i if i % 2 else str(i),
+                "department": f"Dept {i % 40}",
+                "email": f"student{i}@campus.edu",
+                "created_at": now - datetime.timedelta(seconds=i),
+            }
+            for i in range(start, min(start + batch, total))
+        ], ordered=False)
+
+
+def legacy_lookup(collection, identifier):
+    student = collection.find_one({"email": identifier.lower()}) \
+              or collection.find_one({"student_id": identifier})
+    if student:
+        return student
+    try:
+        return collection.find_one({"student_id": int(identifier)})
+    except ValueError:
+        return None
+
+
+def indexed_lookup(collection, identifier):
+    return collection.find_one(_student_query(identifier))
+
+
+def run(label, fn, collection, identifiers, counter):
+    counter.count = 0
+    timings = []
+    for identifier in identifiers:
+        start = time.perf_counter()
+        fn(collection, identifier)
+        timings.append(time.perf_counter() - start)
+    print(f"{label}: round_trips/lookup={counter.count / len(identifiers):.2f}")
+    print(describe_ms(f"{label} latency", timings))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--uri", default=os.getenv("DB_URI", "mongodb://localhost:27017"))
+    parser.add_argument("--students", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=200)
+    parser.add_argument("--keep", action="store_true", help="keep the scratch database")
+    args = parser.parse_args()
+
+    counter = CommandCounter()
+    client = MongoClient(args.uri, event_listeners=[counter])
+    database = client["campus_admin_agent_bench"]
+    database.drop_collection("students")
+    print(f"seeding {args.students} students...")
+    seed(database["students"], args.students)
+
+    # Worst case for the old code: id lookups on int-typed rows miss twice first.
+    picks = random.sample(range(args.students), args.lookups)
+    identifiers = [str(i) if i % 3 else f"student{i}@campus.edu" for i in picks]
+
+    run("legacy (no indexes)", legacy_lookup, database["students"], identifiers, counter)
+    start = time.perf_counter()
+    ensure_indexes(database)
+    print(f"ensure_indexes: {time.perf_counter() - start:.1f}s")
+    run("indexed $or", indexed_lookup, database["students"], identifiers, counter)
+
+    if not args.keep:
+        client.drop_database("campus_admin_agent_bench")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Fuzzy student search benchmark.
+
+Seeds a scratch database with synthetic students, builds the in-memory
+search index from it (``backend.student_search``) and times a mix of
+partial, misspelled and id/email queries, next to a case-insensitive
+``$regex`` scan on name/email (what a fallback without the index would run).
+Reports build time, index size (traced allocations and the index's own
+estimate) and per-query latency.
+
+    poetry run python -m benchmarks.student_search --students 100000
+    poetry run python -m benchmarks.student_search --mongo-uri mongodb://localhost:27017
+"""
+import argparse
+import os
+import random
+import re
+import time
+import tracemalloc
+
+from benchmarks._stats import describe_ms
+
+FIRST = ["james", "mary", "john", "patricia", "robert", "jennifer", "michael", "linda", "william", "elizabeth",
+         "david", "barbara", "richard", "susan", "joseph", "jessica", "thomas", "sarah", "charles", "karen",
+         "aisha", "wei", "priya", "mohammed", "olga", "kenji", "fatima", "lucas", "sofia", "mateo"]
+LAST = [a + b for a in ("smi", "john", "wil", "bro", "jon", "gar", "mil", "dav", "rod", "mar", "her", "lop", "gon")
+        for b in ("th", "son", "ley", "wn", "es", "cia", "ler", "is", "riguez", "tinez", "kins", "erson")]
+DEPARTMENTS = ["Computer Science", "Mathematics", "Physics", "Chemistry", "Biology", "Economics", "History",
+               "Philosophy", "Mechanical Engineering", "Electrical Engineering", "Psychology", "Law"]
+# Partial words, typos, ids and email fragments, as users type them.
+QUERIES = ["jon smith", "smith", "mary jones", "elizbeth davis", "jennifer.gar", "priya", "wei", "k",
+           "S004213", "004213", "mohamed garcia", "olga.rod", "computer", "sara brwn"]
+
+
+def seed(collection, total, batch=10_000):
+    rng = random.Random(3)
+    for start in range(0, total, batch):
+        docs = []
+        for i in range(start, min(start + batch, total)):
+            first, last = rng.choice(FIRST), rng.choice(LAST)
+            docs.append({"name": f"{first.title()} {last.title()}", "student_id": f"S{i:06d}",
+                         "department": rng.choice(DEPARTMENTS), "email": f"{first}.{last}{i}@campus.edu"})
+        collection.insert_many(docs, ordered=False)
+
+
+def regex_scan(collection, query, limit=10):
+    pattern = re.compile(re.escape(query), re.IGNORECASE)
+    return list(collection.find({"$or": [{"name": pattern}, {"email": pattern}]}).limit(limit))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--students", type=int, default=100_000)
+    parser.add_argument("--runs", type=int, default=50, help="runs per query")
+    parser.add_argument("--mongo-uri", default=None)
+    parser.add_argument("--no-tracemalloc", action="store_true", help="skip traced memory (it slows the build)")
+    args = parser.parse_args()
+
+    if args.mongo_uri:
+        os.environ["DB_URI"] = args.mongo_uri
+        os.environ["DB_NAME"] = os.getenv("BENCH_DB_NAME", "campus_admin_agent_bench")
+    else:
+        from benchmarks.harness import use_mongomock
+        use_mongomock()
+
+    from backend.db import client, students_collection, DB_NAME
+    from backend.student_search import student_search
+
+    client.drop_database(DB_NAME)
+    print(f"seeding {args.students} students...")
+    seed(students_collection, args.students)
+
+    if not args.no_tracemalloc:
+        tracemalloc.start()
+    start = time.perf_counter()
+    student_search.rebuild()
+    build_s = time.perf_counter() - start
+    traced = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+    tracemalloc.stop()
+    stats = student_search.stats()
+    print(f"build from Mongo: {build_s:.1f}s" + (" (under tracemalloc)" if traced is not None else ""))
+    print(f"index: students={stats['students']} grams={stats['grams']} postings={stats['postings']} "
+          f"estimate={stats['memory_bytes'] / 1e6:.1f}MB"
+          + (f" traced={traced / 1e6:.1f}MB" if traced is not None else ""))
+
+    all_timings = []
+    for query in QUERIES:
+        timings = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            results = student_search.search(query, 10)
+            timings.append(time.perf_counter() - start)
+        all_timings += timings
+        top = results[0] if results else {}
+        print(describe_ms(f"search {query!r:18}", timings) + f"  top={top.get('name')} ({top.get('score')})")
+    print(describe_ms("search, all queries", all_timings))
+
+    timings = []
+    for query in QUERIES[:4]:
+        start = time.perf_counter()
+        regex_scan(students_collection, query)
+        timings.append(time.perf_counter() - start)
+    print(describe_ms("$regex scan (name/email)", timings))
+
+    client.drop_database(DB_NAME)
+
+
+if __name__ == "__main__":
+    main()
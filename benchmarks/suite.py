@@ -0,0 +1,256 @@
+"""Offline load-test suite.
+
+Starts the app from ``backend/main.py`` on a local port with a scripted
+fake model server and an in-memory Mongo (see ``benchmarks.harness``), runs
+the scenarios below and reports throughput and p50/p95/p99 per operation:
+
+- crud: concurrent workers doing a get/list/create/update/delete mix on /students
+- analytics: dashboard pollers sending If-None-Match, with a student added every 50 polls
+- chat: concurrent /chat/stream turns that make parallel tool calls
+- bulk: CSV uploads to /students/bulk (also reports rows/s)
+
+    poetry run python -m benchmarks.suite
+    poetry run python -m benchmarks.suite --scenarios crud,chat --save-baseline
+    poetry run python -m benchmarks.suite --compare            # exits 1 on regression
+
+Baselines are only comparable on the same machine with the same parameters;
+the baseline file records both. On a shared or small machine run-to-run
+noise can exceed the tolerance; use ``--repeat 3`` (medians of three runs)
+for both the baseline and the comparison there. ``--mongo-uri`` runs against a real server
+(its scratch database is dropped afterwards).
+
+mongomock has no indexes and holds the GIL, so absolute numbers are far
+below a real deployment (bulk upserts in particular scan the collection per
+row) and Mongo spans are missing from traces (it fires no command events).
+The suite is for catching relative regressions in the app's own code.
+"""
+import argparse
+import asyncio
+import datetime
+import io
+import os
+import random
+import statistics
+import sys
+import time
+
+import httpx
+
+from benchmarks.fake_llm import FakeLLMConfig
+from benchmarks.harness import Recorder, start_stack, print_report, save_baseline, compare_baseline
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baselines.json")
+SCENARIOS = ("crud", "analytics", "chat", "bulk")
+
+# The fake model answers "summarize enrollment ..." with three tool calls in one turn.
+CHAT_TOOL_SCRIPT = {
+    "summarize enrollment": [
+        ("get_total_students", {}),
+        ("get_students_by_department", {}),
+        ("get_recent_onboarded_students", {"limit": 5}),
+    ],
+}
+
+
+def student_csv(start: int, count: int) -> bytes:
+    lines = ["name,student_id,department,email"]
+    lines += [f"Student {i},{i},Dept {i % 20},student{i}@campus.edu" for i in range(start, start + count)]
+    return ("\n".join(lines) + "\n").encode()
+
+
+def seed(students: int, batch: int = 10_000):
+    from backend.db import students_collection
+    now = datetime.datetime.now()
+    for start in range(0, students, batch):
+        students_collection.insert_many([
+            {"name": f"Student {i}", "student_id": str(i), "department": f"Dept {i % 20}",
+             "email": f"student{i}@campus.edu", "created_at": now - datetime.timedelta(seconds=i)}
+            for i in range(start, min(start + batch, students))
+        ])
+
+
+# ----------------- Scenarios -----------------
+async def crud(http, rec, args):
+    rng = random.Random(1)
+    next_id = [args.students]
+    # Reads and updates hit seeded students; deletes only remove ones created
+    # here, so no worker looks up a student another worker just deleted.
+    created = []
+
+    async def worker():
+        for _ in range(args.ops // args.concurrency):
+            roll = rng.random()
+            if roll < 0.5:
+                await rec.timed("get", http.get(f"/students/{rng.randrange(args.students)}"))
+            elif roll < 0.7:
+                await rec.timed("list", http.get("/students", params={"limit": 20, "department": f"Dept {rng.randrange(20)}"}))
+            elif roll < 0.85:
+                sid = next_id[0]
+                next_id[0] += 1
+                resp = await rec.timed("create", http.post("/students", json={
+                    "name": f"Student {sid}", "student_id": str(sid),
+                    "department": f"Dept {sid % 20}", "email": f"student{sid}@campus.edu",
+                }))
+                if resp is not None and resp.status_code < 400:
+                    created.append(sid)
+            elif roll < 0.95:
+                await rec.timed("update", http.patch(f"/students/{rng.randrange(args.students)}",
+                                                     json={"field": "department", "new_value": f"Dept {rng.randrange(20)}"}))
+            elif created:
+                sid = created.pop(rng.randrange(len(created)))
+                await rec.timed("delete", http.delete(f"/students/{sid}"))
+
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+
+
+async def analytics(http, rec, args):
+    # One write every ``write_every`` polls (by count, not time, so a slow run does
+    # not also get extra snapshot invalidations).
+    write_every = 50
+    polls, not_modified = [0], [0]
+
+    async def poller():
+        etag = None
+        for _ in range(args.ops // args.concurrency):
+            headers = {"If-None-Match": etag} if etag else {}
+            resp = await rec.timed("poll", http.get("/analytics", headers=headers))
+            if resp is not None:
+                etag = resp.headers.get("etag", etag)
+                not_modified[0] += resp.status_code == 304
+            polls[0] += 1
+            if polls[0] % write_every == 0:
+                sid = 10_000_000 + polls[0]
+                await rec.timed("write", http.post("/students", json={
+                    "name": f"Student {sid}", "student_id": str(sid), "department": "Dept 0",
+                    "email": f"student{sid}@campus.edu",
+                }))
+
+    await asyncio.gather(*(poller() for _ in range(args.concurrency)))
+    done = len(rec.samples["poll"])
+    rec.extra["poll"]["not_modified_ratio"] = round(not_modified[0] / done, 3) if done else 0.0
+
+
+async def chat(http, rec, args):
+    sem = asyncio.Semaphore(args.concurrency)
+
+    async def turn(i):
+        user_id, thread_id = f"bench-{i % args.concurrency}", f"bench-thread-{i % args.concurrency}"
+        async with sem:
+            start = time.perf_counter()
+            first = None
+            try:
+                async with http.stream("POST", f"/chat/stream/{thread_id}", json={
+                    "user_id": user_id, "message": f"summarize enrollment for report {i}",
+                }) as resp:
+                    async for line in resp.aiter_lines():
+                        if first is None and line.startswith("data:"):
+                            first = time.perf_counter() - start
+                        if "[STREAM ERROR]" in line or line.startswith("event: error"):
+                            resp.status_code = 599
+            except httpx.HTTPError:
+                rec.add("stream_total", 0, ok=False)
+                return
+            ok = resp.status_code < 400
+            rec.add("stream_ttfb", first if first is not None else time.perf_counter() - start, ok)
+            rec.add("stream_total", time.perf_counter() - start, ok)
+
+    for n in range(args.concurrency):
+        await rec.timed("thread_create", http.post("/threads/create", json={
+            "user_id": f"bench-{n}", "thread_id": f"bench-thread-{n}"}))
+    turns = max(args.concurrency, args.ops // 10)
+    await asyncio.gather(*(turn(i) for i in range(turns)))
+
+
+async def bulk(http, rec, args):
+    start_id, rows = 20_000_000, 0
+    started = time.perf_counter()
+    for _ in range(args.bulk_files):
+        body = student_csv(start_id, args.bulk_rows)
+        resp = await rec.timed("upload", http.post("/students/bulk", files={"file": ("students.csv", io.BytesIO(body))}))
+        if resp is not None and resp.status_code < 400:
+            rows += args.bulk_rows
+        start_id += args.bulk_rows
+    rec.extra["upload"]["rows_per_s"] = round(rows / (time.perf_counter() - started), 1)
+
+
+RUNNERS = {"crud": crud, "analytics": analytics, "chat": chat, "bulk": bulk}
+
+
+async def run(stack, scenarios, args) -> dict:
+    results = {}
+    limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency * 2)
+    async with httpx.AsyncClient(base_url=stack.base_url, headers=stack.headers, limits=limits,
+                                 timeout=300) as http:
+        for name in scenarios:
+            runs = []
+            for _ in range(args.repeat):
+                rec = Recorder()
+                started = time.perf_counter()
+                await RUNNERS[name](http, rec, args)
+                runs.append(rec.summary(time.perf_counter() - started))
+            results[name] = median_summary(runs)
+    return results
+
+
+def median_summary(runs: list) -> dict:
+    """Per operation, the median of each figure across repeated runs."""
+    if len(runs) == 1:
+        return runs[0]
+    merged = {}
+    for op in runs[0]:
+        figures = [run[op] for run in runs if op in run]
+        merged[op] = {key: type(value)(statistics.median(f[key] for f in figures))
+                      for key, value in figures[0].items()}
+    return merged
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--ops", type=int, default=2000, help="requests per scenario (chat runs ops/10 turns)")
+    parser.add_argument("--students", type=int, default=2000, help="students seeded before the scenarios")
+    parser.add_argument("--bulk-files", type=int, default=3)
+    parser.add_argument("--bulk-rows", type=int, default=500)
+    parser.add_argument("--first-token-delay", type=float, default=0.05)
+    parser.add_argument("--token-delay", type=float, default=0.005)
+    parser.add_argument("--repeat", type=int, default=1, help="run each scenario N times and report medians")
+    parser.add_argument("--mongo-uri", default=None, help="real MongoDB instead of mongomock")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--compare", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p95/throughput change before failing")
+    args = parser.parse_args()
+
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    params = {k: getattr(args, k) for k in ("concurrency", "ops", "students", "bulk_files", "bulk_rows",
+                                            "first_token_delay", "token_delay", "repeat")}
+    params["mongo"] = "real" if args.mongo_uri else "mongomock"
+
+    llm = FakeLLMConfig(first_token_delay=args.first_token_delay, token_delay=args.token_delay,
+                        tool_script=CHAT_TOOL_SCRIPT)
+    stack = start_stack(llm, args.mongo_uri)
+    try:
+        seed(args.students)
+        results = asyncio.run(run(stack, scenarios, args))
+    finally:
+        stack.stop()
+
+    print_report(results)
+    print(f"\nfake model: {llm.stats}")
+    if args.save_baseline:
+        save_baseline(args.baseline, results, params)
+        print(f"baseline written to {args.baseline}")
+    if args.compare:
+        regressions = compare_baseline(args.baseline, results, params, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print(f"\nno regressions beyond {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
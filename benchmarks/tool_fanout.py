@@ -0,0 +1,80 @@
+"""Cost of a multi-tool agent turn.
+
+Seeds a scratch database, then times a turn that needs the total count, the
+per-department breakdown and the recent students three ways:
+
+- sequential: each tool awaited in turn (the old behaviour)
+- concurrent: all three awaited together, as the agent SDK does for the
+  tool calls of one model turn
+- cached: concurrent, with the tool result cache warm
+
+    poetry run python -m benchmarks.tool_fanout --students 200000 --turns 50
+"""
+import argparse
+import asyncio
+import datetime
+import os
+import time
+
+os.environ["DB_NAME"] = os.getenv("BENCH_DB_NAME", "campus_admin_agent_bench")
+
+from benchmarks._stats import describe_ms  # noqa: E402
+from backend.db import client, students_collection, run_in_db_pool, DB_NAME  # noqa: E402
+from backend.indexes import ensure_indexes  # noqa: E402
+from backend.tool_cache import tool_cache  # noqa: E402
+from backend.tools import (  # noqa: E402
+    get_total_students, get_students_by_department, get_recent_onboarded_students,
+    get_total_students_async, get_students_by_department_async, get_recent_onboarded_students_async,
+)
+
+
+def seed(total, batch=10_000):
+    now = datetime.datetime.now()
+    for start in range(0, total, batch):
+        students_collection.insert_many([
+            {"name": f"Student {i}", "student_id": str(i), "department": f"Dept {i % 40}",
+             "email": f"student{i}@campus.edu", "created_at": now - datetime.timedelta(seconds=i)}
+            for i in range(start, min(start + batch, total))
+        ])
+
+
+async def timed(label, turn, turns, clear_cache):
+    timings = []
+    for _ in range(turns):
+        if clear_cache:
+            tool_cache.clear()
+        start = time.perf_counter()
+        await turn()
+        timings.append(time.perf_counter() - start)
+    print(describe_ms(label, timings))
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--students", type=int, default=200_000)
+    parser.add_argument("--turns", type=int, default=50)
+    args = parser.parse_args()
+
+    client.drop_database(DB_NAME)
+    ensure_indexes()
+    seed(args.students)
+
+    async def sequential():
+        await run_in_db_pool(get_total_students)
+        await run_in_db_pool(get_students_by_department)
+        await run_in_db_pool(get_recent_onboarded_students)
+
+    async def concurrent():
+        await asyncio.gather(
+            get_total_students_async(), get_students_by_department_async(), get_recent_onboarded_students_async()
+        )
+
+    await timed("sequential (3 tools)", sequential, args.turns, clear_cache=True)
+    await timed("concurrent (3 tools)", concurrent, args.turns, clear_cache=True)
+    await timed("concurrent, cache warm", concurrent, args.turns, clear_cache=False)
+
+    client.drop_database(DB_NAME)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,94 @@
+"""Request tracing overhead.
+
+Drives ``GET /students/{id}`` and ``GET /students`` through the ASGI app
+in process (no network hop to hide the cost) against a scratch database,
+alternating rounds with tracing on and off, and reports the relative
+difference. Also reports the raw cost of recording one Mongo command span.
+
+    poetry run python -m benchmarks.tracing_overhead --requests 2000
+"""
+import argparse
+import asyncio
+import datetime
+import os
+import random
+import time
+from types import SimpleNamespace
+
+os.environ["DB_NAME"] = os.getenv("BENCH_DB_NAME", "campus_admin_agent_bench")
+
+import httpx  # noqa: E402
+from benchmarks._stats import describe_ms  # noqa: E402
+from backend import tracing  # noqa: E402
+from backend.db import client, admins_collection, students_collection, DB_NAME  # noqa: E402
+from backend.indexes import ensure_indexes  # noqa: E402
+from backend.auth_utils import create_access_token  # noqa: E402
+from backend.main import app  # noqa: E402
+
+
+async def run_round(http, paths, timings):
+    for path in paths:
+        start = time.perf_counter()
+        resp = await http.get(path)
+        resp.raise_for_status()
+        timings.append(time.perf_counter() - start)
+
+
+def listener_cost(n=100_000):
+    listener = tracing.MongoCommandListener()
+    trace = tracing.RequestTrace("bench")
+    token = tracing._current.set(trace)
+    started = SimpleNamespace(command_name="find", command={"find": "students"}, request_id=0)
+    done = SimpleNamespace(command_name="find", request_id=0, duration_micros=250)
+    start = time.perf_counter()
+    for i in range(n):
+        started.request_id = done.request_id = i
+        listener.started(started)
+        listener.succeeded(done)
+    elapsed = time.perf_counter() - start
+    tracing._current.reset(token)
+    return elapsed / n
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--students", type=int, default=10_000)
+    args = parser.parse_args()
+
+    client.drop_database(DB_NAME)
+    ensure_indexes()
+    now = datetime.datetime.now()
+    students_collection.insert_many([
+        {"name": f"Student {i}", "student_id": str(i), "department": f"Dept {i % 40}",
+         "email": f"s{i}@campus.edu", "created_at": now - datetime.timedelta(seconds=i)}
+        for i in range(args.students)
+    ])
+    admins_collection.insert_one({"email": "bench@campus.edu", "password": "x"})
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'bench@campus.edu'})}"}
+
+    rng = random.Random(3)
+    per_round = max(1, args.requests // args.rounds)
+    on, off = [], []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as http:
+        await run_round(http, ["/students?limit=5"] * 20, [])
+        for i in range(args.rounds * 2):
+            paths = [f"/students/{rng.randrange(args.students)}" if j % 2 else "/students?limit=20"
+                     for j in range(per_round)]
+            tracing.TRACING_ENABLED = i % 2 == 0
+            await run_round(http, paths, on if tracing.TRACING_ENABLED else off)
+    tracing.TRACING_ENABLED = True
+
+    print(describe_ms("tracing off", off))
+    print(describe_ms("tracing on ", on))
+    mean_on, mean_off = sum(on) / len(on), sum(off) / len(off)
+    print(f"overhead: {(mean_on - mean_off) * 1e6:+.1f}us per request ({(mean_on / mean_off - 1) * 100:+.2f}%)")
+    print(f"Mongo command span: {listener_cost() * 1e6:.2f}us each")
+
+    client.drop_database(DB_NAME)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
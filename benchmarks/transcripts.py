@@ -0,0 +1,114 @@
+"""Thread transcript storage benchmark.
+
+Writes long synthetic threads through ``backend.transcripts`` (in
+write-behind batches, as the memory flusher does) and reports:
+
+- stored bytes per turn: BSON size of the segment documents, against the
+  same turns as ``{role, content}`` objects in one array (the layout the
+  thread documents use for recent messages);
+- latency of a history page at the end, middle and start of the thread,
+  and of a full export.
+
+    poetry run python -m benchmarks.transcripts --threads 3 --turns 10000
+    poetry run python -m benchmarks.transcripts --mongo-uri mongodb://localhost:27017
+"""
+import argparse
+import datetime
+import os
+import random
+import time
+
+import bson
+
+from benchmarks._stats import describe_ms
+
+WORDS = ("student students enrolled department computer science physics mathematics course semester "
+         "grade schedule event hall campus library fee deadline email registration advisor exam "
+         "the a of and to in for is are with on this that which please can you how many list show").split()
+
+
+def message(rng, role):
+    n = rng.randint(6, 20) if role == "user" else rng.randint(30, 90)
+    text = " ".join(rng.choice(WORDS) for _ in range(n))
+    return text[0].upper() + text[1:] + ("?" if role == "user" else ".")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=3)
+    parser.add_argument("--turns", type=int, default=10_000, help="turns per thread")
+    parser.add_argument("--batch", type=int, default=20, help="turns per write-behind flush")
+    parser.add_argument("--page", type=int, default=50)
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--mongo-uri", default=None)
+    args = parser.parse_args()
+
+    if args.mongo_uri:
+        os.environ["DB_URI"] = args.mongo_uri
+        os.environ["DB_NAME"] = os.getenv("BENCH_DB_NAME", "campus_admin_agent_bench")
+    else:
+        from benchmarks.harness import use_mongomock
+        use_mongomock()
+
+    from backend.db import client, db, DB_NAME
+    from backend.transcripts import TranscriptStore, TRANSCRIPT_SEGMENT_TURNS, TRANSCRIPT_CODEC
+
+    client.drop_database(DB_NAME)
+    store = TranscriptStore(db.threads, db.thread_transcripts)
+    rng = random.Random(5)
+    threads = [f"thread-{i}" for i in range(args.threads)]
+    legacy_bytes = 0
+    started = time.perf_counter()
+    for thread_id in threads:
+        db.threads.insert_one({"user_id": "bench", "thread_id": thread_id, "created_at": datetime.datetime.utcnow(),
+                               "transcript_turns": 0, "transcript_segment_turns": TRANSCRIPT_SEGMENT_TURNS})
+        messages = []
+        for turn in range(args.turns):
+            role = "user" if turn % 2 == 0 else "assistant"
+            content = message(rng, role)
+            messages.append({"role": role, "content": content})
+            store.add("bench", thread_id, role, content)
+            if turn % args.batch == args.batch - 1:
+                store.flush()
+        store.flush()
+        legacy_bytes += len(bson.encode({"messages": messages}))
+    write_s = time.perf_counter() - started
+    total_turns = args.threads * args.turns
+    print(f"wrote {total_turns} turns in {write_s:.1f}s ({total_turns / write_s:.0f} turns/s), "
+          f"segments of {TRANSCRIPT_SEGMENT_TURNS}, codec={TRANSCRIPT_CODEC}")
+
+    stored_bytes, raw_bytes, sealed, open_segments = 0, 0, 0, 0
+    for segment in db.thread_transcripts.find({"user_id": "bench"}):
+        stored_bytes += len(bson.encode(segment))
+        if "z" in segment:
+            sealed += 1
+            raw_bytes += segment["raw_bytes"]
+        else:
+            open_segments += 1
+    print(f"segments: sealed={sealed} open={open_segments}")
+    print(f"bytes/turn: transcript={stored_bytes / total_turns:.1f} "
+          f"(sealed payload {raw_bytes / max(sealed * TRANSCRIPT_SEGMENT_TURNS, 1):.1f} before compression), "
+          f"messages array={legacy_bytes / total_turns:.1f} ({legacy_bytes / stored_bytes:.1f}x larger)")
+
+    thread_id = threads[0]
+    for label, before in (("latest page", None), ("middle page", args.turns // 2), ("first page", args.page)):
+        timings = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            page = store.history("bench", thread_id, args.page, before)
+            timings.append(time.perf_counter() - start)
+        assert len(page["turns"]) == args.page, page["total"]
+        print(describe_ms(f"history {label} ({args.page} turns)", timings))
+
+    timings = []
+    for _ in range(max(1, args.runs // 10)):
+        start = time.perf_counter()
+        exported = sum(1 for _ in store.iter_turns("bench", thread_id))
+        timings.append(time.perf_counter() - start)
+    print(describe_ms(f"export ({exported} turns)", timings))
+
+    client.drop_database(DB_NAME)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""Shared test setup: an in-memory Mongo (mongomock), the local fake model
+(``benchmarks.fake_llm``) and the app on a local port (``benchmarks.harness``).
+
+Backend settings are read at import time, and ``backend.db`` imports
+``MongoClient`` by name (the client itself is only created on first use), so
+the environment is prepared and mongomock swapped in here, before any test
+module imports the backend.
+"""
+import os
+import tempfile
+
+import pytest
+
+os.environ.setdefault("RESPONSE_CACHE_ENABLED", "false")
+os.environ.setdefault("INTENT_ROUTER_ENABLED", "false")
+os.environ.setdefault("LLM_MAX_RETRIES", "2")
+os.environ.setdefault("LLM_RETRY_BASE_SECONDS", "0.05")
+os.environ.setdefault("LLM_RETRY_MAX_SECONDS", "0.2")
+# The document index is opened when backend.tools is imported, which can be
+# before the stack starts.
+_scratch = tempfile.mkdtemp(prefix="campus-admin-tests-")
+os.environ.setdefault("RAG_INDEX_DIR", os.path.join(_scratch, "rag_index"))
+os.environ.setdefault("RAG_DOCS_DIR", os.path.join(_scratch, "docs"))
+
+from benchmarks.fake_llm import FakeLLMConfig  # noqa: E402
+from benchmarks.harness import start_stack, use_mongomock  # noqa: E402
+
+use_mongomock()
+
+
+@pytest.fixture(scope="session")
+def stack():
+    stack = start_stack(FakeLLMConfig(first_token_delay=0.05, token_delay=0.01))
+    yield stack
+    stack.stop()
+
+
+@pytest.fixture
+def llm(stack):
+    """The fake model's config; tests may change it, it is restored afterwards."""
+    saved = dict(vars(stack.llm))
+    yield stack.llm
+    stats = stack.llm.stats
+    vars(stack.llm).update(saved)
+    stack.llm.stats = stats
@@ -0,0 +1,57 @@
+"""Activity buffering when Mongo writes fail."""
+import pytest
+from pymongo.errors import AutoReconnect
+
+from backend import activity
+from backend.activity import ActivityTracker, activity_collection, activity_daily_collection
+
+
+@pytest.fixture
+def tracker():
+    activity_collection.delete_many({})
+    activity_daily_collection.delete_many({})
+    yield ActivityTracker(buffer_size=4, flush_interval=60)
+
+
+class Unreachable:
+    def insert_many(self, *args, **kwargs):
+        raise AutoReconnect("connection reset")
+
+
+def fail_inserts(monkeypatch):
+    monkeypatch.setattr(activity, "activity_collection", Unreachable())
+
+
+def test_failed_flush_keeps_the_batch_for_the_next_one(tracker, monkeypatch):
+    with monkeypatch.context() as patched:
+        fail_inserts(patched)
+        for i in range(3):
+            tracker.record(f"S{i}", "lookup")
+        with pytest.raises(AutoReconnect):
+            tracker.flush()
+    tracker.record("S3", "lookup")
+    tracker.flush()
+
+    assert sorted(doc["student_id"] for doc in activity_collection.find()) == ["S0", "S1", "S2", "S3"]
+
+
+def test_requeued_batch_is_bounded_by_the_buffer(tracker, monkeypatch):
+    dropped = activity._dropped.value
+    fail_inserts(monkeypatch)
+    for i in range(tracker._buffer.maxlen):
+        tracker.record(f"S{i}", "lookup")
+    # Records arriving during the failed write push the oldest out.
+    write = tracker._write
+
+    def write_while_recording(items):
+        tracker.record("late-1", "lookup")
+        tracker.record("late-2", "lookup")
+        return write(items)
+    monkeypatch.setattr(tracker, "_write", write_while_recording)
+    with pytest.raises(AutoReconnect):
+        tracker.flush()
+
+    kept = [item[1] for item in tracker._buffer]
+    assert len(kept) == tracker._buffer.maxlen
+    assert kept[0] == "S2" and kept[-2:] == ["late-1", "late-2"]
+    assert activity._dropped.value - dropped == 2
@@ -0,0 +1,30 @@
+"""Conditional GETs on the analytics endpoints."""
+import httpx
+import pytest
+
+
+def get(stack, path, if_none_match=None):
+    headers = {**stack.headers, **({"If-None-Match": if_none_match} if if_none_match else {})}
+    return httpx.get(f"{stack.base_url}{path}", headers=headers, timeout=30)
+
+
+@pytest.mark.parametrize("path", ["/analytics", "/analytics/summary"])
+def test_matching_if_none_match_is_a_304(stack, path):
+    first = get(stack, path)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert etag.startswith('W/"')
+    strong = etag[2:]
+
+    for header in (etag, strong, f'"stale", {etag}', f'W/"stale",{strong}', "*"):
+        response = get(stack, path, header)
+        assert response.status_code == 304, header
+        assert response.headers["ETag"] == etag
+        assert response.content == b""
+
+
+def test_other_etags_get_the_body(stack):
+    for header in ('W/"stale"', '"stale", W/"older"'):
+        response = get(stack, "/analytics", header)
+        assert response.status_code == 200
+        assert "total_students" in response.json()
@@ -0,0 +1,19 @@
+"""Principal cache invalidation on admin writes."""
+import httpx
+
+from backend import data_versions
+from backend.auth_utils import principal_cache, create_access_token
+
+
+def test_signup_drops_cached_tokens_for_the_email(stack):
+    email = "reused@campus.edu"
+    stale = create_access_token({"sub": email})
+    principal_cache.put(principal_cache.key(stale), email, float("inf"))
+    version = data_versions.version("admins")
+
+    response = httpx.post(f"{stack.base_url}/admin/signup", timeout=30,
+                          json={"email": email, "password": "s3cret-pass", "name": "Reused"})
+
+    assert response.status_code == 200
+    assert data_versions.version("admins") == version + 1
+    assert principal_cache.get(principal_cache.key(stale)) is None
@@ -0,0 +1,100 @@
+import json
+import time
+import uuid
+
+import httpx
+
+from benchmarks.fake_llm import DEFAULT_REPLY
+
+
+def new_thread(stack, client) -> str:
+    thread_id = f"t-{uuid.uuid4().hex[:8]}"
+    response = client.post("/threads/create", json={"user_id": "tester", "thread_id": thread_id})
+    assert response.status_code == 200
+    return thread_id
+
+
+def read_frames(response, limit: int = None):
+    """Yield ``(event, data, seconds since the request)`` per SSE frame."""
+    started = time.perf_counter()
+    event, data = None, []
+    for line in response.iter_lines():
+        if line.startswith("event: "):
+            event = line[len("event: "):]
+        elif line.startswith("data: "):
+            data.append(line[len("data: "):])
+        elif not line and (event or data):
+            yield event, "\n".join(data), time.perf_counter() - started
+            event, data = None, []
+
+
+def client_for(stack):
+    return httpx.Client(base_url=stack.base_url, headers=stack.headers, timeout=30)
+
+
+def test_deltas_arrive_incrementally(stack, llm):
+    llm.token_delay = 0.05
+    with client_for(stack) as client:
+        thread_id = new_thread(stack, client)
+        with client.stream("POST", f"/chat/stream/{thread_id}",
+                           json={"user_id": "tester", "message": "Tell me about enrollment"}) as response:
+            assert response.status_code == 200
+            frames = list(read_frames(response))
+
+    deltas = [(data, at) for event, data, at in frames if event is None and data]
+    assert frames[-1][:2] == ("done", "[DONE]")
+    assert "".join(data for data, _ in deltas) == DEFAULT_REPLY
+    # One frame per model chunk, spread over the reply rather than sent at the end.
+    assert len(deltas) == len(DEFAULT_REPLY.split(" "))
+    first, last = deltas[0][1], deltas[-1][1]
+    assert last - first > 0.05 * (len(deltas) - 1) * 0.5
+    assert first < last / 2
+
+
+def test_tool_progress_events_come_before_text(stack, llm):
+    llm.tool_script = {"how many": [("get_total_students", {})]}
+    with client_for(stack) as client:
+        thread_id = new_thread(stack, client)
+        with client.stream("POST", f"/chat/stream/{thread_id}",
+                           json={"user_id": "tester", "message": "How many students are there?"}) as response:
+            events = [(event, data) for event, data, _ in read_frames(response)]
+
+    kinds = [event or "delta" for event, _ in events]
+    assert kinds.index("tool_call") < kinds.index("tool_output") < kinds.index("delta")
+    assert json.loads(events[kinds.index("tool_call")][1])["name"] == "get_total_students"
+    assert kinds[-1] == "done"
+
+
+def test_model_failure_sends_error_event(stack, llm):
+    llm.error_rate = 1.0
+    llm.retry_after = 0
+    with client_for(stack) as client:
+        thread_id = new_thread(stack, client)
+        with client.stream("POST", f"/chat/stream/{thread_id}",
+                           json={"user_id": "tester", "message": "Tell me about enrollment"}) as response:
+            frames = list(read_frames(response))
+
+    assert [event for event, _, _ in frames] == ["error"]
+    error = json.loads(frames[0][1])
+    assert error["type"] == "error" and error["status"] == 503
+    assert error["retry_after"] > 0
+
+
+def test_client_disconnect_cancels_upstream_request(stack, llm):
+    llm.token_delay = 0.1
+    aborted = llm.stats["streams_aborted"]
+    with client_for(stack) as client:
+        thread_id = new_thread(stack, client)
+        with client.stream("POST", f"/chat/stream/{thread_id}",
+                           json={"user_id": "tester", "message": "Tell me about enrollment"}) as response:
+            deltas = 0
+            for event, _, _ in read_frames(response):
+                deltas += event is None
+                if deltas == 2:
+                    break
+        # Leaving the block closes the connection mid-stream.
+
+    deadline = time.time() + 5
+    while llm.stats["streams_aborted"] == aborted and time.time() < deadline:
+        time.sleep(0.05)
+    assert llm.stats["streams_aborted"] == aborted + 1
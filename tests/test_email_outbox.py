@@ -0,0 +1,152 @@
+"""Email outbox against a local SMTP server (aiosmtpd)."""
+import datetime
+import socket
+
+import httpx
+import pytest
+from aiosmtpd.controller import Controller
+
+from backend import email_outbox as outbox_module
+from backend.email_outbox import EmailOutbox, outbox_collection, EMAIL_RETRY_BASE_SECONDS
+from backend.indexes import ensure_indexes
+from backend.tools import email_students, students_collection
+
+
+class Handler:
+    """Accepts everything, or answers DATA with ``reply`` when it is set."""
+
+    def __init__(self):
+        self.reply = None
+        self.received = []
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.reply:
+            return self.reply
+        self.received.append(envelope)
+        return "250 OK"
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+@pytest.fixture
+def smtp(monkeypatch):
+    handler = Handler()
+    controller = Controller(handler, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    monkeypatch.setattr(outbox_module, "SMTP_HOST", "127.0.0.1")
+    monkeypatch.setattr(outbox_module, "SMTP_PORT", controller.port)
+    yield handler
+    controller.stop()
+
+
+@pytest.fixture
+def outbox():
+    ensure_indexes()
+    outbox_collection.delete_many({})
+    yield EmailOutbox(batch_size=10)
+    outbox_collection.delete_many({})
+
+
+def messages(count, key=None):
+    return [{"to": f"s{i}@uni.edu", "subject": "Fees", "body": "Due Friday", "idempotency_key": key}
+            for i in range(count)]
+
+
+def test_enqueue_with_the_same_key_is_idempotent(outbox):
+    assert outbox.enqueue(messages(3, key="fees-2026")) == {"queued": 3, "duplicates": 0}
+    assert outbox.enqueue(messages(3, key="fees-2026")) == {"queued": 0, "duplicates": 3}
+    assert outbox.enqueue(messages(3, key="fees-reminder")) == {"queued": 3, "duplicates": 0}
+    assert outbox_collection.count_documents({}) == 6
+
+
+def test_messages_are_sent_once(outbox, smtp):
+    outbox.enqueue(messages(3))
+    outbox.dispatch()
+    outbox.dispatch()
+    assert len(smtp.received) == 3
+    assert outbox_collection.count_documents({"status": "sent", "attempts": 1}) == 3
+
+
+def test_4xx_is_retried_with_backoff(outbox, smtp):
+    smtp.reply = "451 Try again later"
+    outbox.enqueue(messages(1))
+    before = datetime.datetime.utcnow()
+    outbox.dispatch()
+
+    doc = outbox_collection.find_one()
+    assert doc["status"] == "pending" and doc["attempts"] == 1
+    assert "451" in doc["last_error"]
+    delay = (doc["next_attempt_at"] - before).total_seconds()
+    assert EMAIL_RETRY_BASE_SECONDS * 0.5 - 1 <= delay <= EMAIL_RETRY_BASE_SECONDS + 1
+
+    # Not due yet, so the next run leaves it alone.
+    smtp.reply = None
+    outbox.dispatch()
+    assert smtp.received == []
+
+    outbox_collection.update_one({}, {"$set": {"next_attempt_at": datetime.datetime.utcnow()}})
+    outbox.dispatch()
+    doc = outbox_collection.find_one()
+    assert doc["status"] == "sent" and doc["attempts"] == 2
+
+
+def test_5xx_is_a_permanent_failure(outbox, smtp):
+    smtp.reply = "550 No such user"
+    outbox.enqueue(messages(1))
+    outbox.dispatch()
+    doc = outbox_collection.find_one()
+    assert doc["status"] == "failed" and doc["attempts"] == 1
+    assert "550" in doc["last_error"]
+
+
+def test_expired_lease_is_reclaimed(outbox, smtp):
+    outbox.enqueue(messages(2))
+    now = datetime.datetime.utcnow()
+    # One batch claimed by a worker that died, one still held by a live worker.
+    outbox_collection.update_one({"to": "s0@uni.edu"}, {"$set": {
+        "status": "sending", "lease_owner": "dead", "lease_until": now - datetime.timedelta(seconds=1)}})
+    outbox_collection.update_one({"to": "s1@uni.edu"}, {"$set": {
+        "status": "sending", "lease_owner": "alive", "lease_until": now + datetime.timedelta(minutes=5)}})
+    outbox.dispatch()
+
+    assert [envelope.rcpt_tos for envelope in smtp.received] == [["s0@uni.edu"]]
+    assert outbox_collection.find_one({"to": "s0@uni.edu"})["status"] == "sent"
+    assert outbox_collection.find_one({"to": "s1@uni.edu"})["lease_owner"] == "alive"
+
+
+def test_unreachable_server_only_uses_an_attempt_of_the_message_tried(outbox, monkeypatch):
+    monkeypatch.setattr(outbox_module, "SMTP_HOST", "127.0.0.1")
+    monkeypatch.setattr(outbox_module, "SMTP_PORT", free_port())
+    outbox.enqueue(messages(3))
+    outbox.dispatch()
+
+    docs = list(outbox_collection.find().sort("to", 1))
+    assert [doc["status"] for doc in docs] == ["pending"] * 3
+    assert sorted(doc["attempts"] for doc in docs) == [0, 0, 1]
+    untried = [doc for doc in docs if doc["attempts"] == 0]
+    assert all("last_error" not in doc and "lease_owner" not in doc for doc in untried)
+
+
+def test_bulk_email_queues_each_matching_student_once(outbox):
+    students_collection.delete_many({"department": "Bulk"})
+    students_collection.insert_many([
+        {"name": f"B{i}", "student_id": f"BULK{i}", "department": "Bulk", "email": f"b{i}@uni.edu",
+         "created_at": datetime.datetime(2026, 1, 1 + i)}
+        for i in range(4)
+    ])
+    assert email_students("Fees due", department="Bulk") == {"recipients": 4, "queued": 4, "duplicates": 0}
+    assert email_students("Fees due", department="Bulk") == {"recipients": 4, "queued": 0, "duplicates": 4}
+    result = email_students("Welcome", department="Bulk", created_from="2026-01-03")
+    assert result == {"recipients": 2, "queued": 2, "duplicates": 0}
+
+
+def test_bulk_email_with_a_bad_date_is_a_400(stack):
+    assert "error" in email_students("Fees due", created_from="not-a-date")
+    response = httpx.post(f"{stack.base_url}/emails", headers=stack.headers, timeout=30,
+                          json={"message": "Fees due", "created_to": "2026-13-45"})
+    assert response.status_code == 400
+    assert "Invalid date" in response.json()["detail"]
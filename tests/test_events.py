@@ -0,0 +1,23 @@
+"""Event updates keep the start before the end."""
+from backend.tools import add_event, update_event, get_db
+
+
+def setup_function():
+    get_db.delete_many({})
+
+
+def test_end_date_alone_is_checked_against_the_stored_start():
+    event = add_event("Orientation", "2026-09-01T10:00", "Main Hall", "2026-09-01T12:00")["event"]
+
+    assert update_event(event["_id"], end_date="2026-08-31") == {"error": "end_date is before date"}
+    assert get_db.find_one()["ends_at"].hour == 12
+
+    updated = update_event(event["_id"], end_date="2026-09-01T15:00")["event"]
+    assert updated["ends_at"].hour == 15
+
+
+def test_moving_the_start_keeps_the_duration():
+    event = add_event("Orientation", "2026-09-01T10:00", "Main Hall", "2026-09-01T12:00")["event"]
+    updated = update_event(event["_id"], date="2026-09-02T09:00")["event"]
+    assert (updated["ends_at"] - updated["starts_at"]).total_seconds() == 2 * 3600
+    assert update_event(event["_id"], date="2026-09-03", end_date="2026-09-02") == {"error": "end_date is before date"}
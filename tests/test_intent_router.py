@@ -0,0 +1,57 @@
+"""Intent router: simple data questions are answered directly, anything it is
+not confident about goes to the agent."""
+import asyncio
+
+import pytest
+
+from backend import intent_router
+from backend.intent_router import INTENT_CONFIDENCE_THRESHOLD, match_intent, try_answer
+
+
+@pytest.fixture(autouse=True)
+def enabled(monkeypatch):
+    monkeypatch.setattr(intent_router, "INTENT_ROUTER_ENABLED", True)
+
+
+@pytest.mark.parametrize("message, intent, reply", [
+    ("How many students are there?", "total_students", ("There is", "There are")),
+    ("what's the total number of students", "total_students", ("There is", "There are")),
+    ("please list all students", "list_students", ("Students (", "The ", "There are no")),
+    ("Show me the students by department", "students_by_department", ("Students by department", "There are no")),
+    ("department breakdown", "students_by_department", ("Students by department", "There are no")),
+])
+def test_routed_messages_are_answered(message, intent, reply):
+    matched, confidence = match_intent(message)
+    assert matched[0] == intent and confidence >= INTENT_CONFIDENCE_THRESHOLD
+    answer = asyncio.run(try_answer(message))
+    assert answer and answer.startswith(reply)
+
+
+@pytest.mark.parametrize("message", [
+    # One word the phrase does not explain: confidence 0.67.
+    "how many students failed",
+    "list students in physics",
+    # Two or more: 0.5 and below.
+    "list students in CS with gpa above 3",
+    "how many students joined last week",
+    # Nothing matches at all.
+    "what is the fee deadline",
+    "",
+    "hi",
+])
+def test_unsure_messages_fall_through(message):
+    _, confidence = match_intent(message)
+    assert confidence < INTENT_CONFIDENCE_THRESHOLD
+    assert asyncio.run(try_answer(message)) is None
+
+
+def test_threshold_decides_borderline_messages():
+    message = "how many students failed"
+    _, confidence = match_intent(message)
+    assert asyncio.run(try_answer(message, threshold=confidence)) is not None
+    assert asyncio.run(try_answer(message, threshold=confidence + 0.01)) is None
+
+
+def test_disabled_router_answers_nothing(monkeypatch):
+    monkeypatch.setattr(intent_router, "INTENT_ROUTER_ENABLED", False)
+    assert asyncio.run(try_answer("how many students")) is None
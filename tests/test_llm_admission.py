@@ -0,0 +1,123 @@
+"""Admission control, retries and deadlines for model calls."""
+import asyncio
+import time
+
+import httpx
+import openai
+import pytest
+
+from backend import llm_admission
+from backend.llm_admission import (AdmissionController, LLMDeadlineExceeded, LLMOverloaded, LLMUnavailable,
+                                   deadline_in, retry_delay)
+
+
+def rate_limited(retry_after: str = None) -> openai.RateLimitError:
+    headers = {"retry-after": retry_after} if retry_after is not None else {}
+    response = httpx.Response(429, headers=headers, request=httpx.Request("POST", "http://model/chat/completions"))
+    return openai.RateLimitError("Resource has been exhausted", response=response, body=None)
+
+
+def test_interactive_calls_go_ahead_of_batch():
+    async def scenario():
+        admission = AdmissionController(max_concurrency=1, max_per_user=4)
+        await admission.acquire("holder", "interactive", deadline_in(5))
+        order = []
+
+        async def call(user, priority):
+            await admission.acquire(user, priority, deadline_in(5))
+            order.append(user)
+            admission.release(user)
+
+        waiting = [asyncio.create_task(call("batch-1", "batch")),
+                   asyncio.create_task(call("batch-2", "batch"))]
+        await asyncio.sleep(0)
+        waiting += [asyncio.create_task(call("chat-1", "interactive")),
+                    asyncio.create_task(call("chat-2", "interactive"))]
+        await asyncio.sleep(0)
+        admission.release("holder")
+        await asyncio.gather(*waiting)
+        return order
+
+    assert asyncio.run(scenario()) == ["chat-1", "chat-2", "batch-1", "batch-2"]
+
+
+def test_user_at_the_cap_waits_without_blocking_others():
+    async def scenario():
+        admission = AdmissionController(max_concurrency=4, max_per_user=1)
+        await admission.acquire("alice", "interactive", deadline_in(5))
+        blocked = asyncio.create_task(admission.acquire("alice", "interactive", deadline_in(0.1)))
+        await asyncio.sleep(0)
+        # Bob is behind Alice in the queue but gets a slot straight away.
+        await asyncio.wait_for(admission.acquire("bob", "interactive", deadline_in(5)), 0.05)
+        with pytest.raises(LLMDeadlineExceeded):
+            await blocked
+        return admission.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["in_flight"] == 2 and stats["queued"] == 0
+
+
+def test_full_queue_is_rejected():
+    async def scenario():
+        admission = AdmissionController(max_concurrency=1, max_per_user=1, max_queue=1)
+        await admission.acquire("alice", "interactive", deadline_in(5))
+        waiting = asyncio.create_task(admission.acquire("bob", "interactive", deadline_in(5)))
+        await asyncio.sleep(0)
+        with pytest.raises(LLMOverloaded):
+            await admission.acquire("carol", "interactive", deadline_in(5))
+        waiting.cancel()
+
+    asyncio.run(scenario())
+
+
+def test_retry_after_is_a_floor_under_jittered_backoff():
+    plain = {retry_delay(2, rate_limited()) for _ in range(50)}
+    assert len(plain) > 1
+    assert all(0 <= delay <= llm_admission.LLM_RETRY_MAX_SECONDS for delay in plain)
+
+    floor = llm_admission.LLM_RETRY_MAX_SECONDS / 2
+    delays = [retry_delay(0, rate_limited(str(floor))) for _ in range(50)]
+    assert all(floor <= delay <= llm_admission.LLM_RETRY_MAX_SECONDS for delay in delays)
+    # A Retry-After beyond the cap does not stall the request.
+    assert retry_delay(0, rate_limited("3600")) <= llm_admission.LLM_RETRY_MAX_SECONDS
+
+
+def test_429_is_retried_then_reported_as_unavailable(stack, llm):
+    llm.error_rate = 1.0
+    llm.retry_after = llm_admission.LLM_RETRY_MAX_SECONDS / 2
+    retries = llm_admission.metrics.counter("llm_retries_total", "Model calls retried", reason="429")
+    requests, retried = llm.stats["requests"], retries.value
+    started = time.perf_counter()
+    response = httpx.post(f"{stack.base_url}/chat", headers=stack.headers, timeout=30,
+                          json={"user_id": "tester", "message": "Tell me about enrollment"})
+    elapsed = time.perf_counter() - started
+
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) >= 1
+    assert llm.stats["requests"] - requests == llm_admission.LLM_MAX_RETRIES + 1
+    assert retries.value - retried == llm_admission.LLM_MAX_RETRIES
+    assert elapsed >= llm_admission.LLM_MAX_RETRIES * llm.retry_after
+
+
+def test_expired_deadline_is_unavailable_with_504(stack):
+    # Imported once the stack has pointed the model client at the fake.
+    from backend.chat_router import _model_unavailable
+
+    async def scenario():
+        admission = AdmissionController()
+        await admission.acquire("alice", "interactive", asyncio.get_running_loop().time() - 1)
+
+    with pytest.raises(LLMUnavailable) as raised:
+        asyncio.run(scenario())
+    status_code, _, retry_after = _model_unavailable(raised.value)
+    assert status_code == 504 and retry_after > 0
+
+
+def test_deadline_cuts_off_a_slow_model_call(stack, llm):
+    llm.first_token_delay = 2.0
+    started = time.perf_counter()
+    response = httpx.post(f"{stack.base_url}/chat", headers={**stack.headers, "X-Request-Timeout": "0.3"},
+                          timeout=30, json={"user_id": "tester", "message": "Tell me about enrollment"})
+    assert response.status_code == 504
+    assert "Retry-After" in response.headers
+    assert time.perf_counter() - started < 1.5
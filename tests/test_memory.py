@@ -0,0 +1,115 @@
+"""Tiered conversation memory: local LRU/TTL tier, write-behind flushes and
+picking up turns other workers appended."""
+import time
+
+import pytest
+
+from backend.db import client
+from backend.memory import ConversationMemory, LocalMemoryTier, MongoMemoryTier, ThreadEntry
+
+threads = client["memory_test"]["threads"]
+
+
+@pytest.fixture(autouse=True)
+def clean():
+    threads.delete_many({})
+    threads.insert_one({"user_id": "u", "thread_id": "t", "messages": [], "message_count": 0})
+
+
+def worker(flush_interval: float = 60, flush_batch: int = 100, max_threads: int = 10, ttl: float = 60):
+    return ConversationMemory(LocalMemoryTier(max_threads, ttl, 20), MongoMemoryTier(threads, 20),
+                              flush_interval=flush_interval, flush_batch=flush_batch)
+
+
+def stored(thread_id: str = "t") -> list:
+    doc = threads.find_one({"user_id": "u", "thread_id": thread_id})
+    return [m["content"] for m in doc["messages"]]
+
+
+def wait_for(check, timeout: float = 2.0):
+    deadline = time.monotonic() + timeout
+    while not check():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_local_tier_evicts_least_recently_used():
+    local = LocalMemoryTier(max_threads=2, ttl_seconds=60, max_turns=20)
+    for key in ("a", "b"):
+        local.put(key, ThreadEntry([], 0))
+    local.get("a")
+    local.put("c", ThreadEntry([], 0))
+    assert local.get("b") is None
+    assert local.get("a") is not None and local.get("c") is not None
+
+
+def test_local_tier_expires_idle_threads():
+    local = LocalMemoryTier(max_threads=10, ttl_seconds=0.05, max_turns=20)
+    local.put("idle", ThreadEntry([], 0))
+    local.put("also-idle", ThreadEntry([], 0))
+    time.sleep(0.1)
+    assert local.get("idle") is None
+    local.expire()
+    assert local.get("also-idle") is None
+
+
+def test_evicted_thread_reloads_with_unflushed_turns():
+    memory = worker(max_threads=1)
+    memory.append("u", "t", "user", "hello")
+    memory.append("u", "other", "user", "pushes t out")
+    assert memory.get("u", "t") == [{"role": "user", "content": "hello"}]
+
+
+def test_appends_are_written_behind_in_one_flush():
+    memory = worker()
+    memory.append("u", "t", "user", "q")
+    memory.append("u", "t", "assistant", "a")
+    assert stored() == []
+    memory.flush()
+    assert stored() == ["q", "a"]
+    assert threads.find_one({"thread_id": "t"})["message_count"] == 2
+
+
+def test_batch_size_triggers_a_flush():
+    memory = worker(flush_batch=3)
+    memory.start()
+    try:
+        for i in range(3):
+            memory.append("u", "t", "user", f"m{i}")
+        wait_for(lambda: stored() == ["m0", "m1", "m2"])
+    finally:
+        memory.stop()
+
+
+def test_interval_flushes_a_partial_batch():
+    memory = worker(flush_interval=0.05)
+    memory.start()
+    try:
+        memory.append("u", "t", "user", "only one")
+        wait_for(lambda: stored() == ["only one"])
+    finally:
+        memory.stop()
+
+
+def test_sync_picks_up_turns_from_another_worker():
+    first, second = worker(), worker()
+    assert second.get("u", "t") == []
+    first.append("u", "t", "user", "asked on worker one")
+    first.flush()
+
+    # The second worker's cached copy is stale until sync compares message_count.
+    assert second.get("u", "t") == []
+    assert second.sync("u", "t")
+    assert [m["content"] for m in second.get("u", "t")] == ["asked on worker one"]
+
+    second.append("u", "t", "assistant", "answered on worker two")
+    second.flush()
+    assert first.sync("u", "t")
+    assert [m["content"] for m in first.get("u", "t")] == ["asked on worker one", "answered on worker two"]
+
+
+def test_sync_reports_a_deleted_thread():
+    memory = worker()
+    memory.get("u", "t")
+    threads.delete_one({"thread_id": "t"})
+    assert memory.sync("u", "t") is False
@@ -0,0 +1,66 @@
+"""Keyset paging of /students and /threads."""
+import datetime
+
+import httpx
+import pytest
+from bson import ObjectId
+
+from backend.db import threads_collection
+from backend.tools import students_collection
+
+# Three timestamps for many rows, so pages often end inside a run of ties.
+STAMPS = [datetime.datetime(2026, 3, day, 9, 30) for day in (1, 2, 3)]
+
+
+def pages(stack, path, params, key):
+    seen, cursor, count = [], None, 0
+    with httpx.Client(base_url=stack.base_url, headers=stack.headers, timeout=30) as client:
+        while True:
+            response = client.get(path, params={**params, **({"cursor": cursor} if cursor else {})})
+            assert response.status_code == 200
+            body = response.json()
+            seen += [row[key] for row in body[path.strip("/")]]
+            count += 1
+            cursor = body["next_cursor"]
+            if cursor is None:
+                return seen, count
+
+
+def test_students_pages_cover_every_row_once(stack):
+    students_collection.delete_many({"department": "Paging"})
+    students_collection.insert_many([
+        {"_id": ObjectId(), "name": f"P{i}", "student_id": f"PAGE{i:02d}", "department": "Paging",
+         "email": f"p{i}@uni.edu", "created_at": STAMPS[i % 3]}
+        for i in range(23)
+    ])
+    seen, count = pages(stack, "/students", {"department": "Paging", "limit": 4}, "student_id")
+
+    assert sorted(seen) == [f"PAGE{i:02d}" for i in range(23)]
+    assert count == 6
+    expected = [s["student_id"] for s in students_collection.find({"department": "Paging"})
+                .sort([("created_at", -1), ("_id", -1)])]
+    assert seen == expected
+
+
+def test_threads_pages_cover_every_thread_once(stack):
+    threads_collection.delete_many({"user_id": "pager"})
+    threads_collection.insert_many([
+        {"user_id": "pager", "thread_id": f"thread-{i:02d}", "created_at": STAMPS[i % 3], "messages": [],
+         "message_count": 0}
+        for i in range(11)
+    ])
+    seen, count = pages(stack, "/threads", {"user_id": "pager", "limit": 3}, "thread_id")
+
+    assert sorted(seen) == [f"thread-{i:02d}" for i in range(11)]
+    assert count == 4
+
+
+@pytest.mark.parametrize("path, params", [
+    ("/students", {}),
+    ("/threads", {"user_id": "pager"}),
+])
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "eyJjIjogIm5vcGUifQ=="])
+def test_bad_cursor_is_a_400(stack, path, params, cursor):
+    response = httpx.get(f"{stack.base_url}{path}", headers=stack.headers, timeout=30,
+                         params={**params, "cursor": cursor})
+    assert response.status_code == 400
@@ -0,0 +1,75 @@
+"""Document index shared by several workers (one DocumentIndex each)."""
+import threading
+
+from backend.rag_agent import DocumentIndex
+
+TOPICS = {
+    "fees.md": "tuition fee payment deadline installment scholarship refund",
+    "library.md": "library opening hours borrowing books reading room",
+    "hostel.md": "hostel room allocation warden mess curfew",
+    "exams.md": "exam schedule midterm final grading transcript",
+}
+
+
+def write_docs(tmp_path, names, repeat=3):
+    docs = tmp_path / "docs"
+    docs.mkdir(exist_ok=True)
+    paths = {}
+    for name in names:
+        path = docs / name
+        path.write_text(" ".join([TOPICS[name]] * repeat))
+        paths[name] = str(path)
+    return paths
+
+
+def top_source(index, query):
+    return index.search(query, top_k=1)[0]["source"]
+
+
+def test_reader_sees_another_workers_writes(tmp_path):
+    paths = write_docs(tmp_path, TOPICS)
+    first, second = DocumentIndex(str(tmp_path / "index"), dims=64), DocumentIndex(str(tmp_path / "index"), dims=64)
+
+    first.ingest_file(paths["fees.md"])
+    assert top_source(second, "fee deadline") == "fees.md"
+
+    # Each writer catches up before appending, so neither overwrites the other.
+    second.ingest_file(paths["library.md"])
+    first.ingest_file(paths["hostel.md"])
+    assert {d["source"] for d in second.documents()} == {"fees.md", "library.md", "hostel.md"}
+
+    assert first.remove("library.md")
+    assert {d["source"] for d in second.documents()} == {"fees.md", "hostel.md"}
+    fresh = DocumentIndex(str(tmp_path / "index"), dims=64)
+    for name, query in (("fees.md", "scholarship refund"), ("hostel.md", "warden curfew")):
+        assert top_source(fresh, query) == name
+        assert top_source(second, query) == name
+
+
+def test_concurrent_writers_keep_the_index_consistent(tmp_path):
+    paths = write_docs(tmp_path, TOPICS, repeat=200)
+    workers = [DocumentIndex(str(tmp_path / "index"), dims=64) for _ in range(2)]
+    errors = []
+
+    def ingest(index, names):
+        try:
+            for name in names:
+                index.ingest_file(paths[name])
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=ingest, args=(workers[0], ["fees.md", "library.md"])),
+               threading.Thread(target=ingest, args=(workers[1], ["hostel.md", "exams.md"]))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+
+    fresh = DocumentIndex(str(tmp_path / "index"), dims=64)
+    documents = {d["source"]: d for d in fresh.documents()}
+    assert set(documents) == set(TOPICS)
+    for name, query in (("fees.md", "installment"), ("library.md", "borrowing books"),
+                        ("hostel.md", "mess allocation"), ("exams.md", "midterm grading")):
+        assert top_source(fresh, query) == name
+        assert top_source(workers[0], query) == name
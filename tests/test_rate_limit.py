@@ -0,0 +1,99 @@
+"""Login rate limits and the password pool's queue limit."""
+import threading
+import types
+
+import httpx
+import pytest
+
+from backend import auth_utils, rate_limit
+from backend.db import admins_collection
+from backend.rate_limit import TokenBucketLimiter, login_email_limiter, login_ip_limiter
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    # Only the limiter's clock: the stack's event loop keeps the real one.
+    monkeypatch.setattr(rate_limit, "time", types.SimpleNamespace(monotonic=clock))
+    return clock
+
+
+def test_burst_then_wait_until_the_next_token(clock):
+    limiter = TokenBucketLimiter("test", rate=2, burst=3)
+    assert [limiter.allow("k") for _ in range(3)] == [0, 0, 0]
+    assert limiter.allow("k") == pytest.approx(0.5)
+    # Other keys have their own bucket.
+    assert limiter.allow("other") == 0
+
+
+def test_tokens_refill_at_the_rate_up_to_the_burst(clock):
+    limiter = TokenBucketLimiter("test", rate=2, burst=3)
+    for _ in range(3):
+        limiter.allow("k")
+    clock.now += 0.25
+    assert limiter.allow("k") == pytest.approx(0.25)
+    clock.now += 0.25
+    assert limiter.allow("k") == 0
+    assert limiter.allow("k") > 0
+
+    clock.now += 60
+    assert [limiter.allow("k") for _ in range(3)] == [0, 0, 0]
+    assert limiter.allow("k") > 0
+
+
+def test_evicted_key_starts_with_a_full_bucket(clock):
+    limiter = TokenBucketLimiter("test", rate=1, burst=1, max_keys=2)
+    limiter.allow("a")
+    assert limiter.allow("a") > 0
+    limiter.allow("b")
+    limiter.allow("c")
+    assert limiter.allow("a") == 0
+
+
+@pytest.fixture
+def fresh_limits():
+    login_ip_limiter.reset("127.0.0.1")
+    yield
+    login_ip_limiter.reset("127.0.0.1")
+
+
+def test_login_burst_is_a_429_with_retry_after(stack, fresh_limits):
+    email = "guesser@campus.edu"
+    login_email_limiter.reset(email)
+    with httpx.Client(base_url=stack.base_url, timeout=30) as client:
+        codes = [client.post("/admin/login", json={"email": email, "password": "wrong"}).status_code
+                 for _ in range(rate_limit.LOGIN_EMAIL_BURST)]
+        limited = client.post("/admin/login", json={"email": email, "password": "wrong"})
+    login_email_limiter.reset(email)
+
+    assert codes == [401] * rate_limit.LOGIN_EMAIL_BURST
+    assert limited.status_code == 429
+    assert int(limited.headers["Retry-After"]) >= 1
+
+
+def test_saturated_password_pool_is_a_429(stack, fresh_limits, monkeypatch):
+    email = "busy@campus.edu"
+    admins_collection.delete_many({"email": email})
+    admins_collection.insert_one({"email": email, "password": "not-checked", "verified": True})
+    login_email_limiter.reset(email)
+    # Every slot is taken, so the call is rejected before it queues for bcrypt.
+    monkeypatch.setattr(auth_utils, "_password_slots", threading.BoundedSemaphore(1))
+    auth_utils._password_slots.acquire()
+
+    with httpx.Client(base_url=stack.base_url, timeout=30) as client:
+        login = client.post("/admin/login", json={"email": email, "password": "anything"})
+        signup = client.post("/admin/signup", json={"email": "new-busy@campus.edu", "password": "anything"})
+
+    for response in (login, signup):
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "1"
+    assert admins_collection.find_one({"email": "new-busy@campus.edu"}) is None
+    admins_collection.delete_many({"email": email})
@@ -0,0 +1,49 @@
+"""Cached agent answers are dropped when the data they read is written
+through ``data_versions.notify_write``."""
+import httpx
+
+from backend import data_versions
+from backend.response_cache import response_cache
+
+
+def test_cached_answer_is_dropped_when_its_data_changes():
+    response_cache.clear()
+    response_cache.put("How many students?", "There are 3 students.", ["get_total_students"],
+                       data_versions.snapshot(), cost=1.0)
+    response_cache.put("What's on this week?", "Orientation.", ["upcoming_events"], data_versions.snapshot(), cost=1.0)
+    assert response_cache.get("how many students") == "There are 3 students."
+
+    data_versions.notify_write("students", "insert", doc={"student_id": "S9"})
+    assert response_cache.get("How many students?") is None
+    assert response_cache.get("What's on this week?") == "Orientation."
+
+
+def test_answer_written_during_the_run_is_not_served():
+    response_cache.clear()
+    versions = data_versions.snapshot()
+    # Another request writes while this run is still working on its answer.
+    data_versions.notify_write("students", "update", doc={"student_id": "S9"})
+    response_cache.put("How many students?", "There are 3 students.", ["get_total_students"], versions, cost=1.0)
+    assert response_cache.get("How many students?") is None
+
+
+def test_chat_answer_is_recomputed_after_a_write(stack, llm, monkeypatch):
+    from backend import agent
+
+    monkeypatch.setattr(agent, "RESPONSE_CACHE_ENABLED", True)
+    response_cache.clear()
+    llm.tool_script = {"how many students": [("get_total_students", {})]}
+
+    def ask():
+        requests = llm.stats["requests"]
+        response = httpx.post(f"{stack.base_url}/chat", headers=stack.headers, timeout=30,
+                              json={"user_id": "tester", "message": "How many students are enrolled?"})
+        assert response.status_code == 200
+        return llm.stats["requests"] - requests
+
+    assert ask() > 0
+    assert ask() == 0
+    response = httpx.post(f"{stack.base_url}/students", headers=stack.headers, timeout=30,
+                          json={"name": "New", "student_id": "CACHE2", "department": "Math", "email": "new@uni.edu"})
+    assert response.status_code == 200
+    assert ask() > 0
@@ -0,0 +1,88 @@
+"""In-memory student search: fuzzy matches, tombstones and writes that land
+during a rebuild."""
+import pytest
+from bson import ObjectId
+
+from backend import student_search as search_module
+from backend.student_search import StudentSearchIndex
+from backend.tools import students_collection
+
+STUDENTS = [
+    {"name": "Margaret Thornton", "student_id": "SRCH01", "department": "History", "email": "mthornton@uni.edu"},
+    {"name": "Oluwaseun Adeyemi", "student_id": "SRCH02", "department": "Physics", "email": "oadeyemi@uni.edu"},
+    {"name": "Priyanka Raghunathan", "student_id": "SRCH03", "department": "Chemistry", "email": "praghu@uni.edu"},
+]
+
+
+@pytest.fixture
+def index():
+    students_collection.delete_many({"student_id": {"$regex": "^SRCH"}})
+    students_collection.insert_many([{"_id": ObjectId(), **s} for s in STUDENTS])
+    index = StudentSearchIndex()
+    index.rebuild()
+    yield index
+    students_collection.delete_many({"student_id": {"$regex": "^SRCH"}})
+
+
+def top_ids(index, query):
+    return [r["student_id"] for r in index.search(query, limit=3)]
+
+
+@pytest.mark.parametrize("query, student_id", [
+    ("Margret Thornten", "SRCH01"),
+    ("oluwasen adeyem", "SRCH02"),
+    ("Priyanka Ragunathan", "SRCH03"),
+])
+def test_misspelled_names_still_match(index, query, student_id):
+    assert top_ids(index, query)[:1] == [student_id]
+
+
+def test_deleted_student_is_not_returned(index):
+    doc = students_collection.find_one({"student_id": "SRCH02"})
+    students_collection.delete_one({"_id": doc["_id"]})
+    index.apply_write("students", "delete", {"doc": {"_id": doc["_id"]}})
+
+    assert "SRCH02" not in top_ids(index, "Oluwaseun Adeyemi")
+    assert index.stats()["tombstones"] == 1
+    # A later rebuild drops the tombstone itself.
+    index.rebuild()
+    assert index.stats()["tombstones"] == 0
+    assert "SRCH02" not in top_ids(index, "Oluwaseun Adeyemi")
+
+
+def test_updated_student_is_found_under_the_new_name(index):
+    doc = students_collection.find_one({"student_id": "SRCH01"})
+    index.apply_write("students", "update", {"doc": {**doc, "name": "Margaret Whitfield"}})
+
+    assert top_ids(index, "Whitfield")[:1] == ["SRCH01"]
+    # One entry per student: the old name is gone, not listed alongside.
+    assert [r["name"] for r in index.search("SRCH01") if r["student_id"] == "SRCH01"] == ["Margaret Whitfield"]
+
+
+def test_writes_during_a_rebuild_are_replayed(index, monkeypatch):
+    deleted = students_collection.find_one({"student_id": "SRCH03"})
+    added = {"_id": ObjectId(), "name": "Bartholomew Okonkwo", "student_id": "SRCH04",
+             "department": "Law", "email": "bokonkwo@uni.edu"}
+    rows = list(students_collection.find({}, {"name": 1, "email": 1, "student_id": 1, "department": 1}))
+
+    class Rows(list):
+        def batch_size(self, _):
+            return self
+
+        def __iter__(self):
+            for i, row in enumerate(list.__iter__(self)):
+                if i == 1:
+                    # The build has read part of the collection when these land.
+                    index.apply_write("students", "insert", {"doc": added})
+                    index.apply_write("students", "delete", {"doc": {"_id": deleted["_id"]}})
+                yield row
+
+    class Collection:
+        def find(self, *args, **kwargs):
+            return Rows(rows)
+
+    monkeypatch.setattr(search_module, "students_collection", Collection())
+    index.rebuild()
+
+    assert top_ids(index, "Bartholomew Okonkwo")[:1] == ["SRCH04"]
+    assert "SRCH03" not in top_ids(index, "Priyanka Raghunathan")
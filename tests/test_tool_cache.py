@@ -0,0 +1,34 @@
+"""Cached tool results are dropped when the data they read is written
+through ``data_versions.notify_write``."""
+import asyncio
+
+from backend.tools import (add_student_async, add_event_async, get_total_students_async, students_collection,
+                           tool_cache)
+
+
+def test_tool_result_is_fresh_after_a_write():
+    async def scenario():
+        tool_cache.clear()
+        before = (await get_total_students_async())["total_students"]
+        # Cached: a write that bypasses notify_write is not seen...
+        students_collection.insert_one({"name": "Quiet", "student_id": "CACHE0", "email": "quiet@uni.edu"})
+        cached = (await get_total_students_async())["total_students"]
+        # ...but one made through the tools is.
+        await add_student_async("Loud", "CACHE1", "Physics", "loud@uni.edu")
+        fresh = (await get_total_students_async())["total_students"]
+        return before, cached, fresh
+
+    students_collection.delete_many({"student_id": {"$in": ["CACHE0", "CACHE1"]}})
+    before, cached, fresh = asyncio.run(scenario())
+    assert cached == before
+    assert fresh == before + 2
+
+
+def test_tool_result_survives_writes_to_other_collections():
+    async def scenario():
+        tool_cache.clear()
+        await get_total_students_async()
+        await add_event_async("Orientation", "2026-09-01", "Main Hall")
+        return tool_cache.stats()["entries"]
+
+    assert asyncio.run(scenario()) == 1
@@ -0,0 +1,45 @@
+"""Thread transcripts: backfill of threads stored before transcripts."""
+import datetime
+
+from backend.db import client
+from backend.indexes import backfill_transcripts
+from backend.transcripts import TranscriptStore
+
+
+def legacy_database(threads: int = 3, turns: int = 4):
+    database = client["transcripts_test"]
+    database["threads"].delete_many({})
+    database["thread_transcripts"].delete_many({})
+    database["threads"].insert_many([
+        {"user_id": "u", "thread_id": f"t{i}", "created_at": datetime.datetime(2026, 1, 1),
+         "messages": [{"role": "user" if j % 2 == 0 else "assistant", "content": f"t{i} turn {j}"}
+                      for j in range(turns)]}
+        for i in range(threads)
+    ])
+    return database
+
+
+def test_workers_starting_together_copy_each_thread_once(monkeypatch):
+    database = legacy_database()
+    add = TranscriptStore.add
+    other_worker = []
+
+    def add_while_another_worker_starts(self, *args, **kwargs):
+        # The second worker runs its whole backfill while the first is part-way
+        # through a thread, after both have read the legacy threads.
+        if not other_worker:
+            other_worker.append(None)
+            other_worker.append(backfill_transcripts(database))
+        return add(self, *args, **kwargs)
+
+    monkeypatch.setattr(TranscriptStore, "add", add_while_another_worker_starts)
+    copied = backfill_transcripts(database)
+    monkeypatch.undo()
+
+    assert copied + other_worker[1] == 3
+    store = TranscriptStore(database["threads"], database["thread_transcripts"])
+    for i in range(3):
+        turns = [turn["content"] for turn in store.iter_turns("u", f"t{i}")]
+        assert turns == [f"t{i} turn {j}" for j in range(4)]
+    assert database["threads"].count_documents({"transcript_backfill": {"$exists": True}}) == 0
+    assert backfill_transcripts(database) == 0